@@ -0,0 +1,995 @@
+"""Analiz motorunun arayüzden bağımsız çekirdeği.
+
+Sütun tanımları, FAZ 1 / FAZ 2 istatistik motoru, grafik üretimi ve PDF
+raporu burada bulunur. `app.py` (Streamlit arayüzü) ve `batch_cli.py` (komut
+satırı) bu modülü kullanır; modülün içe aktarılması arayüzü başlatmaz.
+plotly, fpdf ve scipy.stats ilgili aşama ilk kez çalıştığında içe aktarılır
+(arayüzün soğuk açılışı bunları beklemez; bkz. warmup.py).
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import warnings
+import weakref
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from result_cache import ResultCache, make_bytes_key
+from ancova_engine import fit_group_ancova_batch, covariates_to_formula
+from equivalence import run_equivalence_tests
+from chart_render import render_pngs
+from resampling import run_resampling_inference
+from imputation import run_multiple_imputation
+from sensitivity import run_sensitivity_analysis, robustness_lines, sensitivity_summary_rows
+from longitudinal import get_long_table, longitudinal_model_lines, longitudinal_summary_rows, run_longitudinal_analysis
+from profiling import stage
+from study_spec import available_study_specs, get_study_plan
+
+warnings.filterwarnings('ignore')
+
+# --- 2. SİSTEMİN GEREKLİ SÜTUNLARI (ŞABLON İÇİN) ---
+# Sütunlar, FAZ 1 görünen adları, FAZ 2 hipotezleri ve grafikler çalışma tanımından (specs/*.json) derlenir.
+# Aşağıdaki sabitler varsayılan protokolün planıdır; fonksiyonlar başka bir protokol için `plan` argümanı alır.
+DEFAULT_PLAN = get_study_plan()
+NUMERIC_COLUMNS = DEFAULT_PLAN.numeric_columns
+CATEGORIC_COLUMNS = DEFAULT_PLAN.categoric_columns
+ALL_REQUIRED_COLUMNS = DEFAULT_PLAN.all_required_columns
+
+# FAZ 1 denklik testine giren sütunlar ve rapordaki görünen adları
+FAZ1_NUMERIC_LABELS = DEFAULT_PLAN.faz1_numeric_labels
+FAZ1_CATEGORIC_LABELS = DEFAULT_PLAN.faz1_categoric_labels
+
+# FAZ 2 hipotez çiftleri: (sonuç anahtarı, bağımlı değişken / son-test, kovaryant / ön-test)
+HYPOTHESIS_TESTS = DEFAULT_PLAN.hypothesis_tests
+
+# Önbellek anahtarına giren analiz ayarları (motor mantığı değiştiğinde sürüm artırılmalı)
+# 'ancova_yontemi': 'numpy' (toplu motor), 'statsmodels' (eski formül yolu) veya 'verify' (ikisini karşılaştırır)
+# 'yeniden_ornekleme': None (kapalı) veya resampling.DEFAULT_RESAMPLING_CONFIG biçiminde bir sözlük
+# 'merkez_sutunu': None (tek merkez) veya çok merkezli analizde merkez / tabaka sütununun adı
+# 'coklu_atama': None (kapalı) veya imputation.DEFAULT_IMPUTATION_CONFIG biçiminde bir sözlük
+# 'duyarlilik': None (kapalı) veya sensitivity.DEFAULT_SENSITIVITY_CONFIG biçiminde bir sözlük (düzeltme seti taraması)
+# 'tekrarli_olcum': None (kapalı) veya longitudinal.DEFAULT_LONGITUDINAL_CONFIG biçiminde bir sözlük (grup × zaman karma modeli)
+# 'protokol' / 'protokol_ozeti': çalışma tanımının adı ve içerik özeti (tanım değişince önbellek geçersizleşir)
+ANALYSIS_CONFIG = {'motor_surumu': 'v12.2', 'alpha': 0.05, 'ancova_yontemi': 'numpy', 'yeniden_ornekleme': None, 'merkez_sutunu': None,
+                   'coklu_atama': None, 'duyarlilik': None, 'tekrarli_olcum': None, 'protokol': DEFAULT_PLAN.name, 'protokol_ozeti': DEFAULT_PLAN.key}
+
+# --- 2.1 PAYLAŞILAN SONUÇ ÖNBELLEĞİ ---
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache():
+    """Süreçteki tüm oturumların (ve CLI işlerinin) paylaştığı tek bir bellek + disk önbelleği döndürür."""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
+
+# --- 3. YENİ ŞABLON OLUŞTURMA FONKSİYONU ---
+# Şablonlar assets/sablonlar altında hazır dosya olarak gelir (openpyxl açılışta yüklenmez);
+# yeniden üretmek için: python batch_cli.py --sablonlari-uret
+TEMPLATE_ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'sablonlar')
+TEMPLATE_SHEET_NAME = 'Veri_Giris_Sayfasi'
+
+def template_asset_path(plan=None):
+    """Önceden üretilmiş şablonun yolu; dosya adı sütun listesinin özetini taşır (sütunlar değişirse eski dosya kullanılmaz)."""
+    plan = plan or DEFAULT_PLAN
+    digest = hashlib.sha256(json.dumps([TEMPLATE_SHEET_NAME, plan.all_required_columns], ensure_ascii=False).encode()).hexdigest()[:12]
+    return os.path.join(TEMPLATE_ASSET_DIR, f"{plan.name}_{digest}.xlsx")
+
+def build_template_excel(plan=None):
+    df_template = pd.DataFrame(columns=(plan or DEFAULT_PLAN).all_required_columns)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df_template.to_excel(writer, sheet_name=TEMPLATE_SHEET_NAME, index=False)
+    return output.getvalue()
+
+def create_template_excel(plan=None):
+    """Boş veri giriş şablonu (xlsx baytları): hazır dosya varsa okunur, yoksa openpyxl ile üretilir."""
+    path = template_asset_path(plan)
+    if os.path.isfile(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    return build_template_excel(plan)
+
+def write_template_assets(studies=None):
+    """specs klasöründeki (veya verilen) protokollerin şablonlarını assets/sablonlar'a yazar; yazılan yolları döndürür."""
+    os.makedirs(TEMPLATE_ASSET_DIR, exist_ok=True)
+    paths = []
+    for study in studies or available_study_specs():
+        plan = get_study_plan(study)
+        path = template_asset_path(plan)
+        # Aynı protokolün eski sütun listesine ait dosyaları kaldırılır
+        for name in os.listdir(TEMPLATE_ASSET_DIR):
+            if name.startswith(f"{plan.name}_") and name.endswith('.xlsx') and name != os.path.basename(path):
+                os.remove(os.path.join(TEMPLATE_ASSET_DIR, name))
+        with open(path, 'wb') as f:
+            f.write(build_template_excel(plan))
+        paths.append(path)
+    return paths
+
+# --- 3.1 DOĞRULAMA VE DIŞA AKTARMA YARDIMCILARI ---
+def resampling_note(results, key):
+    """Bir hipotez için permütasyon p-değeri ve bootstrap güven aralığı özeti (yeniden örnekleme kapalıysa None)."""
+    resampling = results.get('resampling')
+    if not resampling or key not in resampling['models']:
+        return None
+    model = resampling['models'][key]
+    parts = []
+    if not np.isnan(model['perm_p']):
+        parts.append(f"Permütasyon p = {model['perm_p']:.4f}")
+    if not np.isnan(model['boot_ci_low']):
+        parts.append(f"Bootstrap %{resampling['ci_level'] * 100:.0f} GA (grup etkisi): [{model['boot_ci_low']:.3f}, {model['boot_ci_high']:.3f}]")
+    return " | ".join(parts) or None
+
+def imputation_note(results, key):
+    """Bir hipotez için çoklu atama (Rubin) sonucu özeti (çoklu atama kapalıysa None)."""
+    imputation = results.get('imputation')
+    if not imputation or key not in imputation['models']:
+        return None
+    model = imputation['models'][key]
+    if np.isnan(model['p_value']):
+        return None
+    return (f"Çoklu atama (m = {imputation['m']}, n = {model['n']}): p = {model['p_value']:.4f}, "
+            f"grup etkisi = {model['estimate']:.3f} (SH {model['se']:.3f}), eksik bilgi oranı = {model['fmi']:.2f}")
+
+def inference_notes(results, key):
+    """Bir hipotezin metrik / PDF satırı altında gösterilecek ek çıkarım notları."""
+    return [note for note in (resampling_note(results, key), imputation_note(results, key)) if note]
+
+def missing_columns_error(missing_cols):
+    return f"HATA: Yüklediğiniz Excel dosyası bir Şablon dosyası değil. Şu sütunlar eksik: {', '.join(missing_cols)}. Lütfen 'Boş Excel Şablonunu İndir' butonunu kullanarak doğru şablonu indirin ve verilerinizi oraya girin."
+
+def to_json_safe(obj):
+    """Sonuç sözlüğünü JSON'a yazılabilir hale getirir (NumPy sayıları -> float/int, NaN/inf -> None)."""
+    if isinstance(obj, dict):
+        return {str(key): to_json_safe(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_json_safe(value) for value in obj]
+    if isinstance(obj, (bool, np.bool_)):
+        return bool(obj)
+    if isinstance(obj, (int, np.integer)):
+        return int(obj)
+    if isinstance(obj, (float, np.floating)):
+        return float(obj) if np.isfinite(obj) else None
+    return obj
+
+def results_to_json(results, **kwargs):
+    return json.dumps(to_json_safe(results), ensure_ascii=False, **kwargs)
+
+# --- 4. YARDIMCI PDF FONKSİYONLARI ---
+def normalize_for_pdf(text):
+    text = str(text) 
+    replacements = {
+        'İ': 'I', 'ı': 'i', 'Ş': 'S', 'ş': 's', 'Ğ': 'G', 'ğ': 'g',
+        'Ü': 'U', 'ü': 'u', 'Ö': 'O', 'ö': 'o', 'Ç': 'C', 'ç': 'c'
+    }
+    for tr_char, en_char in replacements.items():
+        text = text.replace(tr_char, en_char)
+    return text
+
+def chart_image(images, name):
+    """Rasterleştirilmiş grafiği PDF'e eklenebilir hale getirir; rasterleştirme hatasını bölüm içinde yükseltir."""
+    png = images[name]
+    if isinstance(png, Exception):
+        raise png
+    return io.BytesIO(png)
+
+def _pdf_inference_lines(pdf, results, key):
+    for note in inference_notes(results, key):
+        pdf.cell(190, 5, normalize_for_pdf(f"    {note}"), ln=True)
+
+# Merkez bazlı özet tablosunun p-değeri sütunları (sonuç anahtarı -> başlık)
+STRATA_TABLE_P_COLUMNS = DEFAULT_PLAN.p_value_titles
+
+def stratified_summary_rows(results, plan=None):
+    """Çok merkezli analizde her merkez ve birleşik model için tek satırlık özet (sözlük listesi)."""
+    p_columns = (plan or DEFAULT_PLAN).p_value_titles
+    strata = results.get('strata')
+    if not strata:
+        return []
+    entries = [(site, info['n'], info['results']) for site, info in strata['sites'].items()]
+    entries.append((f"Birleşik (+ C({strata['column']}))", strata['n_pooled'], results))
+    rows = []
+    for site, n, site_results in entries:
+        row = {'Merkez': site, 'n': n}
+        if site_results.get('error'):
+            row.update({'FAZ 1': 'Analiz edilemedi', **{title: np.nan for title in p_columns.values()},
+                        'Düzeltme': site_results['error']})
+        else:
+            row['FAZ 1'] = 'Denk' if site_results['faz1_is_denk'] else 'Denk değil: ' + ", ".join(site_results['faz1_failed_vars_display_names'])
+            row.update({title: site_results[key] for key, title in p_columns.items()})
+            row['Düzeltme'] = site_results['correction_applied'].lstrip(' +') or '-'
+        rows.append(row)
+    return rows
+
+def _pdf_table(pdf, widths, headers, rows):
+    """Kenarlıklı tablo; hücreye sığmayan metin '...' ile kısaltılır."""
+    _pdf_style(pdf, 'tablo_basligi')
+    for width, header in zip(widths, headers):
+        pdf.cell(width, 6, normalize_for_pdf(header), border=1, align="C")
+    pdf.ln()
+    _pdf_style(pdf, 'tablo')
+    for values in rows:
+        for width, value in zip(widths, values):
+            text = normalize_for_pdf(value)
+            while len(text) > 3 and pdf.get_string_width(text) > width - 2:
+                text = text[:-4] + '...'
+            pdf.cell(width, 6, text, border=1)
+        pdf.ln()
+
+def _pdf_p_cells(row, p_titles):
+    return ['-' if pd.isna(row[title]) else f"{row[title]:.4f}" for title in p_titles]
+
+def _pdf_strata_table(pdf, results, plan):
+    p_titles = list(plan.p_value_titles.values())
+    widths = [34, 12, 38] + [85 / len(p_titles)] * len(p_titles) + [21]
+    headers = ['Merkez', 'n', 'FAZ 1'] + p_titles + ['Duzeltme']
+    _pdf_table(pdf, widths, headers, [[str(row['Merkez']), str(row['n']), row['FAZ 1'], *_pdf_p_cells(row, p_titles), row['Düzeltme']]
+                                      for row in stratified_summary_rows(results, plan)])
+
+def _pdf_sensitivity_table(pdf, results, plan):
+    p_titles = list(plan.p_value_titles.values())
+    widths = [55, 50] + [85 / len(p_titles)] * len(p_titles)
+    headers = ['Duzeltme seti', 'Kovaryantlar'] + p_titles
+    _pdf_table(pdf, widths, headers, [[row['Düzeltme seti'], row['Kovaryantlar'], *_pdf_p_cells(row, p_titles)]
+                                      for row in sensitivity_summary_rows(results['sensitivity'], plan)])
+
+def _pdf_longitudinal_table(pdf, results):
+    format_value = lambda value, spec: '-' if pd.isna(value) else format(value, spec)
+    widths = [40, 20, 26, 40, 20, 24, 20]
+    headers = ['Olcum', 'Zaman', 'Fark (M - K)', 'Guven araligi', 'p', 'Degisim farki', 'Degisim p']
+    _pdf_table(pdf, widths, headers, [
+        [row['Ölçüm'], row['Zaman'], format_value(row['Fark (M - K)'], '.3f'),
+         '-' if pd.isna(row['GA alt']) else f"{row['GA alt']:.3f} / {row['GA üst']:.3f}", format_value(row['p'], '.4f'),
+         format_value(row['Değişim farkı'], '.3f'), format_value(row['Değişim p'], '.4f')]
+        for row in longitudinal_summary_rows(results['longitudinal'])])
+
+# PDF eklerinde grafik türüne göre (yükseklik, sonraki satıra boşluk); yarım genişlikteki türler ikişer yan yana yerleşir
+PDF_CHART_SIZES = {'pasta': (65, 70), 'kutu': (70, 75), 'sutun': (70, 75), 'cizgi': (80, 85), 'likert': (90, 95), 'isi_haritasi': (100, 105)}
+PDF_HALF_WIDTH_CHARTS = ('pasta', 'kutu', 'sutun')
+
+def _pdf_chart_rows(pdf, images, charts):
+    """[(ad, tür), ...] grafiklerini satırlara yerleştirir: yarım genişliktekiler çiftler halinde, diğerleri tam genişlikte."""
+    rows, pending = [], []
+    for name, chart_type in charts:
+        if chart_type in PDF_HALF_WIDTH_CHARTS:
+            pending.append((name, chart_type))
+            if len(pending) == 2:
+                rows.append(pending); pending = []
+        else:
+            if pending:
+                rows.append(pending); pending = []
+            rows.append([(name, chart_type)])
+    if pending:
+        rows.append(pending)
+    gap = None
+    for row in rows:
+        if gap is not None:
+            pdf.ln(gap)
+        height, gap = max(PDF_CHART_SIZES[chart_type] for _, chart_type in row)
+        if row[0][1] in PDF_HALF_WIDTH_CHARTS:
+            for (name, _), x in zip(row, (10, 110)):
+                pdf.image(chart_image(images, name), w=90, h=height, x=x)
+        else:
+            pdf.image(chart_image(images, row[0][0]), w=190, h=height)
+
+# --- 4.1 PDF BÖLÜM ŞABLONLARI ---
+# Rapor bağımsız bölümlerden oluşur (metin, merkezler, duyarlılık, her ek); her bölüm yeni sayfada başlar ve yalnızca kendi
+# girdilerine bağlıdır. Bölümler ayrı ayrı oluşturulup içerik özetiyle önbelleğe alınır ve pypdf ile birleştirilir:
+# bir hipotez sonucu değiştiğinde yalnızca metin bölümü yeniden dizilir, grafik ekleri önbellekten gelir.
+PDF_LAYOUT_VERSION = 1  # bölüm şablonları değiştiğinde artırılır (önbellekteki eski bölümler kullanılmaz)
+PDF_SPOOL_MAX_BYTES = 4 * 1024 * 1024  # bu boyuta kadar rapor bellekte, ötesi geçici dosyada tutulur
+PDF_FONT = "Arial"
+
+# Metin biçimleri: ad -> (stil, punto, metin rengi). Bölümler yazı tipini ve rengi satır satır değil, bu adlarla seçer.
+PDF_STYLES = {
+    'belge_basligi': ('B', 16, (0, 0, 0)),
+    'bolum_basligi': ('B', 14, (0, 0, 0)),
+    'hipotez_grubu': ('B', 12, (0, 0, 0)),
+    'govde': ('', 10, (0, 0, 0)),
+    'basarili': ('', 10, (0, 100, 0)),
+    'basarisiz': ('', 10, (255, 165, 0)),
+    'duzeltme': ('B', 10, (200, 0, 0)),
+    'not': ('I', 9, (0, 0, 0)),
+    'aciklama': ('', 9, (0, 0, 0)),
+    'tablo_basligi': ('B', 7, (0, 0, 0)),
+    'tablo': ('', 7, (0, 0, 0)),
+    'hata': ('B', 14, (255, 0, 0)),
+}
+
+def _pdf_style(pdf, name):
+    style, size, color = PDF_STYLES[name]
+    pdf.set_font(PDF_FONT, style, size)
+    pdf.set_text_color(*color)
+
+def _pdf_text_section(pdf, results, plan):
+    """Başlık, FAZ 1, FAZ 2 ve nihai yorum."""
+    pdf.add_page()
+    _pdf_style(pdf, 'belge_basligi')
+    pdf.cell(0, 10, "Ebelik Arastirmasi Istatistiksel Analiz Raporu", ln=True, align="C")
+    pdf.ln(5)
+
+    # --- FAZ 1 Raporu ---
+    _pdf_style(pdf, 'bolum_basligi')
+    pdf.cell(190, 10, "FAZ 1: Baslangic Denkligi Raporu", ln=True)
+    if results['faz1_is_denk']:
+        _pdf_style(pdf, 'basarili'); pdf.multi_cell(190, 5, normalize_for_pdf("SONUC: Randomizasyon BASARILI (Tum p > 0.05)"))
+        _pdf_style(pdf, 'govde'); pdf.multi_cell(190, 5, normalize_for_pdf(
+            "Yorum: Gruplar arasi anlamli bir baslangic farki bulunamamistir. "
+            "Bu, gruplarin homojen (denk) oldugunu ve arastirmanin ic gecerliliginin "
+            "yuksek oldugunu gosterir."
+        ))
+    else:
+        _pdf_style(pdf, 'basarisiz'); pdf.multi_cell(190, 5, normalize_for_pdf("SONUC: Randomizasyon BASARISIZ (p < 0.05)"))
+        _pdf_style(pdf, 'govde'); failed_vars_str = ", ".join(results['faz1_failed_vars_display_names'])
+        pdf.multi_cell(190, 5, normalize_for_pdf(
+            f"Neden Kaynakli?: Analiz, '{failed_vars_str}' degisken(ler)i acisindan anlamli bir fark tespit etmistir."
+        ))
+    pdf.ln(5)
+
+    # --- FAZ 2 Raporu ---
+    _pdf_style(pdf, 'bolum_basligi')
+    pdf.cell(190, 10, "FAZ 2: Hipotez Testleri Raporu (ANCOVA)", ln=True)
+    if results['correction_applied']:
+        _pdf_style(pdf, 'duzeltme')
+        pdf.multi_cell(190, 5, normalize_for_pdf(
+            f"DIKKAT: ISTATISTIKSEL DUZELTME UYGULANDI.\nFAZ 1'deki denklik hatasi nedeniyle su degisken(ler) analize 'kovaryant' "
+            f"olarak eklenmistir: {results['correction_applied']}"
+        ))
+        pdf.ln(2)
+    if results.get('resampling'):
+        _pdf_style(pdf, 'not')
+        pdf.multi_cell(190, 5, normalize_for_pdf(
+            f"Yeniden örnekleme çıkarımı: {results['resampling']['n_permutations']} permütasyon, "
+            f"{results['resampling']['n_bootstrap']} bootstrap örneklemi (tohum: {results['resampling']['seed']})."
+        ))
+    if results.get('imputation'):
+        _pdf_style(pdf, 'not')
+        pdf.multi_cell(190, 5, normalize_for_pdf(
+            f"Çoklu atama: {results['imputation']['n_missing_cells']} eksik hücre zincirleme denklemlerle "
+            f"{results['imputation']['m']} kez atanmış, sonuçlar Rubin kurallarıyla birleştirilmiştir (tohum: {results['imputation']['seed']})."
+        ))
+
+    # FAZ 2 Sonuçları (hipotez grupları çalışma tanımından)
+    for group in plan.hypothesis_groups:
+        _pdf_style(pdf, 'hipotez_grubu'); pdf.cell(190, 8, normalize_for_pdf(f"[{group['title']}]"), ln=True)
+        _pdf_style(pdf, 'govde')
+        for test in group['tests']:
+            p = results[test['key']]
+            pdf.cell(190, 5, normalize_for_pdf(f"- {test['label']} Sonucu: {'DESTEKLENDI' if p < 0.05 else 'Reddedildi'} (p-degeri: {p:.6f})"), ln=True)
+            _pdf_inference_lines(pdf, results, test['key'])
+    pdf.ln(5)
+
+    # --- Nihai Yorum ---
+    _pdf_style(pdf, 'bolum_basligi'); pdf.cell(190, 10, "Nihai Rapor Yorumu (Analist Ozeti)", ln=True)
+    _pdf_style(pdf, 'govde')
+    pdf.multi_cell(190, 5, normalize_for_pdf(results['final_report_text']))
+
+def _pdf_strata_section(pdf, results, plan):
+    """Çok merkezli analiz: merkez bazlı ve birleşik sonuç tablosu."""
+    pdf.add_page()
+    _pdf_style(pdf, 'bolum_basligi')
+    pdf.cell(190, 10, normalize_for_pdf(f"Merkez Bazlı Sonuçlar (Tabaka: {results['strata']['column']})"), ln=True)
+    _pdf_style(pdf, 'aciklama')
+    pdf.multi_cell(190, 5, normalize_for_pdf(
+        "Her merkez için FAZ 1 / FAZ 2 ayrı ayrı çalıştırılmıştır. Birleşik satır, raporun geri kalanındaki "
+        f"modeldir: tüm merkezler, FAZ 2'ye {results['strata_term'].lstrip(' +')} terimi eklenerek birlikte analiz edilmiştir."
+    ))
+    pdf.ln(2)
+    _pdf_strata_table(pdf, results, plan)
+
+def _pdf_sensitivity_section(pdf, results, plan):
+    """Duyarlılık analizi: düzeltme seti başına p-değerleri ve hipotez başına sağlamlık özeti."""
+    pdf.add_page()
+    _pdf_style(pdf, 'bolum_basligi')
+    pdf.cell(190, 10, normalize_for_pdf("Duyarlılık Analizi (Alternatif Düzeltme Setleri)"), ln=True)
+    _pdf_style(pdf, 'aciklama')
+    pdf.multi_cell(190, 5, normalize_for_pdf(
+        "FAZ 2 hipotezleri farklı kovaryant setleriyle yeniden kurulmuştur: düzeltmesiz, FAZ 1 p-değeri eşiğine göre "
+        "seçilen kovaryantlar ve tüm başlangıç kovaryantları. Ana model, raporun geri kalanındaki (p < 0.05) düzeltmedir."
+    ))
+    pdf.ln(2)
+    _pdf_sensitivity_table(pdf, results, plan)
+    pdf.ln(3)
+    _pdf_style(pdf, 'govde')
+    for line in robustness_lines(results['sensitivity'], plan):
+        pdf.cell(190, 5, normalize_for_pdf(f"- {line}"), ln=True)
+
+def _pdf_longitudinal_section(pdf, results, plan):
+    """Tekrarlı ölçümler: zaman başına grup farkları ve grup × zaman karma modeli özeti."""
+    longitudinal = results['longitudinal']
+    pdf.add_page()
+    _pdf_style(pdf, 'bolum_basligi')
+    pdf.cell(190, 10, normalize_for_pdf("Tekrarlı Ölçümler (Grup × Zaman Karma Modeli)"), ln=True)
+    _pdf_style(pdf, 'aciklama')
+    pdf.multi_cell(190, 5, normalize_for_pdf(
+        f"Her ölçüm için tüm zamanlar tek bir karma modelde (katılımcı başına rastgele sabit, REML) analiz edilmiştir. "
+        f"Fark: {longitudinal['groups']['mudahale']} - {longitudinal['groups']['kontrol']} ortalaması "
+        f"(%{longitudinal['ci_level'] * 100:.0f} güven aralığı); değişim farkı: başlangıca göre değişimin gruplar arası farkı."
+    ))
+    pdf.ln(2)
+    _pdf_longitudinal_table(pdf, results)
+    pdf.ln(3)
+    _pdf_style(pdf, 'govde')
+    for line in longitudinal_model_lines(longitudinal):
+        pdf.cell(190, 5, normalize_for_pdf(f"- {line}"), ln=True)
+
+def _pdf_appendix_section(pdf, appendix, images, plan):
+    """Bir ek sayfası: dashboard grafikleri (rasterleştirilemeyen grafik varsa hata satırı)."""
+    pdf.add_page()
+    _pdf_style(pdf, 'bolum_basligi')
+    pdf.cell(190, 10, normalize_for_pdf(appendix['title']), ln=True)
+    try:
+        _pdf_chart_rows(pdf, images, [(name, plan.charts[name]['tur']) for name in appendix['charts']])
+    except Exception as e:
+        _pdf_style(pdf, 'hata'); pdf.cell(190, 10, normalize_for_pdf(f"{appendix['error_label']} olusturulamadi: {e}"), ln=True)
+
+def _image_digest(png):
+    if isinstance(png, Exception):
+        return f"{type(png).__name__}: {png}"
+    return hashlib.sha256(png).hexdigest()
+
+def pdf_sections(results, images, plan=None):
+    """[(ad, içerik özeti, çizim fonksiyonu), ...]: raporun bölümleri sayfa sırasıyla.
+
+    Özet, bölümün yalnızca kendi girdilerinden (ve plan / şablon sürümünden) üretilir.
+    """
+    plan = plan or DEFAULT_PLAN
+    prefix = f"{PDF_LAYOUT_VERSION}|{plan.key}"
+    text_results = {key: value for key, value in results.items() if key not in ('strata', 'sensitivity', 'longitudinal')}
+    sections = [('metin', f"{prefix}|metin|{results_to_json(text_results, sort_keys=True)}", lambda pdf: _pdf_text_section(pdf, results, plan))]
+    if results.get('strata'):
+        sections.append(('merkezler', f"{prefix}|merkezler|{results_to_json([results['strata'], results['strata_term']], sort_keys=True)}",
+                         lambda pdf: _pdf_strata_section(pdf, results, plan)))
+    if results.get('sensitivity'):
+        sections.append(('duyarlilik', f"{prefix}|duyarlilik|{results_to_json(results['sensitivity'], sort_keys=True)}",
+                         lambda pdf: _pdf_sensitivity_section(pdf, results, plan)))
+    if results.get('longitudinal'):
+        sections.append(('tekrarli', f"{prefix}|tekrarli|{results_to_json(results['longitudinal'], sort_keys=True)}",
+                         lambda pdf: _pdf_longitudinal_section(pdf, results, plan)))
+    for i, appendix in enumerate(plan.pdf_appendices, start=1):
+        digest = json.dumps([appendix, [(name, plan.charts[name]['tur'], _image_digest(images[name])) for name in appendix['charts']]],
+                            ensure_ascii=False, sort_keys=True)
+        sections.append((f'ek{i}', f"{prefix}|ek|{digest}", lambda pdf, appendix=appendix: _pdf_appendix_section(pdf, appendix, images, plan)))
+    return sections
+
+def _render_pdf_section(draw):
+    from fpdf import FPDF
+    pdf = FPDF()
+    draw(pdf)
+    return bytes(pdf.output())
+
+def write_pdf_report(results, charts, out, images=None, plan=None, cache=None):
+    """Raporu bölüm bölüm oluşturup `out` (ikili dosya nesnesi) içine yazar ve `out`'u döndürür.
+
+    Bölümler içerik özetleriyle önbelleğe alınır (cache verilmezse paylaşılan
+    sonuç önbelleği, cache=False ise önbelleksiz). pypdf kurulu değilse rapor
+    tek bir FPDF belgesinde, bölüm önbelleği olmadan oluşturulur.
+    """
+    plan = plan or DEFAULT_PLAN
+    if cache is None:
+        cache = get_result_cache()
+    with stage('pdf.raster', rows=len(charts)):
+        # Tüm grafikler tek seferde, eşzamanlı ve önbellekli olarak PNG'ye çevrilir
+        if images is None:
+            images = render_pngs(charts, cache=cache or None)
+    sections = pdf_sections(results, images, plan)
+
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        from fpdf import FPDF
+        pdf = FPDF()
+        for name, _, draw in sections:
+            with stage(f'pdf.{name}'):
+                draw(pdf)
+        with stage('pdf.cikti'):
+            out.write(pdf.output())
+        return out
+
+    writer = PdfWriter()
+    for name, digest, draw in sections:
+        key = make_bytes_key(digest, 'pdf_section')
+        section_pdf = cache.get(key) if cache else None
+        with stage(f'pdf.{name}' if section_pdf is None else f'pdf.{name}.onbellek'):
+            if section_pdf is None:
+                section_pdf = _render_pdf_section(draw)
+                if cache:
+                    cache.set(key, section_pdf)
+            writer.append(io.BytesIO(section_pdf))
+    with stage('pdf.cikti'):
+        writer.write(out)
+    return out
+
+def create_pdf_report_file(results, charts, images=None, plan=None):
+    """Raporu başa sarılmış bir SpooledTemporaryFile olarak döndürür (PDF_SPOOL_MAX_BYTES üstü diske taşar)."""
+    out = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
+    write_pdf_report(results, charts, out, images=images, plan=plan)
+    out.seek(0)
+    return out
+
+def create_pdf_report(results, charts, images=None, plan=None):
+    """Raporun baytları (küçük raporlar ve geriye dönük uyumluluk için; büyük çıktılarda write_pdf_report tercih edilir)."""
+    return write_pdf_report(results, charts, io.BytesIO(), images=images, plan=plan).getvalue()
+
+# --- 5. BACKEND: NİHAİ İSTATİSTİK MOTORU (HESAPLAMA) ---
+# FAZ 1'de denkliği bozulduğunda FAZ 2 modellerine kovaryant olarak eklenen değişkenler (görünen ad -> sütun)
+CORRECTION_COLUMNS_BY_LABEL = DEFAULT_PLAN.correction_columns_by_label
+
+def prepare_analysis_frame(df_data, plan=None):
+    """Analiz öncesi doğrulama: (temiz tablo, None) veya (None, hata mesajı) döndürür."""
+    plan = plan or DEFAULT_PLAN
+    missing_cols = [col for col in plan.all_required_columns if col not in df_data.columns]
+    if missing_cols:
+        return None, missing_columns_error(missing_cols)
+    
+    # ingest.prepare_study'den gelen tablo zaten temizdir; yalnızca ham tablolar dönüştürülür (kopya da ancak o zaman alınır)
+    raw_numeric_cols = [col for col in plan.numeric_columns if not pd.api.types.is_numeric_dtype(df_data[col])]
+    df_cleaned = df_data.copy() if raw_numeric_cols else df_data
+    for col in raw_numeric_cols:
+        df_cleaned[col] = pd.to_numeric(df_cleaned[col], errors='coerce')
+        
+    if df_cleaned[plan.numeric_columns].isnull().all().all():
+        return None, "HATA: Analiz edilecek sayısal veri bulunamadı. Yüklediğiniz Excel şablonundaki sayısal sütunlar ('yas', 'korku_vas_baseline' vb.) tamamen boş veya geçersiz metin ('yok', 'N/A' vb.) içeriyor. Lütfen verilerinizi kontrol edin."
+
+    if not df_cleaned[plan.group_col].isin(plan.groups).any():
+        return None, f"HATA: '{plan.group_col}' sütunu bulunamadı veya '{plan.groups[0]}'/'{plan.groups[1]}' değerleri yanlış yazılmış. Lütfen şablonu kontrol edin."
+    return df_cleaned, None
+
+def record_faz1_results(results, p_values_numeric, p_values_categoric, plan=None):
+    """FAZ 1 p-değerlerini sonuçlara yazar ve FAZ 2 için düzeltme kovaryantlarını [(sütun, kategorik_mi), ...] döndürür."""
+    results['faz1_numeric_p_values'] = p_values_numeric
+    results['faz1_categoric_p_values'] = p_values_categoric
+    
+    all_p_values_dict = {**p_values_numeric, **p_values_categoric}
+    failed_vars_display_names = [var_name for var_name, p in all_p_values_dict.items() if p < 0.05]
+    results['faz1_is_denk'] = len(failed_vars_display_names) == 0
+    results['faz1_failed_vars_display_names'] = failed_vars_display_names 
+    
+    # --- DİNAMİK DÜZELTME MOTORU ---
+    correction_covariates = []
+    if not results['faz1_is_denk']:
+        plan = plan or DEFAULT_PLAN
+        for var_name in failed_vars_display_names:
+            col_name = plan.correction_columns_by_label.get(var_name)
+            if col_name: 
+                correction_covariates.append((col_name, col_name in plan.categoric_columns))
+    results['correction_applied'] = covariates_to_formula(correction_covariates)
+    return correction_covariates
+
+def record_faz2_results(results, faz2_models):
+    for key, model_stats in faz2_models.items():
+        results[key] = model_stats['p_value']
+    results['faz2_models'] = faz2_models
+
+def write_final_report(results, plan=None):
+    """Akıllı Yorum v2.0: FAZ 1 / FAZ 2 sonuçlarından nihai rapor başlığını ve metnini oluşturur."""
+    plan = plan or DEFAULT_PLAN
+    h_p_values = [results[key] for key, _, _ in plan.hypothesis_tests]
+    faz2_basarili = any(p < 0.05 for p in h_p_values)
+    
+    final_report_text = ""
+    if results['faz1_is_denk'] and faz2_basarili:
+        results['final_report_title'] = "NİHAİ SONUÇ: Güçlü Bulgular (Pozitif)"
+        final_report_text = f"Yorum: Araştırma, gruplar arasında tam denklik (FAZ 1) sağlamıştır. İstatistiksel analizler (FAZ 2), müdahale grubunda {plan.outcome_phrase} anlamlı bir azalma olduğunu doğrulamıştır. Bu bulgular, {plan.intervention_phrase}, protokolde hedeflenen bağımlı değişkenler üzerinde anlamlı ve pozitif bir etkiye sahip olduğunu güçlü bir şekilde desteklemektedir."
+    elif not results['faz1_is_denk'] and faz2_basarili:
+        results['final_report_title'] = "NİHAİ SONUÇ: Düzeltilmiş Bulgular (Pozitif)"
+        failed_vars_str = ", ".join(results['faz1_failed_vars_display_names'])
+        final_report_text = f"Yorum: Hipotezler (FAZ 2) müdahale lehine çıksa da, FAZ 1 denklik testlerinde ({failed_vars_str}) başarısızlık tespit edilmiştir. Bu 'karıştırıcı değişkenler', FAZ 2 ANCOVA analizine otomatik olarak eklenerek etkileri 'kontrol altına alınmıştır'. Düzeltilmiş sonuçlar, müdahalenin (denklik hatalarına rağmen) pozitif bir etkiye sahip olduğunu desteklemektedir."
+    elif results['faz1_is_denk'] and not faz2_basarili:
+        results['final_report_title'] = "NİHAİ SONUÇ: Etkisiz Müdahale (Nötr Bulgular)"
+        final_report_text = f"Yorum: Araştırma, gruplar arasında tam denklik (FAZ 1) sağlamış olmasına rağmen, hipotez testleri (FAZ 2) müdahalenin istatistiksel olarak anlamlı bir fark yaratmadığını (p > 0.05) göstermiştir. Bu bulgular, {plan.intervention_phrase}, bu çalışmanın koşulları ve örneklemi üzerinde ölçülebilir bir etkiye sahip olmadığını göstermektedir."
+    else: # not faz1_is_denk and not faz2_basarili
+        results['final_report_title'] = "NİHAİ SONUÇ: Sonuçsuz Bulgular (Geçersiz)"
+        final_report_text = "Yorum: Araştırma hem FAZ 1 denklik testlerinde başarısız olmuş hem de FAZ 2 hipotez testlerinde anlamlı bir sonuç üretememiştir. Gruplar arasındaki başlangıç farkları ve müdahalenin etkisizliği nedeniyle, araştırma sonuçları 'geçersiz' (inconclusive) kabul edilmelidir."
+    
+    results['final_report_text'] = final_report_text.strip()
+    results['error'] = None
+
+def run_full_analysis(df_data, ancova_method=ANALYSIS_CONFIG['ancova_yontemi'], resampling=None, strata_col=None, imputation=None, plan=None,
+                      sensitivity=None, longitudinal=None):
+    """FAZ 1 + dinamik düzeltme + FAZ 2 (+ opsiyonel yeniden örnekleme / çoklu atama / duyarlılık taraması / tekrarlı ölçümler) ve nihai yorum.
+
+    strata_col: çok merkezli birleşik (pooled) modelde FAZ 2'ye her zaman eklenen
+    merkez / tabaka sütunu (kategorik kovaryant olarak).
+    plan: çalışma tanımı (StudyPlan); verilmezse varsayılan protokol kullanılır.
+    """
+    plan = plan or DEFAULT_PLAN
+    results = {} 
+    
+    with stage('dogrulama', rows=len(df_data)):
+        df_cleaned, error = prepare_analysis_frame(df_data, plan)
+    if error:
+        return {'error': error}
+    if strata_col is not None and strata_col not in df_cleaned.columns:
+        return {'error': f"HATA: Merkez / tabaka sütunu '{strata_col}' yüklenen dosyada bulunamadı."}
+
+    # --- FAZ 1 HESAPLAMALARI (Denklik) ---
+    # Tüm t-testleri ve ki-kare testleri tek bir vektörel geçişte hesaplanır.
+    with stage('faz1', rows=len(df_cleaned)):
+        p_values_numeric, p_values_categoric = run_equivalence_tests(
+            df_cleaned, plan.faz1_numeric_labels, plan.faz1_categoric_labels, group_col=plan.group_col,
+            labels=plan.faz1_labels, groups=plan.groups
+        )
+        correction_covariates = record_faz1_results(results, p_values_numeric, p_values_categoric, plan)
+    strata_covariates = []
+    if strata_col is not None:
+        strata_covariates = [(strata_col, True)]
+        results['strata_term'] = covariates_to_formula(strata_covariates)
+        correction_covariates = strata_covariates + correction_covariates
+    
+    # --- FAZ 2 HESAPLAMALARI (Toplu ANCOVA Motoru) ---
+    # Grup ve düzeltme sütunları bir kez kurulur; tüm hipotezlerin Tip-III grup F testi birlikte çözülür.
+    with stage('faz2', rows=len(df_cleaned)):
+        faz2_models = fit_group_ancova_batch(df_cleaned, plan.hypothesis_tests, group_col=plan.group_col,
+                                             covariates=correction_covariates, method=ancova_method)
+        record_faz2_results(results, faz2_models)
+
+    # --- FAZ 2 YENİDEN ÖRNEKLEME (opsiyonel): permütasyon p-değerleri + bootstrap güven aralıkları ---
+    if resampling:
+        with stage('yeniden_ornekleme', rows=len(df_cleaned)):
+            results['resampling'] = run_resampling_inference(df_cleaned, plan.hypothesis_tests, group_col=plan.group_col,
+                                                             covariates=correction_covariates, config=resampling)
+
+    # --- FAZ 2 ÇOKLU ATAMA (opsiyonel): eksik değerli katılımcılar çıkarılmadan, Rubin kurallarıyla ---
+    if imputation:
+        with stage('coklu_atama', rows=len(df_cleaned)):
+            results['imputation'] = run_multiple_imputation(df_cleaned, plan.numeric_columns, plan.categoric_columns, plan.hypothesis_tests,
+                                                            group_col=plan.group_col, covariates=correction_covariates, config=imputation)
+
+    # --- FAZ 2 DUYARLILIK TARAMASI (opsiyonel): alternatif düzeltme setleri, ortak tasarım sütunlarıyla ---
+    if sensitivity:
+        with stage('duyarlilik', rows=len(df_cleaned)):
+            results['sensitivity'] = run_sensitivity_analysis(
+                df_cleaned, plan.hypothesis_tests, {**p_values_numeric, **p_values_categoric}, correction_covariates, plan,
+                group_col=plan.group_col, fixed_covariates=strata_covariates, config=sensitivity, primary_models=faz2_models
+            )
+
+    # --- TEKRARLI ÖLÇÜMLER (opsiyonel): grup × zaman karma modeli, grafiklerle paylaşılan uzun tablodan ---
+    if longitudinal and plan.repeated_measures:
+        with stage('tekrarli_olcum', rows=len(df_cleaned)):
+            results['longitudinal'] = run_longitudinal_analysis(df_cleaned, plan, config=longitudinal)
+    
+    write_final_report(results, plan)
+    return results
+
+# --- 6. BACKEND: GÖRSEL OLUŞTURMA MOTORU (grafik başına, isteğe bağlı) ---
+# Bu satır sayısının üzerinde kutu / sütun grafikleri tüm noktalar yerine sunucuda hesaplanan özetlerle çizilir
+AGGREGATE_CHARTS_MIN_ROWS = 5000
+
+# Varsayılan protokolün dashboard bölümleri ve grafikleri (PDF ekleri de bu adları kullanır)
+DASHBOARD_SECTIONS = {name: section['charts'] for name, section in DEFAULT_PLAN.dashboard_sections.items()}
+CHART_NAMES = DEFAULT_PLAN.chart_names
+
+
+def normalize_chart_frame(df_charts, plan=None):
+    """Kategorik sütunları grafikler için normalize eder (sayısal sütunlar kopyalanmadan paylaşılır)."""
+    plan = plan or DEFAULT_PLAN
+    df_norm = df_charts.copy(deep=False)
+    for col in plan.categoric_columns:
+        df_norm[col] = _normalized_categorical(df_norm[col])
+    return df_norm
+
+
+def _normalized_categorical(series):
+    """Kategori tablosu bir kez normalize edilir; satırlar yalnızca yeniden eşlenen kodlarla taşınır.
+
+    Etiketler metin olarak sıralanır ve eksik değerler 'nan' etiketini alır
+    (astype(str) ile aynı görünüm); normalize edildiğinde aynı yazılan
+    kategoriler (ör. 'Üniversite' / 'Universite') tek etikette birleşir.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    codes = series.cat.codes.to_numpy()
+    normalized = [normalize_for_pdf(str(value)) for value in series.cat.categories]
+    missing_label = 'nan' if (codes == -1).any() else None
+    labels = sorted(set(normalized) | ({missing_label} if missing_label else set()))
+    position = {label: i for i, label in enumerate(labels)}
+    # Son eleman eksik değerler içindir: kod -1, dizinin son elemanını seçer
+    lookup = np.array([position[label] for label in normalized] + [position.get(missing_label, 0)])
+    return pd.Series(pd.Categorical.from_codes(lookup[codes], categories=labels), index=series.index, name=series.name)
+
+
+def use_aggregated_charts(df_norm):
+    return len(df_norm) > AGGREGATE_CHARTS_MIN_ROWS
+
+
+def _category_orders(chart):
+    """Tanımdaki 'sira' listesi, grafik verisiyle aynı biçimde normalize edilmiş olarak."""
+    if not chart.get('sira'):
+        return {}
+    return {chart['sutun']: [normalize_for_pdf(value) for value in chart['sira']]}
+
+
+# --- 6.1 DASHBOARD ÖZETLERİ (veri seti başına bir kez) ---
+# Her grafik, türüne göre hesaplanan küçük bir özet tablosundan çizilir; tablolar (df_norm, grafik, plan, uzun tablo) alır.
+def _frequency_table(df_charts, col):
+    """Pasta grafiğinin yanındaki sıklık tablosu (özgün etiketlerle, value_counts sırasıyla)."""
+    return df_charts[col].value_counts().reset_index().rename(columns={col: 'Kategori', 'count': 'Sayı (n)'})
+
+
+def _pie_counts(df_norm, chart, plan, long_table):
+    return df_norm[chart['sutun']].value_counts().reset_index()
+
+
+def _box_summary(values):
+    """Plotly'nin kutu grafiği istatistikleri (doğrusal çeyrekler, 1.5 IQR içindeki en uç gözlemler)."""
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    return dict(q1=q1, median=median, q3=q3, mean=values.mean(),
+                lowerfence=values[values >= q1 - 1.5 * iqr].min(), upperfence=values[values <= q3 + 1.5 * iqr].max())
+
+
+def _box_table(df_norm, chart, plan, long_table):
+    """Küçük veride (grup, değer) satırları (tüm noktalar çizilir); büyük veride grup başına beş sayı özeti."""
+    col, group_col = chart['sutun'], plan.group_col
+    if not use_aggregated_charts(df_norm):
+        return df_norm[[group_col, col]].copy()
+    groups = df_norm[group_col].to_numpy()
+    values = df_norm[col].to_numpy(dtype=float)
+    rows = []
+    for group in pd.unique(groups):
+        group_values = values[(groups == group) & ~np.isnan(values)]
+        # Boş gruplar da satır alır (NaN): renk sırası tüm grupların görülme sırasıdır
+        rows.append({group_col: group, **(_box_summary(group_values) if len(group_values) else {})})
+    return pd.DataFrame(rows, columns=[group_col, 'q1', 'median', 'q3', 'mean', 'lowerfence', 'upperfence'])
+
+
+def _group_counts(df_norm, chart, plan, long_table):
+    """(kategori, grup) sayımları; satırlar ilk görülme sırasıyla (ham satırlardan çizilen histogramla aynı sıra)."""
+    return df_norm.groupby([chart['sutun'], plan.group_col], sort=False).size().reset_index(name='count')
+
+
+def _time_labels(chart):
+    return chart.get('zaman_etiketleri') or list(chart['sutunlar'])
+
+
+def _group_codes(df_norm, group_col):
+    """Katılımcı başına grup kodu (eksik = -1) ve sıralı grup etiketleri (groupby ile aynı sıra; yalnızca gözlenen gruplar)."""
+    codes, labels = pd.factorize(df_norm[group_col], sort=True)
+    return codes, np.asarray(labels, dtype=object)
+
+
+def _group_means(df_norm, chart, plan, long_table):
+    """Grup × zaman ortalamaları (uzun tablodan hücre toplamlarıyla)."""
+    columns, times, group_col = chart['sutunlar'], _time_labels(chart), plan.group_col
+    codes, labels = _group_codes(df_norm, group_col)
+    counts, sums = long_table.cell_stats(columns, codes, len(labels))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    return pd.DataFrame({group_col: np.tile(labels, len(columns)), 'Zaman': np.repeat(times, len(labels)),
+                         chart.get('eksen', 'Ortalama Puan'): means.T.ravel()})
+
+
+def _likert_levels(chart):
+    bins = chart.get('sinirlar') or [0, 4, 7, 10.1]
+    levels = [normalize_for_pdf(label) for label in chart.get('duzeyler') or [f"{lo}-{hi}" for lo, hi in zip(bins, bins[1:])]]
+    return bins, levels
+
+
+def _likert_counts(df_norm, chart, plan, long_table):
+    """(grup, zaman, düzey) sayımları uzun tablodan; satırlar ilk görülme sırasıyla (pd.cut + melt + groupby ile aynı)."""
+    columns, times, group_col = chart['sutunlar'], _time_labels(chart), plan.group_col
+    time_axis, level_axis = chart.get('zaman_ekseni', 'Zaman'), chart.get('duzey_ekseni', 'Düzey')
+    bins, levels = _likert_levels(chart)
+    codes, labels = _group_codes(df_norm, group_col)
+    series = long_table.series(columns)
+    groups = codes[series.participant]
+    level = np.searchsorted(bins, series.value, side='right') - 1  # right=False: sinir[i] <= puan < sinir[i + 1]
+    valid = (groups >= 0) & (level >= 0) & (level < len(levels))
+    n_times, n_levels = len(times), len(levels)
+    keys = (groups[valid] * n_times + series.time[valid]) * n_levels + level[valid]
+    unique, first, count = np.unique(keys, return_index=True, return_counts=True)
+    order = np.argsort(first, kind='stable')
+    group_idx, rest = np.divmod(unique[order], n_times * n_levels)
+    time_idx, level_idx = np.divmod(rest, n_levels)
+    return pd.DataFrame({group_col: labels[group_idx], time_axis: np.asarray(times, dtype=object)[time_idx],
+                         level_axis: np.asarray(levels, dtype=object)[level_idx], 'count': count[order]})
+
+
+def _correlation(df_norm, chart, plan, long_table):
+    return df_norm[[col for col in plan.numeric_columns if col in df_norm.columns]].corr()
+
+
+# Grafik türü (çalışma tanımındaki 'tur') -> grafiğin çizildiği özet tablosu
+CHART_SUMMARIES = {
+    'pasta': _pie_counts,
+    'kutu': _box_table,
+    'sutun': _group_counts,
+    'cizgi': _group_means,
+    'likert': _likert_counts,
+    'isi_haritasi': _correlation,
+}
+
+
+class DashboardAggregates:
+    """Dashboard'un veri seti başına bir kez hesaplanan özet tabloları.
+
+    tables: grafik adı -> grafiğin çizildiği küçük tablo (sıklıklar, grup ×
+    kategori sayımları, kutu özetleri, grup × zaman ortalamaları, likert düzey
+    sayımları, korelasyon matrisi). frequencies: pasta sütunu -> dashboard'daki
+    sıklık tablosu. Grafikler ve tablolar bunlardan çizildiğinden yeniden çizim
+    satır sayısına bağlı değildir (kutu grafikleri yalnızca küçük veride tek tek
+    noktaları gösterir). Tablo nesnesinin kendisi tutulmaz.
+    """
+
+    def __init__(self, df_charts, plan=None, long_table=None):
+        plan = plan or DEFAULT_PLAN
+        self.n_rows = len(df_charts)
+        self.group_col = plan.group_col
+        with stage('grafik.ozet', rows=self.n_rows):
+            df_norm = normalize_chart_frame(df_charts, plan)
+            long_table = long_table or get_long_table(df_charts, plan)
+            self.tables = {name: CHART_SUMMARIES[chart['tur']](df_norm, chart, plan, long_table) for name, chart in plan.charts.items()}
+            self.frequencies = {chart['sutun']: _frequency_table(df_charts, chart['sutun'])
+                                for chart in plan.charts.values() if chart['tur'] == 'pasta'}
+        self._site_tables = {}
+
+    def site_table(self, df_charts, strata_col):
+        """Merkez × grup örneklem dağılımı (merkez sütunu başına bir kez)."""
+        if strata_col not in self._site_tables:
+            self._site_tables[strata_col] = pd.crosstab(df_charts[strata_col], df_charts[self.group_col], margins=True,
+                                                        margins_name="Toplam (Birleşik)")
+        return self._site_tables[strata_col]
+
+
+_dashboard_aggregates = {}
+_dashboard_aggregates_lock = threading.Lock()
+
+
+def get_dashboard_aggregates(df_charts, plan=None):
+    """Tablo (nesne) ve plan başına bir kez hesaplanan dashboard özetleri; tablo bellekten silinince önbellekten de düşer."""
+    plan = plan or DEFAULT_PLAN
+    key = (id(df_charts), plan.key)
+    with _dashboard_aggregates_lock:
+        aggregates = _dashboard_aggregates.get(key)
+        if aggregates is None:
+            aggregates = _dashboard_aggregates[key] = DashboardAggregates(df_charts, plan)
+            weakref.finalize(df_charts, _dashboard_aggregates.pop, key, None)
+        return aggregates
+
+
+# --- 6.2 GRAFİK OLUŞTURUCULAR (özet tablosu, grafik, plan) ---
+def _pie_chart(table, chart, plan):
+    import plotly.express as px
+    fig = px.pie(table, names=chart['sutun'], values='count', hole=0.3, title=normalize_for_pdf(chart['baslik']),
+                 category_orders=_category_orders(chart) or None)
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(showlegend=False, margin=dict(t=30, b=20, l=20, r=20))
+    return fig
+
+
+def _box_chart(table, chart, plan):
+    import plotly.express as px
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    col, title, group_col = chart['sutun'], chart['baslik'], plan.group_col
+    if col in table.columns:
+        fig = px.box(table, x=group_col, y=col, color=group_col, title=normalize_for_pdf(title), points="all")
+    else:
+        # Büyük veri: her grup için yalnızca beş sayı özeti tarayıcıya gönderilir
+        colorway = pio.templates[pio.templates.default].layout.colorway or px.colors.qualitative.Plotly
+        fig = go.Figure()
+        for i, row in enumerate(table.to_dict('records')):
+            group = row.pop(group_col)
+            if not np.isnan(row['median']):
+                fig.add_trace(go.Box(x=[group], name=group, marker_color=colorway[i % len(colorway)], boxpoints=False,
+                                     **{stat: [value] for stat, value in row.items()}))
+        fig.update_layout(title=normalize_for_pdf(title), boxmode='overlay', xaxis_title=group_col, yaxis_title=col)
+    fig.update_layout(showlegend=False)
+    return fig
+
+
+def _grouped_bar_chart(table, chart, plan):
+    import plotly.express as px
+    fig = px.histogram(table, x=chart['sutun'], y='count', histfunc='sum', color=plan.group_col, barmode='group',
+                       title=normalize_for_pdf(chart['baslik']), category_orders=_category_orders(chart))
+    fig.update_yaxes(title_text='count')
+    return fig
+
+
+def _line_chart(table, chart, plan):
+    """Gruplara göre ortalama puanların ölçüm zamanlarına göre evrimi."""
+    import plotly.express as px
+    return px.line(table, x='Zaman', y=chart.get('eksen', 'Ortalama Puan'), color=plan.group_col,
+                   title=normalize_for_pdf(chart['baslik']), markers=True, category_orders={'Zaman': _time_labels(chart)})
+
+
+def _likert_chart(table, chart, plan):
+    """Puanların tanımdaki sınırlarla düzeylere ayrılıp gruplara göre yüzde yığılmış dağılımı."""
+    import plotly.express as px
+    time_axis, level_axis = chart.get('zaman_ekseni', 'Zaman'), chart.get('duzey_ekseni', 'Düzey')
+    _, levels = _likert_levels(chart)
+    options = dict(x=time_axis, color=level_axis, facet_col=plan.group_col, barmode='stack', barnorm='percent',
+                   title=normalize_for_pdf(chart['baslik']), category_orders={time_axis: _time_labels(chart), level_axis: levels})
+    if chart.get('renkler'):
+        options['color_discrete_map'] = dict(zip(levels, chart['renkler']))
+    fig = px.histogram(table, y='count', histfunc='sum', **options)
+    fig.update_yaxes(title_text='count (normalized as percent)', selector=dict(anchor='x'))
+    return fig
+
+
+def _heatmap_chart(table, chart, plan):
+    import plotly.express as px
+    return px.imshow(table, text_auto='.2f', aspect="auto", color_continuous_scale='RdBu_r', zmin=-1, zmax=1,
+                     title=normalize_for_pdf(chart['baslik']))
+
+
+# Grafik türü (çalışma tanımındaki 'tur') -> oluşturucu
+CHART_BUILDERS = {
+    'pasta': _pie_chart,
+    'kutu': _box_chart,
+    'sutun': _grouped_bar_chart,
+    'cizgi': _line_chart,
+    'likert': _likert_chart,
+    'isi_haritasi': _heatmap_chart,
+}
+
+
+def build_chart(aggregates, name, plan=None):
+    """Tek bir grafiği veri setinin dashboard özetlerinden (`get_dashboard_aggregates`), çalışma tanımındaki türüne göre oluşturur."""
+    plan = plan or DEFAULT_PLAN
+    chart = plan.charts[name]
+    table = aggregates.tables[name]
+    with stage(f'grafik.{name}', rows=len(table)):
+        return CHART_BUILDERS[chart['tur']](table, chart, plan)
+
+
+
+class LazyCharts(Mapping):
+    """Grafikleri ilk erişimde oluşturan salt-okunur {ad: Figure} eşlemesi.
+
+    Dashboard yalnızca seçilen bölümün grafiklerini ister; PDF raporu ise
+    eksik kalanları tamamlar. dataset_key verilirse her grafik paylaşılan
+    önbelleğe ayrı ayrı (JSON olarak) yazılır ve oradan okunur.
+    """
+
+    def __init__(self, df_charts, dataset_key=None, cache=None, plan=None):
+        self._df = df_charts
+        self._plan = plan or DEFAULT_PLAN
+        self._dataset_key = dataset_key
+        self._cache = cache
+        self._figures = {}
+        self._lock = threading.RLock()  # PDF, indirme isteği sırasında başka bir iş parçacığında oluşturulabilir
+
+    def _cache_key(self, name):
+        return make_bytes_key(f"{self._dataset_key}|{self._plan.key}|{name}".encode(), 'chart')
+
+    def _build(self, name):
+        if self._cache is not None and self._dataset_key:
+            fig_json = self._cache.get(self._cache_key(name))
+            if fig_json is not None:
+                with stage(f'grafik.{name}.onbellek'):
+                    import plotly.io as pio
+                    return pio.from_json(fig_json)
+        fig = build_chart(get_dashboard_aggregates(self._df, self._plan), name, self._plan)
+        if self._cache is not None and self._dataset_key:
+            self._cache.set(self._cache_key(name), fig.to_json())
+        return fig
+
+    def __getitem__(self, name):
+        if name not in self._plan.charts:
+            raise KeyError(name)
+        with self._lock:
+            if name not in self._figures:
+                self._figures[name] = self._build(name)
+            return self._figures[name]
+
+    def __iter__(self):
+        return iter(self._plan.chart_names)
+
+    def __len__(self):
+        return len(self._plan.chart_names)
+
+
+def generate_all_charts(df_charts, plan=None):
+    """Tüm grafikleri hemen oluşturur (komut satırı / PDF için)."""
+    plan = plan or DEFAULT_PLAN
+    aggregates = get_dashboard_aggregates(df_charts, plan)
+    return {name: build_chart(aggregates, name, plan) for name in plan.chart_names}
@@ -0,0 +1,98 @@
+"""Yüklenen bir çalışma dosyasının analiz işi (arayüz ve HTTP API ortak yolu).
+
+`run_analysis_job` JobManager üzerinde çalışır: dosyayı okur, temizler,
+önbellekte yoksa analiz eder ve başarılı sonucu geçmiş kaydına yazar.
+Streamlit'e bağımlı değildir; app.py ve api_server.py aynı fonksiyonu kullanır.
+`run_power_job` güç simülasyonunu aynı şekilde arka plan işi olarak çalıştırır.
+"""
+import json
+import os
+
+from analysis import get_result_cache, run_full_analysis
+from incremental import incremental_state_key, run_incremental_analysis
+from ingest import prepare_study, read_study
+from power import run_power_analysis
+from profiling import StageTrace
+from result_cache import make_bytes_key, make_cache_key
+from results_store import get_results_store
+from stratified import run_stratified_analysis
+from study_spec import get_study_plan
+
+
+def analysis_job_key(file_bytes, filename, analysis_config, use_incremental, perf_options=None):
+    """Aynı dosya + ayarlarla gönderilen işlerin tekilleştirme anahtarı (JobManager.submit key=)."""
+    return make_bytes_key(file_bytes + json.dumps([filename, analysis_config, use_incremental, perf_options or {}],
+                                                  sort_keys=True, default=str).encode(), 'job')
+
+
+def run_analysis_job(progress, file_bytes, filename, analysis_config, use_incremental, perf_options=None, source='arayuz'):
+    """Arka plan işi: dosyayı okur, temizler, analiz eder ve sonucu geçmiş kaydına yazar (Streamlit çağrısı yapmaz).
+
+    perf_options: {'bellek': tracemalloc ile ölç, 'profil': None / 'cprofile' / 'pyinstrument'};
+    profil aracı seçilirse sonuç önbelleği atlanır (analiz gerçekten çalışsın diye).
+    source: geçmiş kaydındaki kaynak etiketi ('arayuz', 'api').
+    """
+    perf_options = perf_options or {}
+    plan = get_study_plan(analysis_config['protokol'])
+    with StageTrace('analiz_isi', track_memory=perf_options.get('bellek', False), profiler=perf_options.get('profil')) as trace:
+        progress(0.05, "Veri okunuyor ve 'yok', '7,0' gibi hatalı girişler temizleniyor...")
+        with trace.stage('okuma') as record:
+            df_raw = read_study(file_bytes, filename=filename)
+            record['satir'] = len(df_raw)
+        try:
+            with trace.stage('temizleme', rows=len(df_raw)):
+                df_cleaned = prepare_study(df_raw, plan)
+        except ValueError as e:
+            return {'results': {'error': str(e)}, 'df_cleaned': df_raw, 'cache_key': None, 'run_id': None, 'trace': trace, 'plan': plan}
+
+        # Aynı veri + ayarlar daha önce (herhangi bir oturumda) analiz edildiyse sonuçları önbellekten al
+        result_cache = get_result_cache()
+        with trace.stage('onbellek', rows=len(df_cleaned)):
+            cache_key = make_cache_key(df_cleaned, analysis_config)
+            cached_entry = None if perf_options.get('profil') else result_cache.get(cache_key)
+        if cached_entry is not None:
+            results = cached_entry['results']
+        else:
+            progress(0.25, "İstatistiksel analiz motoru çalıştırılıyor... (Dinamik Düzeltme yapılıyor...)")
+            strata_col = analysis_config['merkez_sutunu']
+            with trace.stage('analiz', rows=len(df_cleaned)):
+                if strata_col:
+                    results = run_stratified_analysis(df_cleaned, strata_col, ancova_method=analysis_config['ancova_yontemi'],
+                                                      resampling=analysis_config['yeniden_ornekleme'], imputation=analysis_config['coklu_atama'],
+                                                      plan=plan, sensitivity=analysis_config['duyarlilik'],
+                                                      longitudinal=analysis_config['tekrarli_olcum'])
+                elif use_incremental:
+                    state_key = incremental_state_key(filename, analysis_config)
+                    results, state = run_incremental_analysis(df_cleaned, result_cache.get(state_key), resampling=analysis_config['yeniden_ornekleme'],
+                                                              imputation=analysis_config['coklu_atama'], plan=plan,
+                                                              sensitivity=analysis_config['duyarlilik'],
+                                                              longitudinal=analysis_config['tekrarli_olcum'])
+                    if state is not None:
+                        result_cache.set(state_key, state)
+                else:
+                    results = run_full_analysis(df_cleaned, ancova_method=analysis_config['ancova_yontemi'],
+                                                resampling=analysis_config['yeniden_ornekleme'], imputation=analysis_config['coklu_atama'],
+                                                plan=plan, sensitivity=analysis_config['duyarlilik'],
+                                                longitudinal=analysis_config['tekrarli_olcum'])
+            progress(0.9, "Sonuçlar önbelleğe yazılıyor...")
+            with trace.stage('onbellek_yazma'):
+                result_cache.set(cache_key, {'results': results})
+
+        run_id = None
+        if not results.get('error'):
+            with trace.stage('kayit'):
+                run_id = get_results_store().record_run(os.path.splitext(filename)[0], results, input_hash=cache_key, config=analysis_config,
+                                                        n_rows=len(df_cleaned), source=source)
+    return {'results': results, 'df_cleaned': df_cleaned, 'cache_key': cache_key, 'run_id': run_id, 'trace': trace, 'plan': plan}
+
+
+def run_power_job(progress, df_pilot, power_config, plan, cache_key):
+    """Arka plan işi: pilot veriyle güç simülasyonu; başarılı sonuç `cache_key` ile önbelleğe yazılır."""
+    result_cache = get_result_cache()
+    power_results = result_cache.get(cache_key)
+    if power_results is None:
+        progress(0.0, "Sentetik çalışmalar üretiliyor ve analiz ediliyor...")
+        power_results = run_power_analysis(df_pilot, power_config, plan, progress=progress)
+        if not power_results.get('error'):
+            result_cache.set(cache_key, power_results)
+    return power_results
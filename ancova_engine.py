@@ -0,0 +1,318 @@
+"""Toplu (batched) ANCOVA motoru.
+
+FAZ 2 hipotezlerinin tümü aynı yapıdadır: `sonuç ~ grup + ön_test (+ düzeltme
+kovaryantları)`. Bu modül grup ve düzeltme sütunlarını bir kez oluşturur ve
+`grup` terimi için Tip-III F testini doğrudan NumPy ile hesaplar:
+
+    1. Ortak blok W = [sabit, düzeltme kovaryantları] bir kez ortogonalleştirilir.
+    2. Grup kuklaları, tüm sonuç ve ön-test sütunları W'den arındırılır (FWL).
+    3. Her sonuç/ön-test çifti için küçük [grup, ön_test] regresyonları tek bir
+       yığın SVD ile birlikte çözülür.
+
+Grup terimi etkileşim içermediğinden, Tip-III F testi "grup terimi çıkarılmış"
+modelle yapılan iç içe model F testine eşittir; dolayısıyla sonuçlar
+`statsmodels.anova_lm(typ=3)` ile (sayısal tolerans içinde) aynıdır.
+`method='statsmodels'` eski formül yolunu, `method='verify'` ise her iki yolu
+çalıştırıp karşılaştırmayı sağlar.
+"""
+import numpy as np
+import pandas as pd
+
+ANCOVA_METHODS = ('numpy', 'statsmodels', 'verify')
+VERIFY_RTOL = 1e-6
+VERIFY_ATOL = 1e-10
+CROSSPRODUCT_RTOL = 1e-12  # ölçeklenmiş X'X özdeğerleri için göreli rank eşiği
+
+
+def covariates_to_formula(covariates):
+    """[(sütun, kategorik_mi), ...] listesini ' + C(a) + b' formül parçasına çevirir."""
+    return "".join(f" + C({col})" if is_categorical else f" + {col}" for col, is_categorical in covariates)
+
+
+def _dummy_block(values, levels=None):
+    """Kategorik bir sütun için referans (ilk sıralı) düzeyi düşürülmüş kukla matrisi (patsy ile aynı kodlama).
+
+    levels verilirse kodlama bu düzeylerle yapılır; listede olmayan değerler eksik sayılır.
+    """
+    series = pd.Series(values)
+    if levels is not None:
+        codes = pd.Index(levels).get_indexer(series.astype(object))
+    else:
+        try:
+            codes, levels = pd.factorize(series, sort=True)
+        except TypeError:
+            codes, levels = pd.factorize(series.astype(str), sort=True)
+    block = np.zeros((len(series), max(len(levels) - 1, 0)))
+    rows = np.flatnonzero(codes > 0)
+    block[rows, codes[rows] - 1] = 1.0
+    return block, list(levels), codes >= 0
+
+
+def _orthonormal_basis(matrix):
+    """Sütun uzayı için ortonormal taban ve rank (rank eksikliğine dayanıklı, SVD tabanlı)."""
+    if matrix.shape[1] == 0:
+        return matrix, 0
+    u, s, _ = np.linalg.svd(matrix, full_matrices=False)
+    tol = s.max(initial=0.0) * max(matrix.shape) * np.finfo(float).eps
+    rank = int((s > tol).sum())
+    return u[:, :rank], rank
+
+
+class AncovaDesign:
+    """Grup ve düzeltme kovaryantı sütunlarını veri seti başına bir kez oluşturur.
+
+    Aynı tasarım nesnesi birden çok çift (sonuç, ön-test) için yeniden
+    kullanılabilir; eksik değer maskeleri de yalnızca bir kez hesaplanır.
+
+    levels: {sütun: düzey listesi} — verilirse grup ve kategorik kovaryantlar bu
+    düzeylerle kodlanır (ör. artımlı analizde önceki tasarımla aynı sütunlar
+    için). Listede olmayan bir değer görülürse `unknown_levels` True olur.
+    """
+
+    def __init__(self, df, group_col='grup', covariates=(), levels=None):
+        self.group_col = group_col
+        self.covariates = list(covariates)
+        self.n_rows = len(df)
+        self.levels = {}
+        self.unknown_levels = False
+        levels = levels or {}
+
+        def categorical_block(col):
+            values = df[col].to_numpy()
+            block, self.levels[col], ok = _dummy_block(values, levels.get(col))
+            if col in levels:
+                self.unknown_levels |= bool((~ok & pd.notna(values)).any())
+            return block, ok
+
+        self.group_block, self.group_mask = categorical_block(group_col)
+        self.group_levels = self.levels[group_col]
+        blocks, row_ok = [], self.group_mask.copy()
+        self.covariate_masks = []
+        for col, is_categorical in self.covariates:
+            if is_categorical:
+                block, ok = categorical_block(col)
+            else:
+                values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+                ok = ~np.isnan(values)
+                block = np.where(ok, values, 0.0)[:, None]
+            blocks.append(block)
+            self.covariate_masks.append(ok)
+            row_ok &= ok
+        # covariate_block içindeki sütun aralıkları: [sabit] + kovaryant başına bir dilim
+        edges = np.cumsum([1] + [block.shape[1] for block in blocks])
+        self.covariate_slices = [slice(start, stop) for start, stop in zip(edges[:-1], edges[1:])]
+        self.covariate_block = np.hstack([np.ones((self.n_rows, 1))] + blocks)
+        self.base_mask = row_ok
+        self._df = df
+
+    def column(self, col):
+        return pd.to_numeric(self._df[col], errors='coerce').to_numpy(dtype=float)
+
+    def model_arrays(self, outcome, baseline):
+        """Tek bir model için maskelenmiş diziler: (W = [sabit, düzeltmeler, ön_test], G = grup kuklaları, y)."""
+        y, b = self.column(outcome), self.column(baseline)
+        mask = self.base_mask & ~np.isnan(y) & ~np.isnan(b)
+        W = np.column_stack([self.covariate_block[mask], b[mask]])
+        return W, self.group_block[mask], y[mask]
+
+    def crossproducts_by_pattern(self, outcome, baseline):
+        """Eksik kovaryant desenine göre ayrılmış çapraz çarpımlar: {desen: (n, X'X)}.
+
+        X = [grup kuklaları, sabit, kovaryant blokları, ön_test, sonuç]; desen,
+        satırda değeri eksik olan kovaryantların bit maskesidir. Kovaryantların
+        herhangi bir alt kümesiyle kurulan model, o alt kümeden eksik değeri
+        olmayan desenlerin toplamı üzerinden `fit_from_crossproducts` ile çözülür.
+        """
+        y, b = self.column(outcome), self.column(baseline)
+        rows = self.group_mask & ~np.isnan(y) & ~np.isnan(b)
+        patterns = np.zeros(self.n_rows, dtype=np.int64)
+        for bit, ok in enumerate(self.covariate_masks):
+            patterns |= (~ok).astype(np.int64) << bit
+        # Satırlar desene göre sıralanır; her desen tek bir bitişik dilimdir
+        order = np.flatnonzero(rows)
+        order = order[np.argsort(patterns[order], kind='stable')]
+        X = np.column_stack([self.group_block[order], self.covariate_block[order], b[order], y[order]])
+        values, starts, counts = np.unique(patterns[order], return_index=True, return_counts=True)
+        return {int(pattern): (int(count), X[start:start + count].T @ X[start:start + count])
+                for pattern, start, count in zip(values, starts, counts)}
+
+    def fit(self, pairs):
+        """pairs: [(anahtar, sonuç_sütunu, ön_test_sütunu), ...] -> {anahtar: istatistik sözlüğü}."""
+        pairs = list(pairs)
+        if not pairs:
+            return {}
+        outcomes = np.column_stack([self.column(outcome) for _, outcome, _ in pairs])
+        baselines = np.column_stack([self.column(baseline) for _, _, baseline in pairs])
+        masks = self.base_mask[:, None] & ~np.isnan(outcomes) & ~np.isnan(baselines)
+
+        # Aynı eksik-değer desenine sahip çiftler aynı W ortogonalleştirmesini paylaşır
+        mask_groups = {}
+        for j in range(len(pairs)):
+            mask_groups.setdefault(masks[:, j].tobytes(), []).append(j)
+
+        results = {}
+        for idx in mask_groups.values():
+            mask = masks[:, idx[0]]
+            stats_by_idx = _fit_masked(self.covariate_block[mask], self.group_block[mask],
+                                       outcomes[mask][:, idx], baselines[mask][:, idx])
+            for local, j in enumerate(idx):
+                results[pairs[j][0]] = stats_by_idx[local]
+        return {key: results[key] for key, _, _ in pairs}
+
+
+def _fit_masked(W, G, Y, B):
+    """Tek bir satır maskesi altında k adet (sonuç, ön-test) çiftini yığın olarak çözer."""
+    from scipy import stats
+    n, k = Y.shape
+    Qw, rank_w = _orthonormal_basis(W)
+
+    def residualize(M):
+        return M - Qw @ (Qw.T @ M)
+
+    G_r, Y_r, B_r = residualize(G), residualize(Y), residualize(B)
+
+    # Tam model: [grup, ön_test] (W'den arındırılmış) — k adet küçük tasarım, tek yığın SVD
+    X_full = np.concatenate([np.broadcast_to(G_r, (k,) + G_r.shape), B_r.T[:, :, None]], axis=2)
+    U, s, Vt = np.linalg.svd(X_full, full_matrices=False)
+    tol = s.max(axis=1, keepdims=True) * max(n, X_full.shape[2]) * np.finfo(float).eps
+    keep = s > tol
+    rank_full = keep.sum(axis=1)
+    uy = np.einsum('kni,nk->ki', U, Y_r) * keep
+    yy = np.einsum('nk,nk->k', Y_r, Y_r)
+    rss_full = yy - (uy ** 2).sum(axis=1)
+
+    # Kısıtlı model: yalnızca ön_test (W'den arındırılmış)
+    bb = np.einsum('nk,nk->k', B_r, B_r)
+    by = np.einsum('nk,nk->k', B_r, Y_r)
+    b_ok = bb > np.einsum('nk,nk->k', B, B) * n * np.finfo(float).eps
+    rank_restricted = b_ok.astype(int)
+    rss_restricted = yy - np.where(b_ok, by ** 2 / np.where(b_ok, bb, 1.0), 0.0)
+
+    df_num = rank_full - rank_restricted
+    df_resid = n - rank_w - rank_full
+
+    # Grup katsayısı ve standart hatası (yalnızca tek serbestlik dereceli grup için anlamlı)
+    inv_s = np.where(keep, 1.0 / np.where(keep, s, 1.0), 0.0)
+    coef = np.einsum('kij,ki,ki->kj', Vt, inv_s, uy)
+    cov_diag0 = np.einsum('ki,ki->k', Vt[:, :, 0] ** 2, inv_s ** 2)
+
+    out = []
+    for j in range(k):
+        entry = {'n': int(n), 'df_num': int(df_num[j]), 'df_denom': int(df_resid[j]),
+                 'f_value': np.nan, 'p_value': np.nan, 'estimate': np.nan, 'se': np.nan}
+        if df_num[j] > 0 and df_resid[j] > 0:
+            rss_f = max(rss_full[j], 0.0)
+            sigma2 = rss_f / df_resid[j]
+            f_value = ((rss_restricted[j] - rss_f) / df_num[j]) / sigma2 if sigma2 > 0 else np.inf
+            entry['f_value'] = float(f_value)
+            entry['p_value'] = float(stats.f.sf(f_value, df_num[j], df_resid[j]))
+            if G.shape[1] == 1:
+                entry['estimate'] = float(coef[j, 0])
+                entry['se'] = float(np.sqrt(sigma2 * cov_diag0[j]))
+        out.append(entry)
+    return out
+
+
+def fit_from_crossproducts_batch(xtx, xty, yty, n, n_group_cols):
+    """`fit_from_crossproducts`'ın yığın hali: xtx (B, p, p), xty (B, p), yty (B,) -> her anahtar için (B,) dizi.
+
+    Aynı boyuttaki çok sayıda model (ör. güç simülasyonunun bir partisi) tek
+    bir yığın özdeğer ayrışımıyla çözülür; rank her model için ayrı belirlenir.
+    """
+    from scipy import stats
+    xtx, xty, yty = np.asarray(xtx, dtype=float), np.asarray(xty, dtype=float), np.asarray(yty, dtype=float)
+    size, p = xtx.shape[0], xtx.shape[1]
+    out = {'n': np.full(size, int(n)), 'df_num': np.zeros(size, dtype=int), 'df_denom': np.zeros(size, dtype=int),
+           **{stat: np.full(size, np.nan) for stat in ('f_value', 'p_value', 'estimate', 'se')}}
+    if n == 0 or p == 0:
+        return out
+
+    # Sütunlar birim köşegene ölçeklenir; rank ve çözüm özdeğer ayrışımıyla (rank eksikliğine dayanıklı)
+    scale = np.sqrt(np.diagonal(xtx, axis1=1, axis2=2)).copy()
+    scale[scale == 0] = 1.0
+    A = xtx / (scale[:, :, None] * scale[:, None, :])
+    r = xty / scale
+
+    def solve(idx):
+        if len(idx) == 0:
+            return np.zeros(size, dtype=int), yty.copy(), None, None
+        evals, evecs = np.linalg.eigh(A[:, idx[:, None], idx])
+        keep = evals > np.maximum(evals.max(axis=1, keepdims=True), 0.0) * len(idx) * CROSSPRODUCT_RTOL
+        inv_evals = np.where(keep, 1.0 / np.where(keep, evals, 1.0), 0.0)
+        inverse = np.einsum('bik,bk,bjk->bij', evecs, inv_evals, evecs)
+        beta = np.einsum('bij,bj->bi', inverse, r[:, idx])
+        return keep.sum(axis=1), yty - np.einsum('bi,bi->b', r[:, idx], beta), inverse, beta
+
+    rank_full, rss_full, inverse, beta = solve(np.arange(p))
+    rank_restricted, rss_restricted, _, _ = solve(np.arange(n_group_cols, p))
+    df_num, df_resid = rank_full - rank_restricted, int(n) - rank_full
+    out['df_num'], out['df_denom'] = df_num, df_resid
+    ok = (df_num > 0) & (df_resid > 0)
+    if not ok.any():
+        return out
+    rss_full = np.maximum(rss_full, 0.0)
+    sigma2 = np.where(ok, rss_full / np.where(ok, df_resid, 1), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f_value = np.where(sigma2 > 0, ((rss_restricted - rss_full) / np.where(ok, df_num, 1)) / sigma2, np.inf)
+    out['f_value'] = np.where(ok, f_value, np.nan)
+    out['p_value'] = np.where(ok, stats.f.sf(f_value, np.maximum(df_num, 1), np.maximum(df_resid, 1)), np.nan)
+    if n_group_cols == 1:
+        out['estimate'] = np.where(ok, beta[:, 0] / scale[:, 0], np.nan)
+        out['se'] = np.where(ok, np.sqrt(sigma2 * inverse[:, 0, 0]) / scale[:, 0], np.nan)
+    return out
+
+
+def fit_from_crossproducts(xtx, xty, yty, n, n_group_cols):
+    """X = [grup kuklaları, W] için X'X, X'y, y'y ve n yeterli istatistiklerinden `grup` teriminin Tip-III F testi.
+
+    Satır verisine gerek duymadığından, parça parça biriktirilen çapraz
+    çarpımlarla (artımlı analiz) kullanılabilir. Dönen sözlük `_fit_masked` ile
+    aynı anahtarlara sahiptir.
+    """
+    batch = fit_from_crossproducts_batch(np.asarray(xtx, dtype=float)[None], np.asarray(xty, dtype=float)[None],
+                                         np.asarray([yty], dtype=float), n, n_group_cols)
+    return {key: int(values[0]) if key in ('n', 'df_num', 'df_denom') else float(values[0]) for key, values in batch.items()}
+
+
+def _fit_statsmodels(df, pairs, group_col, covariates):
+    """Eski formül yolu (doğrulama modu): her çift için ayrı ols + anova_lm(typ=3)."""
+    import statsmodels.api as sm
+    from statsmodels.formula.api import ols
+
+    correction_formula_part = covariates_to_formula(covariates)
+    results = {}
+    for key, outcome, baseline in pairs:
+        data = df.dropna(subset=[outcome, group_col, baseline])
+        model = ols(f"{outcome} ~ {group_col} + {baseline}" + correction_formula_part, data=data).fit()
+        table = sm.stats.anova_lm(model, typ=3)
+        group_params = [name for name in model.params.index if name.startswith(f"{group_col}[")]
+        entry = {'n': int(model.nobs), 'df_num': int(table.loc[group_col, 'df']), 'df_denom': int(model.df_resid),
+                 'f_value': float(table.loc[group_col, 'F']), 'p_value': float(table.loc[group_col, 'PR(>F)']),
+                 'estimate': np.nan, 'se': np.nan}
+        if len(group_params) == 1:
+            entry['estimate'] = float(model.params[group_params[0]])
+            entry['se'] = float(model.bse[group_params[0]])
+        results[key] = entry
+    return results
+
+
+def fit_group_ancova_batch(df, pairs, group_col='grup', covariates=(), method='numpy'):
+    """Tüm hipotez çiftleri için `grup` teriminin Tip-III F testini döndürür.
+
+    method: 'numpy' (varsayılan, toplu en küçük kareler), 'statsmodels' (eski
+    formül yolu) veya 'verify' (ikisini de çalıştırır, fark varsa RuntimeError).
+    """
+    if method not in ANCOVA_METHODS:
+        raise ValueError(f"Bilinmeyen ANCOVA yöntemi: {method}. Geçerli değerler: {', '.join(ANCOVA_METHODS)}")
+    if method == 'statsmodels':
+        return _fit_statsmodels(df, pairs, group_col, covariates)
+
+    results = AncovaDesign(df, group_col, covariates).fit(pairs)
+    if method == 'verify':
+        reference = _fit_statsmodels(df, pairs, group_col, covariates)
+        for key, ref in reference.items():
+            for stat in ('p_value', 'f_value', 'estimate', 'se'):
+                a, b = results[key][stat], ref[stat]
+                if not (np.isnan(a) and np.isnan(b)) and not np.isclose(a, b, rtol=VERIFY_RTOL, atol=VERIFY_ATOL):
+                    raise RuntimeError(f"ANCOVA doğrulama hatası ({key}, {stat}): numpy={a!r}, statsmodels={b!r}")
+    return results
@@ -0,0 +1,423 @@
+"""Yerel HTTP analiz API'si.
+
+REDCap dışa aktarımları ve iç dashboard gibi araçlar motoru Streamlit
+sayfasına dosya yüklemeden kullanabilsin diye. Yalnızca standart kütüphane
+(http.server) kullanılır; şablon, analiz, grafik ve PDF arayüzün kullandığı
+fonksiyonlarla (create_template_excel, analysis_job.run_analysis_job,
+LazyCharts, create_pdf_report_file) üretilir:
+
+    python api_server.py --port 8502 --isci 4
+
+Uç noktalar:
+
+    GET  /saglik                          sunucu ve iş kuyruğu durumu
+    GET  /protokoller                     tanımlı çalışma tanımları
+    GET  /sablon?protokol=AD              boş veri giriş şablonu (.xlsx)
+    POST /analiz?dosya_adi=veri.xlsx&...  gövde: çalışma dosyası; iş bitince sonuç JSON'u
+                                          (bekle=0 ile hemen 202 + iş kimliği)
+    GET  /isler/<id>                      iş durumu (bittiyse sonuçlar)
+    GET  /isler/<id>/grafikler            grafik adları
+    GET  /isler/<id>/grafikler/<ad>       Plotly grafik JSON'u
+    GET  /isler/<id>/rapor.pdf            PDF raporu (dosyadan parça parça akıtılır)
+    GET  /isler/<id>/paket.zip?grafik=html,svg&pdf=1
+                                          dışa aktarma paketi (export_bundle; JSON / Parquet sonuçlar,
+                                          veri, grafikler; PDF yalnızca pdf=1 ile)
+
+/analiz parametreleri batch_cli seçenekleriyle aynı adları taşır: protokol,
+artimli, merkez_sutunu, ancova_yontemi, yeniden_ornekleme, coklu_atama, tohum,
+duyarlilik (virgülle ayrılmış eşikler), tekrarli_olcum (yöntem).
+
+Analiz, grafik ve PDF işleri sınırlı bir iş havuzunda (JobManager, --isci)
+çalışır; bitmemiş iş sayısı --kuyruk sınırına ulaşınca yeni istekler 503 ile
+geri çevrilir. Aynı gövde + ayarlarla gelen eşzamanlı istekler tek bir işte
+birleşir (anahtar gövdenin özetidir); iş bittikten sonra gelen tekrarlar da
+sonuç önbelleğinden yanıtlanır. Eşzamanlı istemcilerle yük testi için
+benchmarks/load_test.py kullanılır.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from analysis import ANALYSIS_CONFIG, LazyCharts, create_pdf_report_file, create_template_excel, get_result_cache, results_to_json
+from analysis_job import analysis_job_key, run_analysis_job
+from export_bundle import CHART_FORMATS, DEFAULT_CHART_FORMATS, write_export_bundle
+from ancova_engine import ANCOVA_METHODS
+from imputation import DEFAULT_IMPUTATION_CONFIG
+from ingest import SUPPORTED_EXTENSIONS
+from jobs import JOB_DONE, JOB_FAILED, JobManager, JobQueueFull
+from longitudinal import DEFAULT_LONGITUDINAL_CONFIG, LONGITUDINAL_METHODS
+from profiling import configure_logging
+from resampling import DEFAULT_RESAMPLING_CONFIG
+from results_store import get_results_store
+from sensitivity import DEFAULT_SENSITIVITY_CONFIG
+from study_spec import DEFAULT_STUDY, available_study_specs, get_study_plan
+from warmup import start_warmup
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8502
+API_WORKERS = int(os.environ.get('EBELIK_API_WORKERS', min(4, os.cpu_count() or 1)))
+API_MAX_PENDING = int(os.environ.get('EBELIK_API_MAX_PENDING', 32))
+API_MAX_UPLOAD_BYTES = int(os.environ.get('EBELIK_API_MAX_UPLOAD_MB', 200)) * 2 ** 20
+API_WAIT_SECONDS = 600
+PDF_CHUNK_BYTES = 64 * 1024
+# Arayüzdeki sayı girişleriyle aynı sınırlar
+MAX_RESAMPLES, MAX_IMPUTATIONS = 20000, 100
+
+logger = logging.getLogger('ebelik.api')
+
+
+class APIError(Exception):
+    """İstemciye JSON gövdesiyle döndürülen HTTP hatası."""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def _int_param(query, name, default, low, high):
+    value = query.get(name, '')
+    if value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise APIError(400, f"'{name}' bir tam sayı olmalıdır: {value}") from None
+    if not low <= number <= high:
+        raise APIError(400, f"'{name}' {low} ile {high} arasında olmalıdır: {number}")
+    return number
+
+
+def analysis_config_from_query(query):
+    """URL parametrelerinden analiz ayarları (arayüz / batch_cli ile aynı ANALYSIS_CONFIG biçimi); hatalı değerde APIError(400)."""
+    study = query.get('protokol') or DEFAULT_STUDY
+    # Yalnızca specs klasöründeki tanımlar: istemci sunucudaki rastgele bir dosya yolunu okutamaz
+    if study not in available_study_specs():
+        raise APIError(400, f"Çalışma tanımı bulunamadı: '{study}'. Tanımlı protokoller: {', '.join(available_study_specs())}")
+    try:
+        plan = get_study_plan(study)
+    except ValueError as e:
+        raise APIError(400, str(e)) from None
+    config = {**ANALYSIS_CONFIG, 'protokol': plan.name, 'protokol_ozeti': plan.key, 'merkez_sutunu': query.get('merkez_sutunu') or None}
+
+    method = query.get('ancova_yontemi') or ANALYSIS_CONFIG['ancova_yontemi']
+    if method not in ANCOVA_METHODS:
+        raise APIError(400, f"'ancova_yontemi' şunlardan biri olmalıdır: {', '.join(ANCOVA_METHODS)}")
+    config['ancova_yontemi'] = method
+    seed = _int_param(query, 'tohum', DEFAULT_RESAMPLING_CONFIG['seed'], 0, 2 ** 32 - 1)
+    n_resamples = _int_param(query, 'yeniden_ornekleme', 0, 0, MAX_RESAMPLES)
+    if n_resamples:
+        config['yeniden_ornekleme'] = {**DEFAULT_RESAMPLING_CONFIG, 'n_permutations': n_resamples, 'n_bootstrap': n_resamples, 'seed': seed}
+    # İşler zaten havuzda eşzamanlı çalıştığından atamalar iş başına sırayla yapılır (batch_cli ile aynı)
+    n_imputations = _int_param(query, 'coklu_atama', 0, 0, MAX_IMPUTATIONS)
+    if n_imputations:
+        config['coklu_atama'] = {**DEFAULT_IMPUTATION_CONFIG, 'm': n_imputations, 'seed': seed, 'n_jobs': 1}
+    if 'duyarlilik' in query:
+        try:
+            thresholds = sorted({float(value) for value in query['duyarlilik'].split(',') if value.strip()})
+        except ValueError:
+            raise APIError(400, f"'duyarlilik' eşikleri virgülle ayrılmış sayılar olmalıdır: {query['duyarlilik']}") from None
+        if not all(0 < t < 1 for t in thresholds):
+            raise APIError(400, f"'duyarlilik' eşikleri 0 ile 1 arasında olmalıdır: {query['duyarlilik']}")
+        config['duyarlilik'] = {**DEFAULT_SENSITIVITY_CONFIG, 'thresholds': thresholds or DEFAULT_SENSITIVITY_CONFIG['thresholds']}
+    if 'tekrarli_olcum' in query:
+        method = query['tekrarli_olcum'] or DEFAULT_LONGITUDINAL_CONFIG['method']
+        if method not in LONGITUDINAL_METHODS:
+            raise APIError(400, f"'tekrarli_olcum' şunlardan biri olmalıdır: {', '.join(LONGITUDINAL_METHODS)}")
+        config['tekrarli_olcum'] = {**DEFAULT_LONGITUDINAL_CONFIG, 'method': method}
+    return config
+
+
+def _api_analysis_job(progress, file_bytes, filename, analysis_config, use_incremental):
+    """Arayüzle aynı analiz işi; başarılı sonuçlara grafikler (LazyCharts, grafik başına önbellekli) eklenir."""
+    output = run_analysis_job(progress, file_bytes, filename, analysis_config, use_incremental, source='api')
+    output['filename'] = filename
+    if output['cache_key'] is not None and not output['results'].get('error'):
+        output['charts'] = LazyCharts(output['df_cleaned'], dataset_key=output['cache_key'], cache=get_result_cache(), plan=output['plan'])
+    return output
+
+
+def _pdf_job(progress, output):
+    """Raporu oluşturur, geçmiş kaydına ekler ve dosya yolunu döndürür (her istek dosyayı ayrı açıp akıtır)."""
+    progress(0.1, "PDF raporu oluşturuluyor...")
+    with create_pdf_report_file(output['results'], output['charts'], plan=output['plan']) as pdf_file:
+        return get_results_store().save_artifact(output['run_id'], pdf_file, 'pdf')
+
+
+def _bundle_job(progress, output, job_id, chart_formats, pdf_path):
+    """Paketi rapor klasörüne yazar ve yolunu döndürür (yarım dosya sunulmasın diye geçici adla yazılıp taşınır)."""
+    progress(0.1, "Dışa aktarma paketi oluşturuluyor...")
+    name = f"paket_{job_id}_{'_'.join(chart_formats) or 'grafiksiz'}{'_pdf' if pdf_path else ''}.zip"
+    path = os.path.join(get_results_store().artifact_dir, name)
+    write_export_bundle(path + '.yaziliyor', output['results'], output['df_cleaned'], output['charts'], plan=output['plan'],
+                        chart_formats=chart_formats, pdf=pdf_path, source_name=output.get('filename'))
+    os.replace(path + '.yaziliyor', path)
+    return path
+
+
+class AnalysisAPI:
+    """İş havuzu ve istek tekilleştirme: tüm ağır işler (analiz, grafik, PDF) aynı sınırlı havuzda çalışır."""
+
+    def __init__(self, workers=API_WORKERS, max_pending=API_MAX_PENDING):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.jobs = JobManager(max_workers=self.workers)
+        self.started_at = time.time()
+
+    def _submit(self, fn, *args, key, label):
+        try:
+            return self.jobs.submit(fn, *args, key=key, label=label, max_pending=self.max_pending)
+        except JobQueueFull as e:
+            raise APIError(503, f"Sunucu meşgul: {e} Lütfen biraz sonra tekrar deneyin.", {'Retry-After': '5'}) from None
+
+    def wait(self, job_id, timeout=API_WAIT_SECONDS):
+        job = self.jobs.wait(job_id, timeout)
+        if job is None:
+            raise APIError(404, f"İş bulunamadı: {job_id} (süresi dolmuş olabilir).")
+        return job
+
+    def submit_analysis(self, file_bytes, filename, analysis_config, use_incremental=False):
+        key = analysis_job_key(file_bytes, filename, analysis_config, use_incremental)
+        return self._submit(_api_analysis_job, file_bytes, filename, analysis_config, use_incremental, key=key, label=filename)
+
+    def analysis_output(self, job_id):
+        """Başarıyla bitmiş bir analiz işinin çıktısı (bitmemişse 409)."""
+        job = self.jobs.get(job_id)
+        if job is None or job.key is None or not job.key.startswith('job:'):
+            raise APIError(404, f"Analiz işi bulunamadı: {job_id} (süresi dolmuş olabilir).")
+        if job.status != JOB_DONE or 'charts' not in job.result:
+            raise APIError(409, f"Analiz işi başarıyla tamamlanmadı (durum: {job.status}).")
+        return job.result
+
+    def chart_json(self, job_id, name):
+        output = self.analysis_output(job_id)
+        if name not in output['plan'].charts:
+            raise APIError(404, f"Grafik bulunamadı: {name}")
+        charts = output['charts']
+        chart_job = self.wait(self._submit(lambda progress: charts[name].to_json(), key=f"grafik|{job_id}|{name}", label=name))
+        if chart_job.status == JOB_FAILED:
+            raise APIError(500, f"Grafik oluşturulamadı: {chart_job.error}")
+        if not chart_job.finished:
+            raise APIError(504, "Grafik zaman aşımına kadar oluşturulamadı.")
+        return chart_job.result
+
+    def pdf_path(self, job_id):
+        output = self.analysis_output(job_id)
+        pdf_job = self.wait(self._submit(_pdf_job, output, key=f"pdf|{job_id}", label=f"{job_id}.pdf"))
+        if pdf_job.status == JOB_FAILED:
+            raise APIError(500, f"PDF raporu oluşturulamadı: {pdf_job.error}")
+        if not pdf_job.finished:
+            raise APIError(504, "PDF raporu zaman aşımına kadar oluşturulamadı.")
+        return pdf_job.result
+
+    def bundle_path(self, job_id, chart_formats=DEFAULT_CHART_FORMATS, include_pdf=False):
+        output = self.analysis_output(job_id)
+        pdf_path = self.pdf_path(job_id) if include_pdf else None
+        bundle_job = self.wait(self._submit(_bundle_job, output, job_id, chart_formats, pdf_path,
+                                            key=f"paket|{job_id}|{','.join(chart_formats)}|{include_pdf}", label=f"{job_id}.zip"))
+        if bundle_job.status == JOB_FAILED:
+            raise APIError(500, f"Dışa aktarma paketi oluşturulamadı: {bundle_job.error}")
+        if not bundle_job.finished:
+            raise APIError(504, "Dışa aktarma paketi zaman aşımına kadar oluşturulamadı.")
+        return bundle_job.result
+
+
+def job_payload(job):
+    """(HTTP durum kodu, yanıt sözlüğü): 200 bitti, 202 sürüyor, 422 şablon / veri hatası, 500 iş hatası."""
+    payload = {'is': job.id, 'durum': job.status, 'ilerleme': round(job.progress, 3), 'mesaj': job.message,
+               'sure_sn': round(job.elapsed, 3)}
+    if job.status == JOB_FAILED:
+        payload['hata'] = job.error
+        return 500, payload
+    if job.status != JOB_DONE:
+        return 202, payload
+    output = job.result
+    payload.update({'kayit': output['run_id'], 'sonuclar': output['results']})
+    if 'charts' in output:
+        payload.update({'grafikler': f"/isler/{job.id}/grafikler", 'rapor': f"/isler/{job.id}/rapor.pdf",
+                        'paket': f"/isler/{job.id}/paket.zip"})
+    return (422 if output['results'].get('error') else 200), payload
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'EbelikAPI/1.0'
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def log_message(self, format, *args):
+        pass  # istekler _dispatch içinde JSON günlüğüne yazılır
+
+    # --- Yönlendirme ---
+    def _dispatch(self, method):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+        parts = [unquote(part) for part in url.path.split('/') if part]
+        self._headers_sent = False
+        try:
+            status = self._route(method, parts, query)
+        except APIError as e:
+            status = self._send_error(e.status, e.message, e.headers)
+        except Exception as e:
+            logger.exception("İstek işlenirken hata")
+            status = self._send_error(500, f"{type(e).__name__}: {e}")
+        logger.info(json.dumps({'olay': 'istek', 'yontem': method, 'yol': url.path, 'durum': status,
+                                'sure_sn': round(time.perf_counter() - started, 4)}, ensure_ascii=False))
+
+    def _route(self, method, parts, query):
+        api = self.server.api
+        if parts == ['analiz']:
+            if method != 'POST':
+                raise APIError(405, "Analiz için çalışma dosyası POST ile gönderilmelidir.", {'Allow': 'POST'})
+            return self._analyze(api, query)
+        if method != 'GET':
+            raise APIError(405, "Bu uç nokta yalnızca GET isteklerini kabul eder.", {'Allow': 'GET'})
+        if parts in ([], ['saglik']):
+            return self._send_json(200, {'durum': 'hazir', 'isci': api.workers, 'kuyruk_siniri': api.max_pending,
+                                         'calisma_suresi_sn': round(time.time() - api.started_at, 1), 'isler': api.jobs.snapshot()})
+        if parts == ['protokoller']:
+            return self._send_json(200, {'protokoller': list(available_study_specs()), 'varsayilan': DEFAULT_STUDY})
+        if parts == ['sablon']:
+            study = query.get('protokol') or DEFAULT_STUDY
+            if study not in available_study_specs():
+                raise APIError(400, f"Çalışma tanımı bulunamadı: '{study}'")
+            return self._send_bytes(200, create_template_excel(get_study_plan(study)),
+                                    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', f"{study}_sablon.xlsx")
+        if parts[:1] == ['isler'] and len(parts) >= 2:
+            job_id = parts[1]
+            if len(parts) == 2:
+                job = api.jobs.get(job_id)
+                if job is None:
+                    raise APIError(404, f"İş bulunamadı: {job_id} (süresi dolmuş olabilir).")
+                return self._send_json(*job_payload(job))
+            if parts[2:] == ['grafikler']:
+                return self._send_json(200, {'grafikler': api.analysis_output(job_id)['plan'].chart_names})
+            if parts[2] == 'grafikler' and len(parts) == 4:
+                return self._send_bytes(200, api.chart_json(job_id, parts[3]).encode(), 'application/json')
+            if parts[2:] == ['rapor.pdf']:
+                return self._send_file(api.pdf_path(job_id), 'application/pdf', f"analiz_{job_id}.pdf")
+            if parts[2:] == ['paket.zip']:
+                chart_formats = tuple(dict.fromkeys(fmt.strip() for fmt in query.get('grafik', 'html').split(',') if fmt.strip()))
+                if not set(chart_formats) <= set(CHART_FORMATS):
+                    raise APIError(400, f"'grafik' parametresi {', '.join(CHART_FORMATS)} arasından seçilmelidir: {query['grafik']}")
+                path = api.bundle_path(job_id, chart_formats, query.get('pdf', '0') not in ('', '0'))
+                return self._send_file(path, 'application/zip', f"analiz_{job_id}_paket.zip")
+        raise APIError(404, "Bilinmeyen uç nokta.")
+
+    def _analyze(self, api, query):
+        filename = os.path.basename(query.get('dosya_adi') or 'yukleme.xlsx')
+        if os.path.splitext(filename)[1].lower() not in SUPPORTED_EXTENSIONS:
+            raise APIError(400, f"Desteklenmeyen dosya türü: '{filename}'. Desteklenen türler: {', '.join(SUPPORTED_EXTENSIONS)}")
+        config = analysis_config_from_query(query)
+        length = self.headers.get('Content-Length')
+        if length is None:
+            raise APIError(411, "Content-Length başlığı gereklidir.")
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            raise APIError(400, f"Content-Length başlığı negatif olmayan bir tam sayı olmalıdır: {self.headers.get('Content-Length')}")
+        if length > API_MAX_UPLOAD_BYTES:
+            self.close_connection = True  # gövde okunmadığından bağlantı yeniden kullanılamaz
+            raise APIError(413, f"Dosya çok büyük (en fazla {API_MAX_UPLOAD_BYTES // 2 ** 20} MB).")
+        file_bytes = self.rfile.read(length)
+        if not file_bytes:
+            raise APIError(400, "İstek gövdesi boş: çalışma dosyası gönderilmelidir.")
+        job_id = api.submit_analysis(file_bytes, filename, config, query.get('artimli', '0') not in ('', '0'))
+        if query.get('bekle', '1') == '0':
+            return self._send_json(*job_payload(api.jobs.get(job_id)))
+        return self._send_json(*job_payload(api.wait(job_id)))
+
+    # --- Yanıt yardımcıları ---
+    def _start_response(self, status, content_type, length, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self._headers_sent = True
+
+    def _send_bytes(self, status, body, content_type, filename=None, headers=None):
+        headers = dict(headers or {})
+        if filename:
+            headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        self._start_response(status, content_type, len(body), headers)
+        self.wfile.write(body)
+        return status
+
+    def _send_json(self, status, payload, headers=None):
+        return self._send_bytes(status, results_to_json(payload).encode(), 'application/json; charset=utf-8', headers=headers)
+
+    def _send_file(self, path, content_type, filename):
+        """Dosyayı belleğe almadan PDF_CHUNK_BYTES parçalar halinde gönderir."""
+        with open(path, 'rb') as f:
+            self._start_response(200, content_type, os.fstat(f.fileno()).st_size,
+                                 {'Content-Disposition': f'attachment; filename="{filename}"'})
+            shutil.copyfileobj(f, self.wfile, PDF_CHUNK_BYTES)
+        return 200
+
+    def _send_error(self, status, message, headers=None):
+        if self._headers_sent:
+            # Yanıt yarıda kaldı (ör. akış sırasında istemci koptu): ikinci bir yanıt yazılamaz
+            self.close_connection = True
+            return status
+        return self._send_json(status, {'hata': message}, headers)
+
+
+class AnalysisHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, api):
+        super().__init__(address, APIRequestHandler)
+        self.api = api
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=API_WORKERS, max_pending=API_MAX_PENDING):
+    """Sunucuyu kurar (başlatmaz); port=0 ile boş bir port seçilir (server.server_address)."""
+    return AnalysisHTTPServer((host, port), AnalysisAPI(workers, max_pending))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Yerel HTTP analiz API'si (şablon, analiz, grafik JSON'u ve PDF).")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Dinlenecek adres (varsayılan: {DEFAULT_HOST}, yalnızca yerel)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port (varsayılan: {DEFAULT_PORT})")
+    parser.add_argument('--isci', type=int, default=API_WORKERS, help=f"Analiz / grafik / PDF iş havuzu boyutu (varsayılan: {API_WORKERS})")
+    parser.add_argument('--kuyruk', type=int, default=API_MAX_PENDING,
+                        help=f"En fazla bitmemiş iş; aşılınca 503 döner (varsayılan: {API_MAX_PENDING})")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    server = make_server(args.host, args.port, args.isci, args.kuyruk)
+    start_warmup()
+    host, port = server.server_address[:2]
+    logger.info(json.dumps({'olay': 'baslatildi', 'adres': f"http://{host}:{port}", 'isci': args.isci, 'kuyruk': args.kuyruk},
+                           ensure_ascii=False))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,325 +1,39 @@
+import json
+import os
+import threading
 import streamlit as st
 import pandas as pd
-import numpy as np
-from scipy.stats import ttest_ind, chi2_contingency
-import statsmodels.api as sm
-from statsmodels.formula.api import ols
-from fpdf import FPDF
-import plotly.express as px 
-import plotly.io as pio 
-import warnings
-import io 
-
-warnings.filterwarnings('ignore')
-
-# --- 2. SİSTEMİN GEREKLİ SÜTUNLARI (ŞABLON İÇİN) ---
-NUMERIC_COLUMNS = [
-    'yas', 'gebelik_haftasi', 
-    'korku_vas_baseline', 'korku_olcek_baseline',
-    'korku_vas_4cm', 'korku_olcek_4cm',
-    'korku_vas_8cm', 'korku_olcek_8cm',
-    'endise_oxford_baseline', 'endise_oxford_son_test'
-]
-CATEGORIC_COLUMNS = [
-    'grup', 'egitim_durumu', 'dogum_baslangici', 'medeni_durum', 
-    'gelir_duzeyi', 'calisma_durumu', 'planli_gebelik_mi'
-]
-ALL_REQUIRED_COLUMNS = NUMERIC_COLUMNS + CATEGORIC_COLUMNS
-
-# --- 3. YENİ ŞABLON OLUŞTURMA FONKSİYONU ---
+from result_cache import make_cache_key
+from ingest import read_columns
+from analysis import (
+    ANALYSIS_CONFIG, get_result_cache,
+    create_template_excel as _create_template_excel,
+    create_pdf_report_file, inference_notes, results_to_json, stratified_summary_rows, STRATA_TABLE_P_COLUMNS,
+    AGGREGATE_CHARTS_MIN_ROWS, LazyCharts, get_dashboard_aggregates
+)
+from analysis_job import analysis_job_key, run_analysis_job, run_power_job
+from export_bundle import create_export_bundle_file
+from jobs import JOB_DONE, JOB_FAILED, get_job_manager
+from profiling import PROFILERS, StageTrace, configure_logging, traces_to_chrome
+from results_store import P_VALUE_COLUMNS, get_results_store
+from power import DEFAULT_POWER_CONFIG, power_curve_chart, power_table, required_n
+from imputation import DEFAULT_IMPUTATION_CONFIG
+from resampling import DEFAULT_RESAMPLING_CONFIG
+from sensitivity import DEFAULT_SENSITIVITY_CONFIG, robustness_lines, sensitivity_forest_chart, sensitivity_summary_rows
+from longitudinal import DEFAULT_LONGITUDINAL_CONFIG, longitudinal_model_lines, longitudinal_summary_rows
+from stratified import candidate_strata_columns
+from study_spec import DEFAULT_STUDY, available_study_specs, get_study_plan
+from warmup import start_warmup
+
+# --- 3. ŞABLON (Streamlit önbellekli; protokol ve tanım özeti başına bir kez) ---
 @st.cache_data 
-def create_template_excel():
-    df_template = pd.DataFrame(columns=ALL_REQUIRED_COLUMNS)
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df_template.to_excel(writer, sheet_name='Veri_Giris_Sayfasi', index=False)
-    return output.getvalue()
-
-# --- 4. YARDIMCI PDF FONKSİYONLARI ---
-def normalize_for_pdf(text):
-    text = str(text) 
-    replacements = {
-        'İ': 'I', 'ı': 'i', 'Ş': 'S', 'ş': 's', 'Ğ': 'G', 'ğ': 'g',
-        'Ü': 'U', 'ü': 'u', 'Ö': 'O', 'ö': 'o', 'Ç': 'C', 'ç': 'c'
-    }
-    for tr_char, en_char in replacements.items():
-        text = text.replace(tr_char, en_char)
-    return text
-
-def create_pdf_report(results, charts):
-    pdf = FPDF()
-    pdf.add_page()
-    
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, "Ebelik Arastirmasi Istatistiksel Analiz Raporu", ln=True, align="C")
-    pdf.ln(5) 
-    
-    # --- FAZ 1 Raporu ---
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(190, 10, "FAZ 1: Baslangic Denkligi Raporu", ln=True)
-    pdf.set_font("Arial", "", 10)
-    
-    if results['faz1_is_denk']:
-        pdf.set_text_color(0, 100, 0); pdf.multi_cell(190, 5, normalize_for_pdf("SONUC: Randomizasyon BASARILI (Tum p > 0.05)"))
-        pdf.set_text_color(0, 0, 0); pdf.multi_cell(190, 5, normalize_for_pdf(
-            "Yorum: Gruplar arasi anlamli bir baslangic farki bulunamamistir. "
-            "Bu, gruplarin homojen (denk) oldugunu ve arastirmanin ic gecerliliginin "
-            "yuksek oldugunu gosterir."
-        ))
-    else:
-        pdf.set_text_color(255, 165, 0); pdf.multi_cell(190, 5, normalize_for_pdf("SONUC: Randomizasyon BASARISIZ (p < 0.05)"))
-        pdf.set_text_color(0, 0, 0); failed_vars_str = ", ".join(results['faz1_failed_vars_display_names'])
-        pdf.multi_cell(190, 5, normalize_for_pdf(
-            f"Neden Kaynakli?: Analiz, '{failed_vars_str}' degisken(ler)i acisindan anlamli bir fark tespit etmistir."
-        ))
-    pdf.ln(5)
-    
-    # --- FAZ 2 Raporu ---
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(190, 10, "FAZ 2: Hipotez Testleri Raporu (ANCOVA)", ln=True)
-    
-    if results['correction_applied']:
-        pdf.set_font("Arial", "B", 10); pdf.set_text_color(200, 0, 0)
-        pdf.multi_cell(190, 5, normalize_for_pdf(
-            f"DIKKAT: ISTATISTIKSEL DUZELTME UYGULANDI.\nFAZ 1'deki denklik hatasi nedeniyle su degisken(ler) analize 'kovaryant' "
-            f"olarak eklenmistir: {results['correction_applied']}"
-        ))
-        pdf.set_text_color(0, 0, 0); pdf.ln(2)
-
-    # FAZ 2 Sonuçları
-    pdf.set_font("Arial", "B", 12); pdf.cell(190, 8, "[H1: Latent Faz Korku]", ln=True)
-    pdf.set_font("Arial", "", 10)
-    pdf.cell(190, 5, normalize_for_pdf(f"- VAS Sonucu: {'DESTEKLENDI' if results['h1_vas_p'] < 0.05 else 'Reddedildi'} (p-degeri: {results['h1_vas_p']:.6f})"), ln=True)
-    pdf.cell(190, 5, normalize_for_pdf(f"- Dogum Korku Olcegi Sonucu: {'DESTEKLENDI' if results['h1_olcek_p'] < 0.05 else 'Reddedildi'} (p-degeri: {results['h1_olcek_p']:.6f})"), ln=True)
-    
-    pdf.set_font("Arial", "B", 12); pdf.cell(190, 8, "[H2: Aktif Faz Korku]", ln=True)
-    pdf.set_font("Arial", "", 10)
-    pdf.cell(190, 5, normalize_for_pdf(f"- VAS Sonucu: {'DESTEKLENDI' if results['h2_vas_p'] < 0.05 else 'Reddedildi'} (p-degeri: {results['h2_vas_p']:.6f})"), ln=True)
-    pdf.cell(190, 5, normalize_for_pdf(f"- Dogum Korku Olcegi Sonucu: {'DESTEKLENDI' if results['h2_olcek_p'] < 0.05 else 'Reddedildi'} (p-degeri: {results['h2_olcek_p']:.6f})"), ln=True)
-    
-    pdf.set_font("Arial", "B", 12); pdf.cell(190, 8, "[H3: Endise Duzeyi]", ln=True)
-    pdf.set_font("Arial", "", 10)
-    pdf.cell(190, 5, normalize_for_pdf(f"- Oxford Endise Olcegi Sonucu: {'DESTEKLENDI' if results['h3_oxford_p'] < 0.05 else 'Reddedildi'} (p-degeri: {results['h3_oxford_p']:.6f})"), ln=True)
-    pdf.ln(5)
-    
-    # --- Nihai Yorum ---
-    pdf.set_font("Arial", "B", 14); pdf.cell(190, 10, "Nihai Rapor Yorumu (Analist Ozeti)", ln=True)
-    pdf.set_font("Arial", "", 10)
-    pdf.multi_cell(190, 5, normalize_for_pdf(results['final_report_text']))
-    
-    # --- Sayfa 3: Sosyodemografik Grafikler (EK A) ---
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(190, 10, "EK A: Sosyodemografik Dagilimlar (Dashboard Grafikleri)", ln=True)
-    try:
-        img_medeni = pio.to_image(charts['fig_pie_medeni'], format="png"); img_gelir = pio.to_image(charts['fig_pie_gelir'], format="png")
-        img_calisma = pio.to_image(charts['fig_pie_calisma'], format="png"); img_plan = pio.to_image(charts['fig_pie_plan'], format="png")
-        pdf.image(io.BytesIO(img_medeni), w=90, h=65, x=10); pdf.image(io.BytesIO(img_gelir), w=90, h=65, x=110)
-        pdf.ln(70); pdf.image(io.BytesIO(img_calisma), w=90, h=65, x=10); pdf.image(io.BytesIO(img_plan), w=90, h=65, x=110)
-    except Exception as e:
-        pdf.set_text_color(255, 0, 0); pdf.cell(190, 10, normalize_for_pdf(f"Pasta grafikleri olusturulamadi: {e}"), ln=True); pdf.set_text_color(0, 0, 0)
-        
-    # --- Sayfa 4: Denklik Grafikleri (EK B) ---
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(190, 10, "EK B: Gorsel Denklik Kontrolu Grafikleri", ln=True)
-    try:
-        img_yas_box = pio.to_image(charts['fig_yas_box'], format="png"); img_hafta_box = pio.to_image(charts['fig_hafta_box'], format="png")
-        img_egitim_bar = pio.to_image(charts['fig_egitim_bar'], format="png"); img_dogum_bar = pio.to_image(charts['fig_dogum_bar'], format="png")
-        pdf.image(io.BytesIO(img_yas_box), w=90, h=70, x=10); pdf.image(io.BytesIO(img_hafta_box), w=90, h=70, x=110)
-        pdf.ln(75); pdf.image(io.BytesIO(img_egitim_bar), w=90, h=70, x=10); pdf.image(io.BytesIO(img_dogum_bar), w=90, h=70, x=110)
-    except Exception as e:
-        pdf.set_text_color(255, 0, 0); pdf.cell(190, 10, normalize_for_pdf(f"Denklik grafikleri olusturulamadi: {e}"), ln=True); pdf.set_text_color(0, 0, 0)
-
-    # --- Sayfa 5: Puan Evrimi ve Korelasyon Grafikleri (EK C) ---
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(190, 10, "EK C: Puan Evrimi ve Korelasyon Grafikleri", ln=True)
-    try:
-        img_vas_line = pio.to_image(charts['fig_vas_line'], format="png")
-        img_stacked = pio.to_image(charts['fig_stacked'], format="png")
-        img_heatmap = pio.to_image(charts['fig_heatmap'], format="png")
-        pdf.image(io.BytesIO(img_vas_line), w=190, h=80); pdf.ln(85)
-        pdf.image(io.BytesIO(img_stacked), w=190, h=90); pdf.ln(95)
-        pdf.image(io.BytesIO(img_heatmap), w=190, h=100)
-    except Exception as e:
-        pdf.set_text_color(255, 0, 0); pdf.cell(190, 10, normalize_for_pdf(f"Puan evrimi/korelasyon grafikleri olusturulamadi: {e}"), ln=True); pdf.set_text_color(0, 0, 0)
-        
-    return bytes(pdf.output(dest='S'))
-
-# --- 5. BACKEND: NİHAİ İSTATİSTİK MOTORU (HESAPLAMA) ---
-def run_full_analysis(df_data):
-    results = {} 
-    
-    missing_cols = [col for col in ALL_REQUIRED_COLUMNS if col not in df_data.columns]
-    if missing_cols:
-        return {'error': f"HATA: Yüklediğiniz Excel dosyası bir Şablon dosyası değil. Şu sütunlar eksik: {', '.join(missing_cols)}. Lütfen 'Boş Excel Şablonunu İndir' butonunu kullanarak doğru şablonu indirin ve verilerinizi oraya girin."}
-    
-    df_cleaned = df_data.copy()
-    for col in NUMERIC_COLUMNS:
-        df_cleaned[col] = pd.to_numeric(df_cleaned[col], errors='coerce')
-        
-    if df_cleaned[NUMERIC_COLUMNS].isnull().all().all():
-        return {'error': "HATA: Analiz edilecek sayısal veri bulunamadı. Yüklediğiniz Excel şablonundaki sayısal sütunlar ('yas', 'korku_vas_baseline' vb.) tamamen boş veya geçersiz metin ('yok', 'N/A' vb.) içeriyor. Lütfen verilerinizi kontrol edin."}
-
-    try:
-        grup_mudahale = df_cleaned[df_cleaned['grup'] == 'Müdahale']
-        grup_kontrol = df_cleaned[df_cleaned['grup'] == 'Kontrol']
-    except KeyError:
-        return {'error': "HATA: 'grup' sütunu bulunamadı veya 'Müdahale'/'Kontrol' değerleri yanlış yazılmış. Lütfen şablonu kontrol edin."}
-    
-    display_to_col_map_denklik = {
-        'Yaş': 'yas', 'Gebelik Haftası': 'gebelik_haftasi',
-        'Eğitim Durumu': 'egitim_durumu', 'Doğum Başlangıcı (Doğum Şekli)': 'dogum_baslangici',
-        'Medeni Durum': 'medeni_durum', 'Gelir Düzeyi': 'gelir_duzeyi',
-        'Çalışma Durumu': 'calisma_durumu', 'Planlı Gebelik': 'planli_gebelik_mi'
-    }
-
-    # --- FAZ 1 HESAPLAMALARI (Denklik) ---
-    p_values_numeric = {
-        'Yaş': ttest_ind(grup_mudahale['yas'], grup_kontrol['yas'], equal_var=False, nan_policy='omit')[1],
-        'Gebelik Haftası': ttest_ind(grup_mudahale['gebelik_haftasi'], grup_kontrol['gebelik_haftasi'], equal_var=False, nan_policy='omit')[1],
-        'Başlangıç Korku (VAS)': ttest_ind(grup_mudahale['korku_vas_baseline'], grup_kontrol['korku_vas_baseline'], equal_var=False, nan_policy='omit')[1],
-        'Başlangıç Korku (Ölçek)': ttest_ind(grup_mudahale['korku_olcek_baseline'], grup_kontrol['korku_olcek_baseline'], equal_var=False, nan_policy='omit')[1],
-        'Başlangıç Endişe (Oxford)': ttest_ind(grup_mudahale['endise_oxford_baseline'], grup_kontrol['endise_oxford_baseline'], equal_var=False, nan_policy='omit')[1]
-    }
-    p_values_categoric = {
-        'Eğitim Durumu': chi2_contingency(pd.crosstab(df_cleaned['grup'], df_cleaned['egitim_durumu']))[1],
-        'Doğum Başlangıcı (Doğum Şekli)': chi2_contingency(pd.crosstab(df_cleaned['grup'], df_cleaned['dogum_baslangici']))[1],
-        'Medeni Durum': chi2_contingency(pd.crosstab(df_cleaned['grup'], df_cleaned['medeni_durum']))[1],
-        'Gelir Düzeyi': chi2_contingency(pd.crosstab(df_cleaned['grup'], df_cleaned['gelir_duzeyi']))[1],
-        'Çalışma Durumu': chi2_contingency(pd.crosstab(df_cleaned['grup'], df_cleaned['calisma_durumu']))[1],
-        'Planlı Gebelik': chi2_contingency(pd.crosstab(df_cleaned['grup'], df_cleaned['planli_gebelik_mi']))[1]
-    }
-    results['faz1_numeric_p_values'] = p_values_numeric
-    results['faz1_categoric_p_values'] = p_values_categoric
-    
-    all_p_values_dict = {**p_values_numeric, **p_values_categoric}
-    failed_vars_display_names = [var_name for var_name, p in all_p_values_dict.items() if p < 0.05]
-    results['faz1_is_denk'] = len(failed_vars_display_names) == 0
-    results['faz1_failed_vars_display_names'] = failed_vars_display_names 
-    
-    # --- DİNAMİK DÜZELTME MOTORU ---
-    correction_formula_part = ""
-    if not results['faz1_is_denk']:
-        for var_name in failed_vars_display_names:
-            col_name = display_to_col_map_denklik.get(var_name)
-            if col_name: 
-                if col_name in CATEGORIC_COLUMNS:
-                    correction_formula_part += f" + C({col_name})"
-                else:
-                    correction_formula_part += f" + {col_name}"
-    results['correction_applied'] = correction_formula_part 
-    
-    # --- FAZ 2 HESAPLAMALARI (Dinamik Formüllerle) ---
-    f_h1_vas_base = 'korku_vas_4cm ~ grup + korku_vas_baseline'
-    f_h1_olcek_base = 'korku_olcek_4cm ~ grup + korku_olcek_baseline'
-    f_h2_vas_base = 'korku_vas_8cm ~ grup + korku_vas_4cm'
-    f_h2_olcek_base = 'korku_olcek_8cm ~ grup + korku_olcek_4cm'
-    f_h3_oxford_base = 'endise_oxford_son_test ~ grup + endise_oxford_baseline'
-    
-    results['h1_vas_p'] = sm.stats.anova_lm(ols(f_h1_vas_base + correction_formula_part, data=df_cleaned.dropna(subset=['korku_vas_4cm', 'grup', 'korku_vas_baseline'])).fit(), typ=3).loc['grup', 'PR(>F)']
-    results['h1_olcek_p'] = sm.stats.anova_lm(ols(f_h1_olcek_base + correction_formula_part, data=df_cleaned.dropna(subset=['korku_olcek_4cm', 'grup', 'korku_olcek_baseline'])).fit(), typ=3).loc['grup', 'PR(>F)']
-    results['h2_vas_p'] = sm.stats.anova_lm(ols(f_h2_vas_base + correction_formula_part, data=df_cleaned.dropna(subset=['korku_vas_8cm', 'grup', 'korku_vas_4cm'])).fit(), typ=3).loc['grup', 'PR(>F)']
-    results['h2_olcek_p'] = sm.stats.anova_lm(ols(f_h2_olcek_base + correction_formula_part, data=df_cleaned.dropna(subset=['korku_olcek_8cm', 'grup', 'korku_olcek_4cm'])).fit(), typ=3).loc['grup', 'PR(>F)']
-    results['h3_oxford_p'] = sm.stats.anova_lm(ols(f_h3_oxford_base + correction_formula_part, data=df_cleaned.dropna(subset=['endise_oxford_son_test', 'grup', 'endise_oxford_baseline'])).fit(), typ=3).loc['grup', 'PR(>F)']
-    
-    # --- Akıllı Yorum v2.0 (Nihai Yorum Metnini Oluştur) ---
-    h_p_values = [results['h1_vas_p'], results['h1_olcek_p'], results['h2_vas_p'], results['h2_olcek_p'], results['h3_oxford_p']]
-    faz2_basarili = any(p < 0.05 for p in h_p_values)
-    
-    final_report_text = ""
-    if results['faz1_is_denk'] and faz2_basarili:
-        results['final_report_title'] = "NİHAİ SONUÇ: Güçlü Bulgular (Pozitif)"
-        final_report_text = "Yorum: Araştırma, gruplar arasında tam denklik (FAZ 1) sağlamıştır. İstatistiksel analizler (FAZ 2), müdahale grubunda korku ve/veya endişe düzeylerinde anlamlı bir azalma olduğunu doğrulamıştır. Bu bulgular, nefes egzersizi müdahalesinin, protokolde hedeflenen bağımlı değişkenler üzerinde anlamlı ve pozitif bir etkiye sahip olduğunu güçlü bir şekilde desteklemektedir."
-    elif not results['faz1_is_denk'] and faz2_basarili:
-        results['final_report_title'] = "NİHAİ SONUÇ: Düzeltilmiş Bulgular (Pozitif)"
-        failed_vars_str = ", ".join(results['faz1_failed_vars_display_names'])
-        final_report_text = f"Yorum: Hipotezler (FAZ 2) müdahale lehine çıksa da, FAZ 1 denklik testlerinde ({failed_vars_str}) başarısızlık tespit edilmiştir. Bu 'karıştırıcı değişkenler', FAZ 2 ANCOVA analizine otomatik olarak eklenerek etkileri 'kontrol altına alınmıştır'. Düzeltilmiş sonuçlar, müdahalenin (denklik hatalarına rağmen) pozitif bir etkiye sahip olduğunu desteklemektedir."
-    elif results['faz1_is_denk'] and not faz2_basarili:
-        results['final_report_title'] = "NİHAİ SONUÇ: Etkisiz Müdahale (Nötr Bulgular)"
-        final_report_text = "Yorum: Araştırma, gruplar arasında tam denklik (FAZ 1) sağlamış olmasına rağmen, hipotez testleri (FAZ 2) müdahalenin istatistiksel olarak anlamlı bir fark yaratmadığını (p > 0.05) göstermiştir. Bu bulgular, nefes egzersizi müdahalesinin, bu çalışmanın koşulları ve örneklemi üzerinde ölçülebilir bir etkiye sahip olmadığını göstermektedir."
-    else: # not faz1_is_denk and not faz2_basarili
-        results['final_report_title'] = "NİHAİ SONUÇ: Sonuçsuz Bulgular (Geçersiz)"
-        final_report_text = "Yorum: Araştırma hem FAZ 1 denklik testlerinde başarısız olmuş hem de FAZ 2 hipotez testlerinde anlamlı bir sonuç üretememiştir. Gruplar arasındaki başlangıç farkları ve müdahalenin etkisizliği nedeniyle, araştırma sonuçları 'geçersiz' (inconclusive) kabul edilmelidir."
-    
-    results['final_report_text'] = final_report_text.strip()
-    results['error'] = None
-    return results
-
-# --- 6. BACKEND: TÜM GÖRSELLERİ OLUŞTURMA MOTORU ---
-def generate_all_charts(df_charts):
-    charts = {}
-    
-    df_charts_norm = df_charts.copy()
-    for col in CATEGORIC_COLUMNS:
-        df_charts_norm[col] = df_charts_norm[col].astype(str).apply(normalize_for_pdf)
-
-    # --- BÖLÜM 1: Frekans Tabloları & Pasta Grafikler ---
-    df_pie = df_charts_norm['medeni_durum'].value_counts().reset_index()
-    charts['fig_pie_medeni'] = px.pie(df_pie, names='medeni_durum', values='count', hole=0.3, title=normalize_for_pdf("Medeni Durum"))
-    charts['fig_pie_medeni'].update_traces(textposition='inside', textinfo='percent+label')
-    charts['fig_pie_medeni'].update_layout(showlegend=False, margin=dict(t=30, b=20, l=20, r=20))
-
-    df_pie = df_charts_norm['gelir_duzeyi'].value_counts().reset_index()
-    charts['fig_pie_gelir'] = px.pie(df_pie, names='gelir_duzeyi', values='count', hole=0.3, title=normalize_for_pdf("Gelir Düzeyi"),
-                                    category_orders={'gelir_duzeyi': ['Dusuk', 'Orta', 'Yuksek']})
-    charts['fig_pie_gelir'].update_traces(textposition='inside', textinfo='percent+label')
-    charts['fig_pie_gelir'].update_layout(showlegend=False, margin=dict(t=30, b=20, l=20, r=20))
-
-    df_pie = df_charts_norm['calisma_durumu'].value_counts().reset_index()
-    charts['fig_pie_calisma'] = px.pie(df_pie, names='calisma_durumu', values='count', hole=0.3, title=normalize_for_pdf("Çalışma Durumu"))
-    charts['fig_pie_calisma'].update_traces(textposition='inside', textinfo='percent+label')
-    charts['fig_pie_calisma'].update_layout(showlegend=False, margin=dict(t=30, b=20, l=20, r=20))
-
-    df_pie = df_charts_norm['planli_gebelik_mi'].value_counts().reset_index()
-    charts['fig_pie_plan'] = px.pie(df_pie, names='planli_gebelik_mi', values='count', hole=0.3, title=normalize_for_pdf("Planlı Gebelik"))
-    charts['fig_pie_plan'].update_traces(textposition='inside', textinfo='percent+label')
-    charts['fig_pie_plan'].update_layout(showlegend=False, margin=dict(t=30, b=20, l=20, r=20))
-    
-    # --- BÖLÜM 2: Sayısal Denklik (Kutu Grafikleri) ---
-    charts['fig_yas_box'] = px.box(df_charts_norm, x='grup', y='yas', color='grup', title=normalize_for_pdf('Yaş Dağılımı (Gruplara Göre)'), points="all")
-    charts['fig_yas_box'].update_layout(showlegend=False)
-    
-    charts['fig_hafta_box'] = px.box(df_charts_norm, x='grup', y='gebelik_haftasi', color='grup', title=normalize_for_pdf('Gebelik Haftası Dağılımı (Gruplara Göre)'), points="all")
-    charts['fig_hafta_box'].update_layout(showlegend=False)
-
-    # --- BÖLÜM 3: Kategorik Denklik (Sütun Grafikleri) ---
-    charts['fig_egitim_bar'] = px.histogram(df_charts_norm, x='egitim_durumu', color='grup', barmode='group', title=normalize_for_pdf('Eğitim Durumu (Gruplara Göre)'),
-                                            category_orders={'egitim_durumu': ['Ilkokul', 'Lise', 'Universite']})
-    
-    charts['fig_dogum_bar'] = px.histogram(df_charts_norm, x='dogum_baslangici', color='grup', barmode='group', title=normalize_for_pdf('Doğum Başlangıcı (Gruplara Göre)'))
-    
-    # --- BÖLÜM 4: Ortalama Puan Evrimi (Çizgi Grafikler) ---
-    df_mean = df_charts_norm.groupby('grup')[['korku_vas_baseline', 'korku_vas_4cm', 'korku_vas_8cm']].mean().reset_index()
-    zaman_etiketleri_vas = {'korku_vas_baseline': 'Baseline', 'korku_vas_4cm': '4cm', 'korku_vas_8cm': '8cm'}
-    df_vas_long = df_mean.melt(id_vars='grup', value_vars=zaman_etiketleri_vas.keys(), var_name='Zaman', value_name='Ortalama Puan (VAS)')
-    df_vas_long['Zaman'] = df_vas_long['Zaman'].map(zaman_etiketleri_vas)
-    charts['fig_vas_line'] = px.line(df_vas_long, x='Zaman', y='Ortalama Puan (VAS)', color='grup', title=normalize_for_pdf('Ortalama VAS (Korku) Puanı Evrimi'), markers=True,
-                                     category_orders={'Zaman': ['Baseline', '4cm', '8cm']})
-
-    # --- BÖLÜM 5: Likert-tipi Görselleştirme ---
-    vas_bins = [0, 4, 7, 10.1]; vas_labels = [normalize_for_pdf('Düşük Korku (0-3)'), normalize_for_pdf('Orta Korku (4-6)'), normalize_for_pdf('Yüksek Korku (7-10)')]
-    df_likert = df_charts_norm[['grup', 'korku_vas_baseline', 'korku_vas_4cm', 'korku_vas_8cm']].copy()
-    df_likert['Baseline'] = pd.cut(df_likert['korku_vas_baseline'], bins=vas_bins, labels=vas_labels, right=False)
-    df_likert['4cm (Latent Son)'] = pd.cut(df_likert['korku_vas_4cm'], bins=vas_bins, labels=vas_labels, right=False)
-    df_likert['8cm (Aktif Son)'] = pd.cut(df_likert['korku_vas_8cm'], bins=vas_bins, labels=vas_labels, right=False)
-    df_long = df_likert.melt(id_vars=['grup'], value_vars=['Baseline', '4cm (Latent Son)', '8cm (Aktif Son)'], var_name='Olum Zamani', value_name='Korku Seviyesi')
-    color_map = {vas_labels[0]: 'green', vas_labels[1]: 'orange', vas_labels[2]: 'red'}
-    charts['fig_stacked'] = px.histogram(df_long, x='Olum Zamani', color='Korku Seviyesi', facet_col='grup', barmode='stack', barnorm='percent', title=normalize_for_pdf('Korku Seviyelerinin (VAS) Zamana Göre Değişimi'),
-                                         color_discrete_map=color_map, category_orders={"Olum Zamani": ['Baseline', '4cm (Latent Son)', '8cm (Aktif Son)'], "Korku Seviyesi": vas_labels}) 
-
-    # --- BÖLÜM 6: Korelasyon Isı Haritası ---
-    corr_cols_in_df = [col for col in NUMERIC_COLUMNS if col in df_charts_norm.columns]
-    corr_matrix = df_charts_norm[corr_cols_in_df].corr()
-    charts['fig_heatmap'] = px.imshow(corr_matrix, text_auto='.2f', aspect="auto", color_continuous_scale='RdBu_r', zmin=-1, zmax=1, title=normalize_for_pdf("Sayısal Değişkenler Korelasyon Isı Haritası"))
-    
-    return charts
+def create_template_excel(study, plan_key):
+    return _create_template_excel(get_study_plan(study))
 
 # --- 7. FRONTEND: TÜM ARAYÜZ FONKSİYONLARI ---
 
-def display_kılavuz_tab():
-    """ (v12.2) Kılavuz sekmesini (içi dolu metinlerle) çizer."""
+def display_kılavuz_tab(plan):
+    """ (v12.2) Kılavuz sekmesini (içi dolu metinlerle) çizer; sütun rolleri seçili çalışma tanımından gelir."""
     st.header("Protokol Kılavuzu ve Metodoloji")
     st.markdown("Bu bölümde, analiz motorunun dayandığı istatistiksel yöntemler ve veri setindeki değişkenlerin rolleri profesyonel bir dille açıklanmaktadır.")
     
@@ -355,96 +69,104 @@ def display_kılavuz_tab():
     col1, col2, col3 = st.columns(3)
     with col1:
         st.info("Grup A: Denklik Değişkenleri (Karıştırıcılar)")
-        st.markdown("""
-        "FAZ 1: Denklik Testi" için kullanılırlar. Grupların homojenliğini (benzerliğini) test ederler.
-        - **`yas`** - **`gebelik_haftasi`** - **`egitim_durumu`**
-        - **`dogum_baslangici`** - **`medeni_durum`** - **`gelir_duzeyi`**
-        - **`calisma_durumu`** - **`planli_gebelik_mi`**
-        """)
+        st.markdown('"FAZ 1: Denklik Testi" için kullanılırlar. Grupların homojenliğini (benzerliğini) test ederler.\n'
+                    + column_list_markdown(plan.correction_columns_by_label.values()))
     with col2:
         st.info("Grup B: Kovaryantlar (Ön-Testler)")
-        st.markdown("""
-        "FAZ 2: ANCOVA" analizinde 'kontrol değişkeni' olarak kullanılırlar.
-        - **`korku_vas_baseline`** - **`korku_olcek_baseline`**
-        - **`endise_oxford_baseline`**
-        - **`korku_vas_4cm`** - **`korku_olcek_4cm`**
-        """)
+        st.markdown('"FAZ 2: ANCOVA" analizinde \'kontrol değişkeni\' olarak kullanılırlar.\n' + column_list_markdown(plan.pre_test_columns))
     with col3:
         st.info("Grup C: Bağımlı Değişkenler (Son-Testler)")
-        st.markdown("""
-        Bunlar, müdahalenin etkisinin ölçüldüğü nihai 'sonuç' değişkenleridir.
-        - **`korku_vas_4cm`** - **`korku_olcek_4cm`**
-        - **`korku_vas_8cm`** - **`korku_olcek_8cm`**
-        - **`endise_oxford_son_test`**
-        """)
-
-def display_dashboard_tab(df_charts, charts):
-    """(v12.0) Dashboard sekmesini, önceden oluşturulmuş grafiklerle çizer."""
+        st.markdown("Bunlar, müdahalenin etkisinin ölçüldüğü nihai 'sonuç' değişkenleridir.\n" + column_list_markdown(plan.outcome_columns))
+
+def column_list_markdown(columns, per_line=3):
+    """Sütun adlarını kılavuzdaki gibi satır başına birkaç tane olacak şekilde madde listesine çevirir."""
+    columns = list(columns)
+    return "\n".join("- " + " - ".join(f"**`{col}`**" for col in columns[i:i + per_line]) for i in range(0, len(columns), per_line))
+
+def display_pie_with_table(aggregates, charts, chart_name, col, title):
+    st.markdown(f"**{title}**")
+    st.plotly_chart(charts[chart_name], use_container_width=True)
+    st.dataframe(aggregates.frequencies[col], use_container_width=True)
+
+# Dashboard'da yan yana (iki sütunlu) çizilen grafik türleri; diğerleri tam genişliktedir
+DASHBOARD_HALF_WIDTH_TYPES = ('pasta', 'kutu', 'sutun')
+
+def dashboard_rows(plan, chart_names):
+    """Bölümdeki grafikleri satırlara böler: ardışık yarım genişlikli grafikler ikişer, diğerleri tek başına."""
+    rows = []
+    for name in chart_names:
+        half = plan.charts[name]['tur'] in DASHBOARD_HALF_WIDTH_TYPES
+        if half and rows and rows[-1][1] and len(rows[-1][0]) == 1:
+            rows[-1][0].append(name)
+        else:
+            rows.append(([name], half))
+    return rows
+
+def display_dashboard_tab(df_charts, charts, plan, strata_col=None):
+    """(v12.0) Dashboard sekmesini çizer; grafikler yalnızca seçilen bölüm için oluşturulur ve tarayıcıya gönderilir."""
     st.header("Veri Seti Özeti (Keşifsel Veri Analizi Dashboard)")
+    # Sıklık tabloları ve grafiklerin özetleri veri seti başına bir kez hesaplanır; yeniden çizimler bunları kullanır
+    aggregates = get_dashboard_aggregates(df_charts, plan)
+    if strata_col:
+        with st.expander(f"Merkez Bazlı Örneklem Dağılımı ({strata_col} × grup)", expanded=True):
+            st.dataframe(aggregates.site_table(df_charts, strata_col), use_container_width=True)
+    if not plan.dashboard_sections:
+        st.info("Seçili çalışma tanımında dashboard bölümü tanımlanmamış.")
+        return
+    section = st.radio("Bölüm", list(plan.dashboard_sections), horizontal=True, key=f'dashboard_section_{plan.key}',
+                       label_visibility="collapsed")
+    if len(df_charts) > AGGREGATE_CHARTS_MIN_ROWS:
+        st.caption(f"Büyük veri seti (n = {len(df_charts)}): kutu grafikleri tek tek noktalar yerine özet istatistiklerle çizilmiştir.")
     try:
-        st.subheader("Sosyodemografik Dağılımlar (Frekans ve Yüzdeler)")
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown("**Medeni Durum**")
-            st.plotly_chart(charts['fig_pie_medeni'], use_container_width=True)
-            df_pie_data = df_charts['medeni_durum'].value_counts().reset_index().rename(columns={'medeni_durum': 'Kategori', 'count': 'Sayı (n)'})
-            st.dataframe(df_pie_data, use_container_width=True)
-        with col2:
-            st.markdown("**Gelir Düzeyi**")
-            st.plotly_chart(charts['fig_pie_gelir'], use_container_width=True)
-            df_pie_data = df_charts['gelir_duzeyi'].value_counts().reset_index().rename(columns={'gelir_duzeyi': 'Kategori', 'count': 'Sayı (n)'})
-            st.dataframe(df_pie_data, use_container_width=True)
-        
-        st.divider()
-        col3, col4 = st.columns(2)
-        with col3:
-            st.markdown("**Çalışma Durumu**")
-            st.plotly_chart(charts['fig_pie_calisma'], use_container_width=True)
-            df_pie_data = df_charts['calisma_durumu'].value_counts().reset_index().rename(columns={'calisma_durumu': 'Kategori', 'count': 'Sayı (n)'})
-            st.dataframe(df_pie_data, use_container_width=True)
-        with col4:
-            st.markdown("**Planlı Gebelik**")
-            st.plotly_chart(charts['fig_pie_plan'], use_container_width=True)
-            df_pie_data = df_charts['planli_gebelik_mi'].value_counts().reset_index().rename(columns={'planli_gebelik_mi': 'Kategori', 'count': 'Sayı (n)'})
-            st.dataframe(df_pie_data, use_container_width=True)
-        
-        st.divider()
-        st.subheader("Sayısal Değişkenlerin Gruplara Göre Dağılımı (Denklik Kontrolü)")
-        col1_box, col2_box = st.columns(2)
-        with col1_box:
-            st.plotly_chart(charts['fig_yas_box'], use_container_width=True)
-        with col2_box:
-            st.plotly_chart(charts['fig_hafta_box'], use_container_width=True)
-        
-        st.divider()
-        st.subheader("Kategorik Değişkenlerin Gruplara Göre Dağılımı (Denklik Kontrolü)")
-        col1_bar, col2_bar = st.columns(2)
-        with col1_bar:
-            st.plotly_chart(charts['fig_egitim_bar'], use_container_width=True)
-        with col2_bar:
-            st.plotly_chart(charts['fig_dogum_bar'], use_container_width=True)
-            
-        st.divider()
-        st.subheader("Ortalama Puanların Zamana Göre Evrimi")
-        st.plotly_chart(charts['fig_vas_line'], use_container_width=True)
-        
-        st.divider()
-        st.subheader("Korku Seviyesi Dağılımının Evrimi (Likert-tipi)")
-        st.plotly_chart(charts['fig_stacked'], use_container_width=True)
-        
-        st.divider()
-        st.subheader("Değişken İlişki Haritası (Korelasyon)")
-        st.plotly_chart(charts['fig_heatmap'], use_container_width=True)
-        
+        st.subheader(plan.dashboard_sections[section]['title'])
+        for i, (names, half) in enumerate(dashboard_rows(plan, plan.dashboard_sections[section]['charts'])):
+            if i and plan.charts[names[0]]['tur'] == 'pasta':
+                st.divider()
+            for column, name in zip(st.columns(2) if half else [st.container()], names):
+                with column:
+                    chart = plan.charts[name]
+                    if chart['tur'] == 'pasta':
+                        display_pie_with_table(aggregates, charts, name, chart['sutun'], chart['baslik'])
+                    else:
+                        st.plotly_chart(charts[name], use_container_width=True)
     except Exception as e:
         st.error(f"Görselleştirme hatası: {e}. Lütfen Excel dosyanızdaki sütun adlarını ('Kılavuz' sekmesinde belirtilen) kontrol edin.")
 
-def display_analysis_tab(analysis_results, charts_for_pdf):
-    """(v12.0) Analiz sekmesini çizer ve PDF indirme butonunu yönetir."""
+def show_inference_notes(analysis_results, key):
+    """Yeniden örnekleme / çoklu atama açıksa ilgili hipotezin ek sonuçlarını metrik altında gösterir."""
+    for note in inference_notes(analysis_results, key):
+        st.caption(note)
+
+def display_sensitivity_section(sensitivity, plan):
+    """Duyarlılık analizi: düzeltme seti başına p-değerleri, sağlamlık özeti ve forest grafiği."""
+    st.info("FAZ 2 hipotezleri farklı düzeltme (kovaryant) setleriyle yeniden kurulmuştur. **(ana model)** satırı, "
+            "yukarıdaki p < 0.05 kuralıyla seçilen düzeltmedir; karar setten sete değişiyorsa bulgu düzeltme seçimine duyarlıdır.")
+    st.dataframe(pd.DataFrame(sensitivity_summary_rows(sensitivity, plan)).style.format(precision=4),
+                 use_container_width=True, hide_index=True)
+    st.markdown("\n".join(f"* {line}" for line in robustness_lines(sensitivity, plan)))
+    st.plotly_chart(sensitivity_forest_chart(sensitivity, plan), use_container_width=True)
+
+def display_longitudinal_section(longitudinal):
+    """Tekrarlı ölçümler: zaman başına grup farkları ve grup × zaman karma modeli özeti."""
+    st.info(f"Her ölçümün tüm zamanları tek bir karma modelde (katılımcı başına rastgele sabit) analiz edilmiştir. "
+            f"**Fark**: {longitudinal['groups']['mudahale']} - {longitudinal['groups']['kontrol']} ortalaması; "
+            "**değişim farkı**: başlangıca göre değişimin gruplar arası farkı. Zamana göre grup ortalamaları dashboard'daki evrim grafiklerindedir.")
+    st.dataframe(pd.DataFrame(longitudinal_summary_rows(longitudinal)).style.format(precision=4),
+                 use_container_width=True, hide_index=True)
+    st.markdown("\n".join(f"* {line}" for line in longitudinal_model_lines(longitudinal)))
+
+def display_analysis_tab(analysis_results, charts_for_pdf, plan, df_cleaned):
+    """(v12.0) Analiz sekmesini çizer; PDF raporu ve dışa aktarma paketi indirme butonlarını yönetir."""
     try:
         if analysis_results.get('error'):
             st.error(analysis_results['error'])
         else:
+            incremental_info = analysis_results.get('incremental')
+            if incremental_info:
+                if incremental_info['reason']:
+                    st.caption(f"Artımlı analiz: tam yeniden hesaplama yapıldı ({incremental_info['reason']}); n = {incremental_info['total_rows']}.")
+                else:
+                    st.caption(f"Artımlı analiz: {incremental_info['new_rows']} yeni satır işlendi; toplam n = {incremental_info['total_rows']}.")
             st.divider()
             st.header("FAZ 1: Başlangıç Denkliği (Tanımlayıcı İstatistikler)")
             df_numeric = pd.DataFrame(analysis_results['faz1_numeric_p_values'].items(), columns=["Değişken", "p-değeri"])
@@ -477,21 +199,30 @@ def display_analysis_tab(analysis_results, charts_for_pdf):
                     Gördüğünüz p-değerleri, bu 'düzeltilmiş' sonuçlardır.
                 """)
             
-            col_h1, col_h2, col_h3 = st.columns(3)
-            with col_h1:
-                st.subheader("[H1: Latent Faz Korku]")
-                p1_vas = analysis_results['h1_vas_p']; p1_olcek = analysis_results['h1_olcek_p']
-                st.metric(label="VAS Sonucu", value="DESTEKLENDİ" if p1_vas < 0.05 else "Reddedildi", delta=f"p-değeri: {p1_vas:.6f}")
-                st.metric(label="Doğum Korku Ölçeği Sonucu", value="DESTEKLENDİ" if p1_olcek < 0.05 else "Reddedildi", delta=f"p-değeri: {p1_olcek:.6f}")
-            with col_h2:
-                st.subheader("[H2: Aktif Faz Korku]")
-                p2_vas = analysis_results['h2_vas_p']; p2_olcek = analysis_results['h2_olcek_p']
-                st.metric(label="VAS Sonucu", value="DESTEKLENDİ" if p2_vas < 0.05 else "Reddedildi", delta=f"p-değeri: {p2_vas:.6f}")
-                st.metric(label="Doğum Korku Ölçeği Sonucu", value="DESTEKLENDİ" if p2_olcek < 0.05 else "Reddedildi", delta=f"p-değeri: {p2_olcek:.6f}")
-            with col_h3:
-                st.subheader("[H3: Endişe Düzeyi]")
-                p3_oxford = analysis_results['h3_oxford_p']
-                st.metric(label="Oxford Endişe Ölçeği Sonucu", value="DESTEKLENDİ" if p3_oxford < 0.05 else "Reddedildi", delta=f"p-değeri: {p3_oxford:.6f}")
+            for column, group in zip(st.columns(len(plan.hypothesis_groups)), plan.hypothesis_groups):
+                with column:
+                    st.subheader(f"[{group['title']}]")
+                    for test in group['tests']:
+                        p_value = analysis_results[test['key']]
+                        st.metric(label=f"{test['label']} Sonucu", value="DESTEKLENDİ" if p_value < 0.05 else "Reddedildi", delta=f"p-değeri: {p_value:.6f}")
+                        show_inference_notes(analysis_results, test['key'])
+            
+            if analysis_results.get('strata'):
+                st.divider()
+                st.header(f"Merkez Bazlı Sonuçlar (Tabaka: {analysis_results['strata']['column']})")
+                st.info(f"Yukarıdaki FAZ 1 / FAZ 2 sonuçları birleşik modele aittir: tüm merkezler birlikte analiz edilmiş ve FAZ 2 "
+                        f"formüllerine **{analysis_results['strata_term'].lstrip(' +')}** terimi eklenmiştir. Aşağıda her merkez ayrıca analiz edilmiştir.")
+                st.dataframe(pd.DataFrame(stratified_summary_rows(analysis_results, plan)), use_container_width=True, hide_index=True)
+
+            if analysis_results.get('sensitivity'):
+                st.divider()
+                st.header("Duyarlılık Analizi (Alternatif Düzeltme Setleri)")
+                display_sensitivity_section(analysis_results['sensitivity'], plan)
+
+            if analysis_results.get('longitudinal'):
+                st.divider()
+                st.header("Tekrarlı Ölçümler (Grup × Zaman Karma Modeli)")
+                display_longitudinal_section(analysis_results['longitudinal'])
             
             st.divider()
             st.header("Nihai Rapor Yorumu (Analist Özeti)")
@@ -509,14 +240,62 @@ def display_analysis_tab(analysis_results, charts_for_pdf):
             st.header("Raporu Dışa Aktar")
             try:
                 # (v12.0) PDF BUTONU ARTIK GRAFİKLERİ DE GÖNDERİYOR
-                pdf_bytes = create_pdf_report(analysis_results, charts_for_pdf)
+                # PDF her yeniden çalıştırmada değil, yalnızca indirme istendiğinde (bir kez) oluşturulur. Oturumda
+                # bayt dizisi değil, büyük raporlarda diske taşan geçici dosya tutulur; baytlar yalnızca indirme sırasında okunur.
+                pdf_holder = st.session_state.setdefault('pdf_holder', {})
+                run_id = st.session_state.get('analysis_run_id')
+                track_memory = st.session_state.get('perf_memory', False)
+
+                pdf_lock = pdf_holder.setdefault('lock', threading.Lock())
+
+                def ensure_pdf():
+                    """Raporu ilk istekte oluşturur (çağıran pdf_lock'u tutar)."""
+                    if 'file' not in pdf_holder:
+                        with StageTrace('pdf', track_memory=track_memory) as trace:
+                            pdf_holder['file'] = create_pdf_report_file(analysis_results, charts_for_pdf, plan=plan)
+                        pdf_holder['trace'] = trace
+                        # Oluşturulan rapor geçmiş kaydına eklenir; "Geçmiş Analizler" sekmesinden yeniden indirilebilir
+                        if run_id is not None:
+                            get_results_store().save_artifact(run_id, pdf_holder['file'], 'pdf')
+                    return pdf_holder['file']
+
+                def build_pdf():
+                    with pdf_lock:
+                        pdf_file = ensure_pdf()
+                        pdf_file.seek(0)
+                        return pdf_file.read()
+
                 st.download_button(
                     label="Kapsamlı Raporu PDF Olarak İndir (Metin + Grafikler)",
-                    data=pdf_bytes,
+                    data=build_pdf,
                     file_name="Ebelik_Arastirma_Raporu_v12.pdf",
                     mime="application/pdf",
                     use_container_width=True
                 )
+
+                # Dışa aktarma paketi: sonuçlar JSON / Parquet, temizlenmiş veri ve HTML grafikler; PDF (ve
+                # dolayısıyla rasterleştirme) yalnızca istenirse eklenir, hazır PDF varsa yeniden oluşturulmaz.
+                bundle_holder = st.session_state.setdefault('bundle_holder', {})
+                include_pdf = st.checkbox("PDF raporunu pakete ekle", value=False, key='bundle_include_pdf')
+
+                def build_bundle():
+                    key = 'pdf' if include_pdf else 'veri'
+                    with bundle_holder.setdefault('lock', threading.Lock()):
+                        if key not in bundle_holder:
+                            with pdf_lock, StageTrace('paket', track_memory=track_memory) as trace:
+                                bundle_holder[key] = create_export_bundle_file(
+                                    analysis_results, df_cleaned, charts_for_pdf, plan=plan, pdf=ensure_pdf() if include_pdf else None)
+                            bundle_holder['trace'] = trace
+                        bundle_holder[key].seek(0)
+                        return bundle_holder[key].read()
+
+                st.download_button(
+                    label="Analiz Paketini İndir (ZIP: JSON / Parquet sonuçlar, veri, HTML grafikler)",
+                    data=build_bundle,
+                    file_name="Ebelik_Arastirma_Paketi_v12.zip",
+                    mime="application/zip",
+                    use_container_width=True
+                )
             except Exception as pdf_e:
                 st.error(f"PDF oluşturulurken bir hata oluştu: {pdf_e}")
                 st.error("Rapor PDF'e dönüştürülemedi. 'kaleido' kütüphanesinin kurulu olduğundan emin olun.")
@@ -525,9 +304,180 @@ def display_analysis_tab(analysis_results, charts_for_pdf):
         st.error(f"Genel bir hata oluştu: {e}")
         st.warning("Analiz başarısız olduğu için PDF raporu oluşturulamaz.")
 
+def display_power_tab(df_pilot, plan):
+    """Yüklenen veriyi pilot çalışma kabul ederek simülasyon tabanlı güç eğrilerini hesaplar."""
+    st.header("Güç ve Örneklem Büyüklüğü Planlama (Simülasyon)")
+    st.markdown("""
+    Yüklenen veri **pilot çalışma** olarak kullanılır: grup ortalamaları, değişkenler arası korelasyonlar ve kategorik
+    oranlar kestirilir, seçilen her örneklem büyüklüğü için binlerce sentetik çalışma üretilir ve her birine bu
+    uygulamanın **aynı analiz hattı** (FAZ 1 denklik + dinamik düzeltme + FAZ 2 ANCOVA) uygulanır. Güç, ilgili
+    hipotezin p < α çıktığı simülasyonların oranıdır.
+    """)
+    with st.form("power_form"):
+        col_n, col_sims, col_scale = st.columns(3)
+        n_text = col_n.text_input("Grup başına n değerleri (virgülle)", value=", ".join(str(n) for n in DEFAULT_POWER_CONFIG['n_per_group']))
+        n_simulations = col_sims.number_input("Simülasyon sayısı (her n için)", min_value=100, max_value=20000,
+                                              value=DEFAULT_POWER_CONFIG['n_simulations'], step=100)
+        effect_scale = col_scale.number_input("Etki büyüklüğü çarpanı", min_value=0.0, max_value=3.0, value=DEFAULT_POWER_CONFIG['effect_scale'],
+                                              step=0.1, help="Pilotta gözlenen grup farkları bu çarpanla ölçeklenir (1.0 = pilottaki etki).")
+        submitted = st.form_submit_button("Güç Analizini Çalıştır")
+
+    if submitted:
+        try:
+            n_values = [int(part) for part in n_text.replace(';', ',').split(',') if part.strip()]
+        except ValueError:
+            st.error("Grup başına n değerleri tam sayı olmalıdır (ör. 30, 50, 100).")
+            return
+        # Simülasyon arka plan işi olarak, seri çalışır (Streamlit sürecinde süreç havuzu açılmaz)
+        power_config = {**DEFAULT_POWER_CONFIG, 'n_per_group': n_values, 'n_simulations': int(n_simulations),
+                        'effect_scale': float(effect_scale), 'n_jobs': 1}
+        cache_key = make_cache_key(df_pilot, {**power_config, 'n_jobs': None, 'protokol_ozeti': plan.key}, namespace='power')
+        power_results = get_result_cache().get(cache_key)
+        if power_results is None:
+            st.session_state.pop('power_results', None)
+            st.session_state.power_job = get_job_manager().submit(run_power_job, df_pilot, power_config, plan, cache_key,
+                                                                  key=cache_key, label="Güç analizi")
+        else:
+            st.session_state.power_results = power_results
+
+    if 'power_job' in st.session_state:
+        show_power_job_progress()
+    power_results = st.session_state.get('power_results')
+    if not power_results:
+        return
+    if power_results.get('error'):
+        st.error(power_results['error'])
+        return
+    st.caption("Pilot: " + ", ".join(f"{group} n = {n}" for group, n in power_results['pilot_n'].items()) + " | "
+               f"Etki büyüklüğü çarpanı: {power_results['effect_scale']} | Tohum: {power_results['seed']}")
+    st.plotly_chart(power_curve_chart(power_results), use_container_width=True)
+    st.dataframe(power_table(power_results).style.format(precision=3), use_container_width=True, hide_index=True)
+    summary = [f"**{title.removesuffix(' p')}**: " + (f"grup başı n ≥ {n}" if (n := required_n(power_results, key)) else "denenen n değerlerinde %80 güce ulaşılamadı")
+               + f" (pilot etki büyüklüğü d = {power_results['effect_sizes'][key]:.2f})"
+               for key, title in power_results['titles'].items()]
+    st.markdown("%80 güç için gereken en küçük örneklem:\n\n" + "\n".join(f"* {line}" for line in summary))
+
+@st.fragment(run_every=1.0)
+def show_power_job_progress():
+    """Arka plandaki güç simülasyonu işini yoklar; bittiğinde sonuçları oturuma alır ve sayfayı yeniler."""
+    job = get_job_manager().get(st.session_state.power_job)
+    if job is None:
+        del st.session_state['power_job']
+        st.warning("Güç analizi işi bulunamadı (sunucu yeniden başlatılmış olabilir). Lütfen yeniden çalıştırın.")
+    elif job.status == JOB_DONE:
+        st.session_state.power_results = job.result
+        del st.session_state['power_job']
+        st.rerun()
+    elif job.status == JOB_FAILED:
+        del st.session_state['power_job']
+        st.error(f"Güç analizi sırasında bir hata oluştu: {job.error}")
+    else:
+        st.progress(job.progress, text=f"{job.message} ({job.elapsed:.0f} sn)")
+
+@st.fragment(run_every=1.0)
+def show_analysis_job_progress():
+    """Arka plandaki analiz işini yoklar; bittiğinde sonuçları oturuma alır ve sayfayı yeniler."""
+    job_id = st.session_state.get('analysis_job')
+    if job_id is None:
+        return
+    job = get_job_manager().get(job_id)
+    if job is None:
+        del st.session_state['analysis_job']
+        st.warning("Analiz işi bulunamadı (sunucu yeniden başlatılmış olabilir). Lütfen analizi yeniden başlatın.")
+    elif job.status == JOB_DONE:
+        output = job.result
+        st.session_state.df_for_tabs = output['df_cleaned']
+        st.session_state.analysis_results = output['results']
+        st.session_state.analysis_run_id = output.get('run_id')
+        st.session_state.perf_traces = {'Analiz işi': output['trace']}
+        st.session_state.study_plan = output['plan']
+        # Grafikler burada oluşturulmaz: dashboard bölümü açıldığında (veya PDF istendiğinde) tek tek
+        # oluşturulur ve aynı anahtarla grafik başına önbelleğe yazılır.
+        st.session_state.charts_dict = {} if output['cache_key'] is None else LazyCharts(
+            output['df_cleaned'], dataset_key=output['cache_key'], cache=get_result_cache(), plan=output['plan'])
+        del st.session_state['analysis_job']
+        st.rerun()
+    elif job.status == JOB_FAILED:
+        del st.session_state['analysis_job']
+        st.error(f"Genel bir hata oluştu: {job.error}")
+    else:
+        st.progress(job.progress, text=f"{job.message} ({job.elapsed:.0f} sn)")
+
+def _plan_for_config(config):
+    """Geçmiş bir kaydın çalışma tanımı (tanım dosyası artık yoksa varsayılan protokol)."""
+    try:
+        return get_study_plan((config or {}).get('protokol'))
+    except ValueError:
+        return get_study_plan()
+
+def display_history_tab():
+    """Kalıcı sonuç deposundaki geçmiş analizleri filtreler ve seçilen raporu yeniden hesaplamadan gösterir."""
+    st.header("Geçmiş Analizler")
+    store = get_results_store()
+    studies = store.studies()
+    if not studies:
+        st.info("Henüz kaydedilmiş bir analiz yok. Tamamlanan her analiz (arayüz veya komut satırı) burada listelenir.")
+        return
+
+    col_study, col_site, col_since, col_until = st.columns(4)
+    study = col_study.selectbox("Çalışma", ["(Tümü)"] + studies, key='history_study')
+    study = None if study == "(Tümü)" else study
+    site = col_site.selectbox("Merkez", ["(Birleşik / tek merkez)"] + store.sites(study), key='history_site')
+    site = None if site == "(Birleşik / tek merkez)" else site
+    since = col_since.date_input("Başlangıç tarihi", value=None, key='history_since')
+    until = col_until.date_input("Bitiş tarihi", value=None, key='history_until')
+
+    runs = store.query_runs(study=study, site=site, since=since and since.isoformat(), until=until and until.isoformat())
+    if not runs:
+        st.info("Seçilen filtrelere uyan analiz bulunamadı.")
+        return
+    table = pd.DataFrame(runs)
+    table['FAZ 1'] = table['faz1_is_denk'].map({1: 'Denk', 0: 'Denk değil'})
+    table['Denk olmayanlar'] = table['failed_vars_json'].map(lambda value: ", ".join(json.loads(value or '[]')))
+    table = table.rename(columns={'id': 'Kayıt', 'created_at': 'Tarih', 'study': 'Çalışma', 'site': 'Merkez', 'source': 'Kaynak',
+                                  'n_rows': 'n', 'correction': 'Düzeltme', **{key: STRATA_TABLE_P_COLUMNS[key] for key in P_VALUE_COLUMNS}})
+    st.dataframe(table[['Kayıt', 'Tarih', 'Çalışma', 'Merkez', 'Kaynak', 'n', 'FAZ 1', 'Denk olmayanlar', 'Düzeltme',
+                        *STRATA_TABLE_P_COLUMNS.values()]],
+                 use_container_width=True, hide_index=True)
+
+    run_id = st.selectbox("Raporu görüntülenecek kayıt", [run['id'] for run in runs], key='history_run',
+                          format_func=lambda value: next(f"#{run['id']} - {run['study']} ({run['created_at']})" for run in runs if run['id'] == value))
+    run = store.get_run(run_id)
+    past_results = store.load_results(run_id)
+    past_plan = _plan_for_config(store.load_config(run_id))
+    st.subheader(past_results.get('final_report_title') or "Rapor")
+    st.markdown(past_results.get('final_report_text') or "")
+    if past_results.get('correction_applied'):
+        st.caption(f"FAZ 2 düzeltmesi: {past_results['correction_applied'].lstrip(' +')}")
+    # Hipotezler sonuçlardaki FAZ 2 modellerinden okunur (tanım dosyası kayıttan sonra değişmiş olabilir)
+    p_titles = {key: past_plan.p_value_titles.get(key, key) for key in past_results.get('faz2_models') or past_plan.p_value_titles}
+    metric_cols = st.columns(len(p_titles))
+    for metric_col, (key, title) in zip(metric_cols, p_titles.items()):
+        metric_col.metric(title, f"{past_results[key]:.4f}" if pd.notna(past_results.get(key)) else "-")
+    if past_results.get('strata'):
+        st.dataframe(pd.DataFrame(stratified_summary_rows(past_results, past_plan)), use_container_width=True, hide_index=True)
+    if past_results.get('sensitivity') and set(past_plan.p_value_titles) == set(past_results['sensitivity']['robustness']):
+        st.dataframe(pd.DataFrame(sensitivity_summary_rows(past_results['sensitivity'], past_plan)).style.format(precision=4),
+                     use_container_width=True, hide_index=True)
+
+    col_json, col_pdf = st.columns(2)
+    col_json.download_button("Sonuçları JSON Olarak İndir", data=results_to_json(past_results, indent=2),
+                             file_name=f"{run['study']}_{run_id}_sonuclar.json", mime="application/json", use_container_width=True)
+    if run['pdf_path'] and os.path.exists(run['pdf_path']):
+        # Dosya her yeniden çalıştırmada değil, yalnızca indirme istendiğinde diskten okunur
+        col_pdf.download_button("Kaydedilmiş PDF Raporunu İndir", data=lambda path=run['pdf_path']: _read_file(path),
+                                file_name=os.path.basename(run['pdf_path']), mime="application/pdf", use_container_width=True)
+    else:
+        col_pdf.caption("Bu kayıt için PDF raporu oluşturulmamış (rapor sekmesinden indirildiğinde otomatik kaydedilir).")
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
 def clear_session_state():
-    """Yeni bir dosya yüklendiğinde eski sonuçları ve grafikleri hafızadan siler."""
-    keys_to_delete = ['analysis_results', 'df_for_tabs', 'charts_dict']
+    """Yeni bir dosya yüklendiğinde eski sonuçları, grafikleri ve bekleyen iş kaydını hafızadan siler."""
+    keys_to_delete = ['analysis_results', 'df_for_tabs', 'charts_dict', 'pdf_holder', 'bundle_holder', 'power_results', 'analysis_job', 'analysis_run_id',
+                      'perf_traces', 'study_plan']
     for key in keys_to_delete:
         if key in st.session_state:
             del st.session_state[key]
@@ -535,15 +485,27 @@ def clear_session_state():
 # --- 8. ANA UYGULAMA MANTIĞI (v12.2) ---
 
 st.set_page_config(page_title="Ebelik Araştırması Analiz Motoru", layout="wide")
+configure_logging()
 
 # --- Kenar Çubuğu (Sidebar) ---
 st.sidebar.title("🤰 Ebelik Araştırması")
+study_specs = available_study_specs()
+study_choice = st.sidebar.selectbox(
+    "Çalışma protokolü", list(study_specs) or [DEFAULT_STUDY], on_change=clear_session_state, key='study_protocol',
+    index=list(study_specs).index(DEFAULT_STUDY) if DEFAULT_STUDY in study_specs else 0,
+    help="Sütunlar, hipotezler, grafikler ve rapor ekleri specs/ klasöründeki çalışma tanımı dosyasından okunur."
+)
+try:
+    plan = get_study_plan(study_choice)
+except ValueError as e:
+    st.error(f"Çalışma tanımı yüklenemedi: {e}")
+    st.stop()
 st.sidebar.header("Adım 1: Şablonu İndirin")
-excel_buffer = create_template_excel()
+excel_buffer = create_template_excel(plan.name, plan.key)
 st.sidebar.download_button(
     label="Boş Excel Şablonunu İndir",
     data=excel_buffer,
-    file_name="Ebelik_Veri_Giris_Sabloni.xlsx",
+    file_name="Ebelik_Veri_Giris_Sabloni.xlsx" if plan.name == DEFAULT_STUDY else f"{plan.name}_veri_giris_sablonu.xlsx",
     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     use_container_width=True,
     help="Analiz motorunun çalışması için verilerinizi bu şablona girmeniz gerekmektedir."
@@ -552,12 +514,91 @@ st.sidebar.download_button(
 st.sidebar.header("Adım 2: Şablonu Yükleyin")
 uploaded_file = st.sidebar.file_uploader(
     "Lütfen doldurduğunuz şablonu buraya yükleyin",
-    type=["xlsx"],
+    type=["xlsx", "csv", "parquet"],
     on_change=clear_session_state, 
-    help="Verilerinizle doldurduğunuz 'Ebelik_Veri_Giris_Sabloni.xlsx' dosyasını yükleyin."
+    help="Verilerinizle doldurduğunuz 'Ebelik_Veri_Giris_Sabloni.xlsx' dosyasını yükleyin (aynı sütunlara sahip .csv / .parquet dışa aktarımları da kabul edilir)."
 )
 
 st.sidebar.header("Adım 3: Analiz Edin")
+strata_col = None
+if uploaded_file is not None:
+    # Sütun adları yalnızca başlık satırından, dosya başına bir kez okunur
+    cached_columns = st.session_state.get('upload_columns')
+    if not cached_columns or cached_columns[0] != uploaded_file.file_id:
+        st.session_state.upload_columns = (uploaded_file.file_id, read_columns(uploaded_file))
+    strata_options = candidate_strata_columns(st.session_state.upload_columns[1], plan)
+    if strata_options:
+        strata_choice = st.sidebar.selectbox(
+            "Merkez / tabaka sütunu (çok merkezli analiz)", ["(Yok - tek merkez)"] + strata_options, on_change=clear_session_state,
+            help="Seçilirse FAZ 1 / FAZ 2 her merkez için ayrıca çalıştırılır ve birleşik modele merkez terimi eklenir."
+        )
+        strata_col = None if strata_choice == "(Yok - tek merkez)" else strata_choice
+use_incremental = st.sidebar.checkbox(
+    "Artımlı analiz (yalnızca yeni eklenen satırlar)", value=False, on_change=clear_session_state,
+    help="Aynı dosya yeni katılımcılarla yeniden yüklendiğinde, önceki analizin özet istatistiklerini kullanır ve yalnızca eklenen satırları işler (çok merkezli analizde kullanılmaz)."
+)
+with st.sidebar.expander("Gelişmiş: Permütasyon / Bootstrap"):
+    use_resampling = st.checkbox(
+        "Yeniden örnekleme çıkarımını ekle", value=False, on_change=clear_session_state,
+        help="FAZ 2 hipotezleri için grup etkisinin permütasyon p-değerlerini ve bootstrap güven aralıklarını da hesaplar."
+    )
+    n_resamples = st.number_input(
+        "Permütasyon / bootstrap sayısı", min_value=200, max_value=20000,
+        value=DEFAULT_RESAMPLING_CONFIG['n_permutations'], step=200, on_change=clear_session_state
+    )
+    resampling_seed = st.number_input("Rastgele tohum (seed)", min_value=0, value=DEFAULT_RESAMPLING_CONFIG['seed'], step=1, on_change=clear_session_state)
+with st.sidebar.expander("Gelişmiş: Çoklu Atama (Eksik Veri)"):
+    use_imputation = st.checkbox(
+        "Eksik değerleri çoklu atamayla doldur", value=False, on_change=clear_session_state,
+        help="FAZ 2 modellerini, eksik değerleri zincirleme denklemlerle (MICE) m kez atanmış veri setlerinde kurar ve Rubin kurallarıyla birleştirir."
+    )
+    n_imputations = st.number_input("Atama sayısı (m)", min_value=5, max_value=100, value=DEFAULT_IMPUTATION_CONFIG['m'], step=5, on_change=clear_session_state)
+with st.sidebar.expander("Gelişmiş: Duyarlılık Analizi (Düzeltme Setleri)"):
+    use_sensitivity = st.checkbox(
+        "Alternatif düzeltme setlerini de kur", value=False, on_change=clear_session_state,
+        help="FAZ 2 hipotezlerini düzeltmesiz, FAZ 1 p-değeri eşiklerine göre ve tüm başlangıç kovaryantlarıyla da kurar; "
+             "sonuçlar sağlamlık tablosu ve forest grafiğiyle gösterilir."
+    )
+    sensitivity_thresholds = st.multiselect(
+        "FAZ 1 p-değeri eşikleri", [0.05, 0.10, 0.15, 0.20, 0.25], default=DEFAULT_SENSITIVITY_CONFIG['thresholds'],
+        on_change=clear_session_state, help="Her eşik için, FAZ 1 p-değeri eşiğin altında kalan kovaryantlar modele eklenir."
+    )
+with st.sidebar.expander("Gelişmiş: Tekrarlı Ölçümler (Karma Model)"):
+    use_longitudinal = st.checkbox(
+        "Grup × zaman karma modelini ekle", value=False, on_change=clear_session_state, disabled=not plan.repeated_measures,
+        help="Tekrarlı ölçümlerin (ör. baseline / 4cm / 8cm) tüm zamanlarını katılımcı başına rastgele sabitli tek bir modelde "
+             "analiz eder; zaman başına grup farklarını ve grup × zaman etkileşim testini raporlar."
+    )
+    if not plan.repeated_measures:
+        st.caption("Seçili çalışma tanımında tekrarlı ölçüm (tekrarli_olcumler) tanımlı değil.")
+analysis_config = {
+    **ANALYSIS_CONFIG,
+    'protokol': plan.name, 'protokol_ozeti': plan.key,
+    'yeniden_ornekleme': {
+        **DEFAULT_RESAMPLING_CONFIG, 'n_permutations': int(n_resamples), 'n_bootstrap': int(n_resamples),
+        'seed': int(resampling_seed), 'n_jobs': min(4, os.cpu_count() or 1)
+    } if use_resampling else None,
+    'merkez_sutunu': strata_col,
+    'coklu_atama': {
+        # Seri: atamalar Streamlit sürecindeki bir iş parçacığından süreç havuzu açmaz (batch_cli / API ile aynı)
+        **DEFAULT_IMPUTATION_CONFIG, 'm': int(n_imputations), 'n_jobs': 1
+    } if use_imputation else None,
+    'duyarlilik': {
+        **DEFAULT_SENSITIVITY_CONFIG, 'thresholds': sorted(sensitivity_thresholds), 'n_jobs': min(4, os.cpu_count() or 1)
+    } if use_sensitivity else None,
+    'tekrarli_olcum': dict(DEFAULT_LONGITUDINAL_CONFIG) if use_longitudinal and plan.repeated_measures else None
+}
+perf_expander = st.sidebar.expander("Performans (Aşama Süreleri)")
+with perf_expander:
+    track_memory = st.checkbox(
+        "Tepe belleği de ölç (tracemalloc)", value=False, key='perf_memory', on_change=clear_session_state,
+        help="Her aşamanın Python bellek tepesini kaydeder; ölçüm analizi belirgin biçimde yavaşlatır."
+    )
+    profiler_choice = st.selectbox(
+        "Tek seferlik profil", ["(Kapalı)", *PROFILERS], key='perf_profiler', on_change=clear_session_state,
+        help="Bir sonraki analizi cProfile / pyinstrument altında çalıştırır (sonuç önbelleği atlanır)."
+    )
+perf_options = {'bellek': track_memory, 'profil': None if profiler_choice == "(Kapalı)" else profiler_choice}
 start_analysis = st.sidebar.button("Analizi Başlat", type="primary", use_container_width=True, help="Yüklenen veriyi analiz eder ve raporlar.")
 st.sidebar.divider()
 st.sidebar.info("v12.2 - Uzman Sistem (Temiz & Kapsamlı Rapor)")
@@ -622,78 +663,90 @@ footer_html = f"""
 """
 st.markdown(footer_html, unsafe_allow_html=True)
 # --- Footer Eklentisi Bitişi ---
-st.markdown(footer_html, unsafe_allow_html=True)
-# --- Footer Eklentisi Bitişi ---
-st.markdown(footer_html, unsafe_allow_html=True)
-# --- Footer Eklentisi Bitişi ---
-st.markdown(footer_html, unsafe_allow_html=True)
-# --- Footer Eklentisi Bitişi ---
-
 
-# 3 Sekmeyi her zaman göster
-tab_kılavuz, tab_dashboard, tab_analiz = st.tabs([
-    "ℹ️ Protokol Kılavuzu", 
-    "📊 Veri Seti Özeti (Dashboard)",
-    "📈 İstatistiksel Analiz (Rapor)"
-])
-
-with tab_kılavuz:
-    display_kılavuz_tab()
 
 # --- Analiz ve Yükleme Mantığı ---
+# Analiz arka plan işi olarak gönderilir; betik iş parçacığı beklemez, iş yeniden çalıştırmalardan etkilenmez
 if start_analysis:
     if uploaded_file is not None:
-        if 'analysis_results' not in st.session_state: 
-            try:
-                df_from_excel = None
-                with st.spinner("Veri okunuyor ve 'yok', '7,0' gibi hatalı girişler temizleniyor..."):
-                    df_from_excel = pd.read_excel(uploaded_file, engine='openpyxl')
-                    
-                    df_cleaned = df_from_excel.copy()
-                    for col in NUMERIC_COLUMNS:
-                        if col in df_cleaned.columns:
-                            df_cleaned[col] = pd.to_numeric(df_cleaned[col], errors='coerce')
-                        else:
-                            pass 
-                    
-                    st.session_state.df_for_tabs = df_cleaned 
-
-                with st.spinner("İstatistiksel analiz motoru çalıştırılıyor... (Dinamik Düzeltme yapılıyor...)"):
-                    st.session_state.analysis_results = run_full_analysis(df_cleaned)
-                
-                if st.session_state.analysis_results.get('error') is None:
-                    with st.spinner("Tüm dashboard grafikleri oluşturuluyor... (Bu işlem 10-15 saniye sürebilir...)"):
-                        st.session_state.charts_dict = generate_all_charts(df_cleaned)
-                else:
-                    st.session_state.charts_dict = {} 
-                
-                st.rerun() 
-                
-            except Exception as e:
-                st.error(f"Genel bir hata oluştu: {e}")
-                clear_session_state()
+        if 'analysis_results' not in st.session_state and 'analysis_job' not in st.session_state:
+            file_bytes = uploaded_file.getvalue()
+            job_key = analysis_job_key(file_bytes, uploaded_file.name, analysis_config, use_incremental, perf_options)
+            st.session_state.analysis_job = get_job_manager().submit(
+                run_analysis_job, file_bytes, uploaded_file.name, analysis_config, use_incremental, perf_options,
+                key=job_key, label=uploaded_file.name
+            )
     else:
         st.warning("Lütfen 'Analizi Başlat' butonuna basmadan önce Adım 2'de bir dosya yükleyin.")
 
+if 'analysis_job' in st.session_state:
+    show_analysis_job_progress()
+
+# 5 Sekmeyi her zaman göster
+tab_kılavuz, tab_dashboard, tab_analiz, tab_guc, tab_gecmis = st.tabs([
+    "ℹ️ Protokol Kılavuzu", 
+    "📊 Veri Seti Özeti (Dashboard)",
+    "📈 İstatistiksel Analiz (Rapor)",
+    "🔋 Güç Analizi (Planlama)",
+    "🗂️ Geçmiş Analizler"
+])
+
+with tab_kılavuz:
+    display_kılavuz_tab(plan)
+with tab_gecmis:
+    display_history_tab()
+
 # --- Sekmeleri Doldurma ---
 if 'analysis_results' in st.session_state and 'df_for_tabs' in st.session_state:
     results = st.session_state.analysis_results
     df_display = st.session_state.df_for_tabs
     charts = st.session_state.get('charts_dict', {}) 
+    result_plan = st.session_state.get('study_plan', plan)
     
     if results.get('error'):
         with tab_analiz: 
             st.error(results['error'])
         with tab_dashboard:
             st.error(f"Analiz başarısız olduğu için dashboard oluşturulamadı: {results['error']}")
+        with tab_guc:
+            st.error(f"Analiz başarısız olduğu için güç analizi yapılamaz: {results['error']}")
     else:
         with tab_dashboard:
-            display_dashboard_tab(df_display, charts)
+            with StageTrace('dashboard', track_memory=track_memory) as dashboard_trace:
+                display_dashboard_tab(df_display, charts, result_plan, results.get('strata', {}).get('column'))
+            st.session_state.setdefault('perf_traces', {})['Dashboard (son çizim)'] = dashboard_trace
         with tab_analiz:
-            display_analysis_tab(results, charts)
+            display_analysis_tab(results, charts, result_plan, df_display)
+        with tab_guc:
+            display_power_tab(df_display, result_plan)
 else:
     with tab_dashboard:
         st.info("Veri setinin görsel özetini görmek için lütfen sol menüdeki adımları izleyin.")
     with tab_analiz:
         st.info("İstatistiksel analiz raporunu görmek için lütfen sol menüdeki adımları izleyin.")
-
+    with tab_guc:
+        st.info("Güç analizi için pilot çalışma verinizi şablonla yükleyip analizi başlatın; pilot veriden kestirilen etki büyüklükleriyle simülasyon yapılır.")
+
+# --- Performans Paneli (kenar çubuğundaki genişletici; sekmeler çizildikten sonra doldurulur) ---
+with perf_expander:
+    perf_traces = dict(st.session_state.get('perf_traces', {}))
+    if st.session_state.get('pdf_holder', {}).get('trace') is not None:
+        perf_traces['PDF raporu'] = st.session_state.pdf_holder['trace']
+    if st.session_state.get('bundle_holder', {}).get('trace') is not None:
+        perf_traces['Dışa aktarma paketi'] = st.session_state.bundle_holder['trace']
+    if not perf_traces:
+        st.caption("Analiz çalıştırıldığında okuma, temizleme, FAZ 1 / FAZ 2, grafik ve PDF aşamalarının süreleri burada listelenir.")
+    for label, trace in perf_traces.items():
+        st.markdown(f"**{label}** - {trace.wall_sn:.2f} sn")
+        st.dataframe(pd.DataFrame(trace.summary_rows()).dropna(axis=1, how='all'), use_container_width=True, hide_index=True)
+        if trace.profile_text:
+            st.code(trace.profile_text[:20000], language=None)
+        if trace.profile_file:
+            st.download_button(f"Profil dosyasını indir ({label})", data=trace.profile_file[1], file_name=trace.profile_file[0],
+                               key=f'perf_profile_{trace.id}', use_container_width=True)
+    if perf_traces:
+        st.download_button("İzi indir (chrome://tracing / Perfetto JSON)", data=json.dumps(traces_to_chrome(perf_traces.values())),
+                           file_name="ebelik_performans_izi.json", mime="application/json", use_container_width=True)
+
+# --- Isınma: statsmodels / scipy / plotly / fpdf / kaleido ilk çizimden sonra arka planda yüklenir (süreç başına bir kez) ---
+start_warmup()
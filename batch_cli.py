@@ -0,0 +1,245 @@
+"""Arayüzsüz toplu analiz (komut satırı).
+
+Bir klasördeki tüm şablon dosyalarını (.xlsx / .csv / .parquet) bir süreç havuzunda analiz eder
+ve her çalışma için JSON sonuç dosyası ile PDF raporu yazar:
+
+    python batch_cli.py veriler/ -o raporlar/ -j 4
+
+--artimli ile her dosyanın önceki çalıştırmadaki durumu önbellekten okunur ve
+yalnızca yeni eklenen satırlar işlenir (haftalık ara analizler için). --iz ile
+her dosya için aşama süreleri `<dosya>_iz.json` (chrome://tracing) olarak yazılır.
+--protokol ile varsayılan dışındaki bir çalışma tanımı (specs/<ad>.json) kullanılır.
+--paket her çalışma için ayrıca `<dosya>_paket.zip` dışa aktarma paketi yazar
+(sonuçlar JSON / Parquet, temizlenmiş veri, HTML grafikler; PDF yazıldıysa o da).
+--sablonlari-uret, arayüzün indirttiği hazır boş şablonları (assets/sablonlar)
+tanım dosyalarından yeniden üretir.
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analysis import (
+    ANALYSIS_CONFIG, generate_all_charts, get_result_cache, results_to_json, run_full_analysis, write_pdf_report,
+    write_template_assets
+)
+from ancova_engine import ANCOVA_METHODS
+from export_bundle import CHART_FORMATS, write_export_bundle
+from incremental import incremental_state_key, run_incremental_analysis
+from ingest import SUPPORTED_EXTENSIONS, read_study, prepare_study
+from imputation import DEFAULT_IMPUTATION_CONFIG
+from profiling import StageTrace, configure_logging, stage
+from resampling import DEFAULT_RESAMPLING_CONFIG
+from result_cache import make_cache_key
+from sensitivity import DEFAULT_SENSITIVITY_CONFIG
+from longitudinal import DEFAULT_LONGITUDINAL_CONFIG, LONGITUDINAL_METHODS
+from results_store import get_results_store
+from stratified import run_stratified_analysis
+from study_spec import DEFAULT_STUDY, get_study_plan
+
+
+def analyze_study_file(path, output_dir, ancova_method=ANALYSIS_CONFIG['ancova_yontemi'], write_pdf=True, resampling=None,
+                       incremental=False, strata_col=None, imputation=None, record=True, trace=False, study=None, sensitivity=None,
+                       longitudinal=None, bundle_formats=None):
+    """Tek bir çalışma dosyasını analiz eder; üretilen dosyaların yollarını ve özet durumu döndürür.
+
+    study: çalışma tanımının adı veya yolu (varsayılan protokol için None).
+    bundle_formats: dışa aktarma paketi için grafik biçimleri (ör. ('html',)); None ise paket yazılmaz.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    summary = {'dosya': path, 'json': None, 'pdf': None, 'paket': None, 'hata': None}
+    started = time.perf_counter()
+    # İz istenmezse aşama blokları hiçbir şey kaydetmez
+    with StageTrace(stem) if trace else contextlib.nullcontext() as stage_trace:
+        try:
+            plan = get_study_plan(study)
+            with stage('okuma'):
+                df_raw = read_study(path)
+            try:
+                with stage('temizleme', rows=len(df_raw)):
+                    df_cleaned = prepare_study(df_raw, plan)
+            except ValueError as e:
+                # Şablon hatası: analiz yapılmaz ama JSON'a hata mesajı yazılır
+                df_cleaned, results = df_raw, {'error': str(e)}
+            else:
+                with stage('analiz', rows=len(df_cleaned)):
+                    if strata_col:
+                        results = run_stratified_analysis(df_cleaned, strata_col, ancova_method=ancova_method, resampling=resampling,
+                                                          imputation=imputation, plan=plan, sensitivity=sensitivity,
+                                                          longitudinal=longitudinal)
+                    elif incremental:
+                        cache = get_result_cache()
+                        state_key = incremental_state_key(os.path.basename(path), {**ANALYSIS_CONFIG, 'protokol_ozeti': plan.key})
+                        results, state = run_incremental_analysis(df_cleaned, cache.get(state_key), resampling=resampling,
+                                                                  imputation=imputation, plan=plan, sensitivity=sensitivity,
+                                                                  longitudinal=longitudinal)
+                        if state is not None:
+                            cache.set(state_key, state)
+                    else:
+                        results = run_full_analysis(df_cleaned, ancova_method=ancova_method, resampling=resampling, imputation=imputation,
+                                                    plan=plan, sensitivity=sensitivity, longitudinal=longitudinal)
+
+            json_path = os.path.join(output_dir, f"{stem}_sonuclar.json")
+            with stage('json'), open(json_path, 'w', encoding='utf-8') as f:
+                f.write(results_to_json({'kaynak': os.path.basename(path), 'n_satir': len(df_cleaned), **results}, indent=2))
+            summary['json'] = json_path
+
+            charts = None
+            if results.get('error'):
+                summary['hata'] = results['error']
+            elif write_pdf:
+                with stage('grafik', rows=len(df_cleaned)):
+                    charts = generate_all_charts(df_cleaned, plan)
+                pdf_path = os.path.join(output_dir, f"{stem}_rapor.pdf")
+                # Bölümler doğrudan dosyaya yazılır; raporun tamamı bellekte tek bir bayt dizisi olarak tutulmaz
+                with stage('pdf'), open(pdf_path, 'wb') as f:
+                    write_pdf_report(results, charts, f, plan=plan)
+                summary['pdf'] = pdf_path
+            if bundle_formats is not None and not results.get('error'):
+                bundle_path = os.path.join(output_dir, f"{stem}_paket.zip")
+                with stage('paket'):
+                    write_export_bundle(bundle_path, results, df_cleaned, charts, plan=plan, chart_formats=bundle_formats,
+                                        pdf=summary['pdf'], source_name=os.path.basename(path))
+                summary['paket'] = bundle_path
+
+            # Başarılı çalıştırmalar kalıcı sonuç deposuna yazılır (arayüzdeki "Geçmiş Analizler" sekmesi)
+            if record and not results.get('error'):
+                config = {**ANALYSIS_CONFIG, 'protokol': plan.name, 'protokol_ozeti': plan.key, 'ancova_yontemi': ancova_method, 'yeniden_ornekleme': resampling,
+                          'merkez_sutunu': strata_col, 'coklu_atama': imputation, 'duyarlilik': sensitivity,
+                          'tekrarli_olcum': longitudinal}
+                with stage('kayit'):
+                    summary['kayit'] = get_results_store().record_run(
+                        stem, results, input_hash=make_cache_key(df_cleaned, config), config=config, n_rows=len(df_cleaned),
+                        source='cli', json_path=os.path.abspath(json_path), pdf_path=summary['pdf'] and os.path.abspath(summary['pdf'])
+                    )
+        except Exception as e:
+            summary['hata'] = f"{type(e).__name__}: {e}"
+            summary['ayrinti'] = traceback.format_exc()
+    if stage_trace is not None:
+        summary['iz'] = os.path.join(output_dir, f"{stem}_iz.json")
+        with open(summary['iz'], 'w', encoding='utf-8') as f:
+            json.dump(stage_trace.to_chrome_trace(), f, ensure_ascii=False)
+    summary['sure_sn'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def find_study_files(input_dir, pattern=None):
+    if pattern:
+        paths = glob.glob(os.path.join(input_dir, pattern))
+    else:
+        paths = [path for ext in SUPPORTED_EXTENSIONS for path in glob.glob(os.path.join(input_dir, f"*{ext}"))]
+    return sorted(
+        path for path in paths
+        if not os.path.basename(path).startswith('~$')  # Excel kilit dosyaları
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Ebelik araştırması şablonlarını toplu olarak analiz eder (Streamlit gerekmez).")
+    parser.add_argument('girdi_klasoru', nargs='?', help="Doldurulmuş şablon dosyalarının bulunduğu klasör")
+    parser.add_argument('-o', '--cikti', default='raporlar', help="JSON ve PDF çıktılarının yazılacağı klasör (varsayılan: raporlar)")
+    parser.add_argument('-j', '--isci', type=int, default=os.cpu_count() or 1, help="Paralel süreç sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument('--desen', default=None, help="Dosya deseni, ör. '*.xlsx' (varsayılan: tüm desteklenen türler)")
+    parser.add_argument('--pdf-yok', action='store_true', help="Yalnızca JSON sonuçları yaz, PDF üretme")
+    parser.add_argument('--paket', nargs='?', const='html', default=None, metavar='BICIMLER',
+                        help="Ayrıca <dosya>_paket.zip dışa aktarma paketi yaz; grafik biçimleri virgülle ayrılır "
+                             f"({', '.join(CHART_FORMATS)}; varsayılan: html). PDF yazıldıysa pakete de eklenir")
+    parser.add_argument('--ancova-yontemi', choices=ANCOVA_METHODS, default=ANALYSIS_CONFIG['ancova_yontemi'],
+                        help="FAZ 2 ANCOVA yöntemi (varsayılan: numpy)")
+    parser.add_argument('--yeniden-ornekleme', type=int, default=0, metavar='N',
+                        help="FAZ 2 hipotezleri için N permütasyon + N bootstrap örneklemi hesapla (varsayılan: 0, kapalı)")
+    parser.add_argument('--artimli', action='store_true',
+                        help="Önceki çalıştırmanın durumunu kullanarak yalnızca yeni eklenen satırları işle (--ancova-yontemi yok sayılır)")
+    parser.add_argument('--merkez-sutunu', default=None, metavar='SUTUN',
+                        help="Çok merkezli analiz: her merkez için ayrı ve merkez terimli birleşik FAZ 1 / FAZ 2 (--artimli yok sayılır)")
+    parser.add_argument('--coklu-atama', type=int, default=0, metavar='M',
+                        help="Eksik değerleri M kez atayıp FAZ 2'yi Rubin kurallarıyla birleştir (varsayılan: 0, kapalı)")
+    parser.add_argument('--duyarlilik', nargs='?', const=','.join(f"{t:g}" for t in DEFAULT_SENSITIVITY_CONFIG['thresholds']), default=None,
+                        metavar='ESIKLER',
+                        help="Duyarlılık analizi: FAZ 2'yi düzeltmesiz, FAZ 1 p < eşik (virgülle ayrılmış, varsayılan: 0.05,0.1,0.2) "
+                             "ve tüm kovaryantlarla da kur")
+    parser.add_argument('--tekrarli-olcum', nargs='?', const=DEFAULT_LONGITUDINAL_CONFIG['method'], default=None, choices=LONGITUDINAL_METHODS,
+                        metavar='YONTEM',
+                        help="Tekrarlı ölçümler (baseline / 4cm / 8cm) için grup × zaman karma modeli; yöntem: numpy (varsayılan), "
+                             "statsmodels veya verify")
+    parser.add_argument('--iz', action='store_true',
+                        help="Her dosya için aşama sürelerini <dosya>_iz.json (chrome://tracing / Perfetto) olarak yaz; iz özetleri stderr'e JSON günlüğü olarak da basılır")
+    parser.add_argument('--protokol', default=DEFAULT_STUDY, metavar='AD',
+                        help=f"Çalışma tanımı: specs klasöründeki ad veya .json/.yaml dosya yolu (varsayılan: {DEFAULT_STUDY})")
+    parser.add_argument('--kayit-yok', action='store_true', help="Çalıştırmaları kalıcı sonuç deposuna (geçmiş analizler) kaydetme")
+    parser.add_argument('--tohum', type=int, default=DEFAULT_RESAMPLING_CONFIG['seed'], help="Yeniden örnekleme için rastgele tohum")
+    parser.add_argument('--sablonlari-uret', action='store_true',
+                        help="specs klasöründeki tüm protokollerin boş şablonlarını assets/sablonlar'a yeniden yaz ve çık")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.sablonlari_uret:
+        for path in write_template_assets():
+            print(path)
+        return 0
+    if args.girdi_klasoru is None:
+        parser.error("girdi_klasoru gereklidir (yalnızca --sablonlari-uret ile birlikte verilmeyebilir)")
+    configure_logging()
+    files = find_study_files(args.girdi_klasoru, args.desen)
+    if not files:
+        print(f"HATA: '{args.girdi_klasoru}' içinde '{args.desen or ', '.join(SUPPORTED_EXTENSIONS)}' ile eşleşen dosya bulunamadı.", file=sys.stderr)
+        return 2
+    try:
+        get_study_plan(args.protokol)  # tanım hataları dosyalar işlenmeden önce bildirilir
+    except ValueError as e:
+        print(f"HATA: {e}", file=sys.stderr)
+        return 2
+    os.makedirs(args.cikti, exist_ok=True)
+
+    resampling = None
+    if args.yeniden_ornekleme > 0:
+        resampling = {**DEFAULT_RESAMPLING_CONFIG, 'n_permutations': args.yeniden_ornekleme,
+                      'n_bootstrap': args.yeniden_ornekleme, 'seed': args.tohum}
+    # Dosyalar zaten ayrı süreçlerde işlendiğinden atamalar her dosyanın kendi sürecinde sırayla yapılır
+    imputation = {**DEFAULT_IMPUTATION_CONFIG, 'm': args.coklu_atama, 'seed': args.tohum, 'n_jobs': 1} if args.coklu_atama > 0 else None
+    sensitivity = None
+    if args.duyarlilik is not None:
+        try:
+            thresholds = sorted({float(value) for value in args.duyarlilik.split(',') if value.strip()})
+        except ValueError:
+            parser.error(f"--duyarlilik eşikleri virgülle ayrılmış sayılar olmalıdır: {args.duyarlilik}")
+        if not thresholds or not all(0 < t < 1 for t in thresholds):
+            parser.error(f"--duyarlilik eşikleri 0 ile 1 arasında olmalıdır: {args.duyarlilik}")
+        sensitivity = {**DEFAULT_SENSITIVITY_CONFIG, 'thresholds': thresholds}
+    longitudinal = {**DEFAULT_LONGITUDINAL_CONFIG, 'method': args.tekrarli_olcum} if args.tekrarli_olcum else None
+    bundle_formats = None
+    if args.paket is not None:
+        bundle_formats = tuple(dict.fromkeys(fmt.strip() for fmt in args.paket.split(',') if fmt.strip()))
+        if not set(bundle_formats) <= set(CHART_FORMATS):
+            parser.error(f"--paket grafik biçimleri {', '.join(CHART_FORMATS)} arasından seçilmelidir: {args.paket}")
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=max(1, args.isci)) as executor:
+        futures = {
+            executor.submit(analyze_study_file, path, args.cikti, args.ancova_yontemi, not args.pdf_yok, resampling, args.artimli,
+                            args.merkez_sutunu, imputation, not args.kayit_yok, args.iz, args.protokol, sensitivity,
+                            longitudinal, bundle_formats): path
+            for path in files
+        }
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            status = "HATA: " + summary['hata'] if summary['hata'] else "tamam"
+            print(f"[{len(summaries)}/{len(files)}] {os.path.basename(summary['dosya'])} ({summary['sure_sn']} sn) - {status}")
+
+    summaries.sort(key=lambda item: item['dosya'])
+    with open(os.path.join(args.cikti, 'ozet.json'), 'w', encoding='utf-8') as f:
+        json.dump(summaries, f, ensure_ascii=False, indent=2)
+    return 1 if any(summary['hata'] for summary in summaries) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Analiz hattı kıyaslamaları ve sentetik veri üreteci (bkz. run_benchmarks.py)."""
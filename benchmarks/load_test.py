@@ -0,0 +1,157 @@
+"""HTTP analiz API'si için yük testi (eşzamanlı istemciler).
+
+--url verilmezse api_server aynı süreçte boş bir portta başlatılır. Her
+istemci sırayla /analiz isteği gönderir (sentetik çalışmalar; --farkli kadar
+farklı gövde, böylece eşzamanlı aynı istekler tek işte birleşir) ve
+istenirse bir grafik JSON'u ile PDF raporunu indirir. Uç nokta başına gecikme
+yüzdelikleri, durum kodları, saniyedeki istek sayısı ve tekilleştirme oranı
+(istek / farklı iş) yazdırılır ve JSON olarak kaydedilir:
+
+    python -m benchmarks.load_test --istemci 16 --istek 4 --boyut 5000 --farkli 4 --grafik --pdf
+    python -m benchmarks.load_test --url http://127.0.0.1:8502 --istemci 32
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.run_benchmarks import DEFAULT_OUTPUT_DIR, environment_info
+from benchmarks.synthetic import make_synthetic_study
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def _request(url, data=None, timeout=900):
+    """(durum kodu, gövde baytları, süre sn); gövde parça parça okunur (akıtılan PDF için)."""
+    started = time.perf_counter()
+    request = urllib.request.Request(url, data=data, method='POST' if data is not None else 'GET')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, body = response.status, io.BytesIO()
+            while chunk := response.read(READ_CHUNK_BYTES):
+                body.write(chunk)
+    except urllib.error.HTTPError as e:
+        status, body = e.code, io.BytesIO(e.read())
+    return status, body.getvalue(), time.perf_counter() - started
+
+
+def make_payloads(n_rows, n_distinct, seed=2209):
+    """n_distinct farklı sentetik çalışma (CSV baytları)."""
+    payloads = []
+    for i in range(n_distinct):
+        buffer = io.StringIO()
+        make_synthetic_study(n_rows, seed=seed + i).to_csv(buffer, index=False)
+        payloads.append(buffer.getvalue().encode())
+    return payloads
+
+
+def run_load_test(base_url, payloads, n_clients, n_requests, chart=None, pdf=False, query=''):
+    """Eşzamanlı istemcileri çalıştırır; istek kayıtlarını [{'uc', 'durum', 'sure_sn', 'is'}] döndürür."""
+    records, lock = [], threading.Lock()
+
+    def record(endpoint, status, elapsed, job_id=None):
+        with lock:
+            records.append({'uc': endpoint, 'durum': status, 'sure_sn': elapsed, 'is': job_id})
+
+    def client(index):
+        for i in range(n_requests):
+            payload = payloads[(index + i) % len(payloads)]
+            status, body, elapsed = _request(f"{base_url}/analiz?dosya_adi=yuk_testi.csv{query}", data=payload)
+            job_id = json.loads(body).get('is') if body else None
+            record('analiz', status, elapsed, job_id)
+            if status != 200:
+                continue
+            if chart:
+                status, _, elapsed = _request(f"{base_url}/isler/{job_id}/grafikler/{chart}")
+                record('grafik', status, elapsed, job_id)
+            if pdf:
+                status, _, elapsed = _request(f"{base_url}/isler/{job_id}/rapor.pdf")
+                record('pdf', status, elapsed, job_id)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_clients) as executor:
+        list(executor.map(client, range(n_clients)))
+    return records, time.perf_counter() - started
+
+
+def summarize(records, wall_seconds):
+    """Uç nokta başına istek sayısı, durum kodları ve gecikme yüzdelikleri."""
+    summary = {'toplam_sure_sn': round(wall_seconds, 3), 'istek_sayisi': len(records),
+               'istek_per_sn': round(len(records) / wall_seconds, 2) if wall_seconds else None, 'uclar': {}}
+    for endpoint in dict.fromkeys(record['uc'] for record in records):
+        entries = [record for record in records if record['uc'] == endpoint]
+        latencies = np.array([record['sure_sn'] for record in entries])
+        statuses = {}
+        for record in entries:
+            statuses[str(record['durum'])] = statuses.get(str(record['durum']), 0) + 1
+        summary['uclar'][endpoint] = {
+            'istek': len(entries), 'durumlar': statuses, 'farkli_is': len({record['is'] for record in entries if record['is']}),
+            'p50_sn': round(float(np.percentile(latencies, 50)), 4), 'p95_sn': round(float(np.percentile(latencies, 95)), 4),
+            'en_uzun_sn': round(float(latencies.max()), 4),
+        }
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="HTTP analiz API'si için eşzamanlı istemcilerle yük testi.")
+    parser.add_argument('--url', default=None, help="Çalışan bir sunucunun adresi (verilmezse süreç içinde başlatılır)")
+    parser.add_argument('--isci', type=int, default=None, help="Süreç içi sunucunun iş havuzu boyutu (varsayılan: api_server ile aynı)")
+    parser.add_argument('--kuyruk', type=int, default=None, help="Süreç içi sunucunun bitmemiş iş sınırı")
+    parser.add_argument('--istemci', type=int, default=8, help="Eşzamanlı istemci sayısı (varsayılan: 8)")
+    parser.add_argument('--istek', type=int, default=4, help="İstemci başına analiz isteği (varsayılan: 4)")
+    parser.add_argument('--boyut', type=int, default=2000, help="Sentetik çalışmaların satır sayısı (varsayılan: 2000)")
+    parser.add_argument('--farkli', type=int, default=4, help="Farklı gövde sayısı; aynı gövdeler tekilleştirilir (varsayılan: 4)")
+    parser.add_argument('--grafik', nargs='?', const='fig_vas_line', default=None, metavar='AD',
+                        help="Her başarılı analizden sonra bu grafiğin JSON'unu da iste (varsayılan ad: fig_vas_line)")
+    parser.add_argument('--pdf', action='store_true', help="Her başarılı analizden sonra PDF raporunu da indir")
+    parser.add_argument('--sorgu', default='', help="/analiz isteğine eklenecek parametreler (ör. '&tekrarli_olcum=numpy')")
+    parser.add_argument('--tohum', type=int, default=2209)
+    parser.add_argument('-o', '--cikti', default=DEFAULT_OUTPUT_DIR, help="Sonuç JSON'unun yazılacağı klasör")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    payloads = make_payloads(args.boyut, max(1, args.farkli), args.tohum)
+    server = None
+    base_url = args.url
+    if base_url is None:
+        from api_server import API_MAX_PENDING, API_WORKERS, make_server
+        server = make_server('127.0.0.1', 0, args.isci or API_WORKERS, args.kuyruk or API_MAX_PENDING)
+        threading.Thread(target=server.serve_forever, name='ebelik-api', daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        records, wall_seconds = run_load_test(base_url.rstrip('/'), payloads, args.istemci, args.istek, args.grafik, args.pdf,
+                                              args.sorgu)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    summary = summarize(records, wall_seconds)
+    print(f"{summary['istek_sayisi']} istek, {summary['toplam_sure_sn']} sn ({summary['istek_per_sn']} istek/sn)")
+    for endpoint, stats in summary['uclar'].items():
+        print(f"{endpoint:<7} n={stats['istek']:<4} farklı iş={stats['farkli_is']:<4} p50={stats['p50_sn']:.3f} sn  "
+              f"p95={stats['p95_sn']:.3f} sn  en uzun={stats['en_uzun_sn']:.3f} sn  durumlar={stats['durumlar']}")
+
+    report = {'ortam': environment_info(), 'ayarlar': {key: value for key, value in vars(args).items() if key != 'cikti'},
+              'ozet': summary}
+    os.makedirs(args.cikti, exist_ok=True)
+    path = os.path.join(args.cikti, f"yuk_testi_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Sonuçlar: {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Analiz hattı kıyaslama (benchmark) aracı.
+
+Sentetik çalışmalar üretir ve her aşamayı ayrı ayrı ölçer:
+
+    ingest   dosyadan okuma + temizleme (read_study + prepare_study)
+    faz1     doğrulama + FAZ 1 denklik testleri + dinamik düzeltme
+    faz2     FAZ 2 toplu ANCOVA (5 hipotez)
+    analiz   run_full_analysis (uçtan uca; faz1 + faz2 + nihai yorum)
+    duyarlilik  düzeltme seti taraması (varsayılan 5 set; FAZ 1 sonuçları hazır)
+    karma_model uzun tablo + tekrarlı ölçümler için grup × zaman karma modelleri (REML)
+    ozet     dashboard özet tabloları (sıklıklar, grup ortalamaları, likert sayımları, korelasyon; uzun tablo dahil)
+    grafik   generate_all_charts (tüm dashboard grafikleri; özetler dahil)
+    raster   render_pngs (kaleido ile PNG; önbelleksiz)
+    pdf      write_pdf_report (hazır PNG'lerle, bölüm önbelleği olmadan)
+    paket    write_export_bundle (JSON / Parquet sonuçlar, veri, HTML grafikler; PDF'siz, rasterleştirme yok)
+
+Her aşama için duvar saati süresi, CPU süresi ve tepe bellek (tracemalloc;
+kaleido alt süreçleri hariç) kaydedilir; temizlenmiş tablonun oturumda
+tutulacak bellek boyutu da 'tablo_bellek_mb' olarak yazılır. Sonuçlar zaman damgalı bir JSON
+dosyasına yazılır; iki sonuç dosyası --karsilastir ile karşılaştırılabilir:
+
+    python -m benchmarks.run_benchmarks --boyutlar 60 1000 100000
+    python -m benchmarks.run_benchmarks --karsilastir eski.json yeni.json
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from analysis import (
+    ANALYSIS_CONFIG, DEFAULT_PLAN, FAZ1_CATEGORIC_LABELS, FAZ1_NUMERIC_LABELS, HYPOTHESIS_TESTS, DashboardAggregates, generate_all_charts,
+    prepare_analysis_frame, record_faz1_results, run_full_analysis, write_pdf_report
+)
+from ancova_engine import fit_group_ancova_batch
+from benchmarks.synthetic import make_synthetic_study, write_study
+from chart_render import render_pngs
+from equivalence import run_equivalence_tests
+from export_bundle import write_export_bundle
+from ingest import frame_memory_mb, prepare_study, read_study
+from sensitivity import run_sensitivity_analysis
+from longitudinal import LongTable, long_table_column_sets, run_longitudinal_analysis
+
+STAGES = ('ingest', 'faz1', 'faz2', 'analiz', 'duyarlilik', 'karma_model', 'ozet', 'grafik', 'raster', 'pdf', 'paket')
+DEFAULT_SIZES = (60, 1_000, 10_000, 100_000)
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sonuclar')
+
+
+def measure(fn, *args, track_memory=True, **kwargs):
+    """fn'i çalıştırır: (dönüş değeri, {'sure_sn', 'cpu_sn', 'tepe_bellek_mb', 'hata'})."""
+    if track_memory:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    wall, cpu = time.perf_counter(), time.process_time()
+    value, error = None, None
+    try:
+        value = fn(*args, **kwargs)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    stats = {'sure_sn': round(time.perf_counter() - wall, 4), 'cpu_sn': round(time.process_time() - cpu, 4),
+             'tepe_bellek_mb': None, 'hata': error}
+    if track_memory:
+        stats['tepe_bellek_mb'] = round((tracemalloc.get_traced_memory()[1] - baseline) / 2 ** 20, 2)
+        tracemalloc.stop()
+    return value, stats
+
+
+def _faz1(df):
+    df_cleaned, error = prepare_analysis_frame(df)
+    if error:
+        raise ValueError(error)
+    p_numeric, p_categoric = run_equivalence_tests(df_cleaned, FAZ1_NUMERIC_LABELS, FAZ1_CATEGORIC_LABELS, group_col='grup',
+                                                   labels={**FAZ1_NUMERIC_LABELS, **FAZ1_CATEGORIC_LABELS})
+    return record_faz1_results({}, p_numeric, p_categoric)
+
+
+def benchmark_size(n, file_format='csv', stages=STAGES, track_memory=True, seed=2209, **generator_options):
+    """Tek bir örneklem büyüklüğü için tüm aşamaların ölçümü."""
+    df_raw = make_synthetic_study(n, seed=seed, **generator_options)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_study(df_raw, os.path.join(tmp, f"sentetik.{file_format}"))
+        file_bytes = open(path, 'rb').read()
+    run = {'n': n, 'bicim': file_format, 'dosya_boyutu_mb': round(len(file_bytes) / 2 ** 20, 2), **generator_options, 'asamalar': {}}
+
+    def stage(name, fn, *args):
+        if name not in stages:
+            return None
+        value, run['asamalar'][name] = measure(fn, *args, track_memory=track_memory)
+        return value
+
+    df = stage('ingest', lambda: prepare_study(read_study(io.BytesIO(file_bytes), filename=f"sentetik.{file_format}")))
+    if df is None:
+        df = prepare_study(df_raw)
+    run['tablo_bellek_mb'] = frame_memory_mb(df)
+    covariates = stage('faz1', _faz1, df)
+    if covariates is None:
+        covariates = _faz1(df)
+    stage('faz2', lambda: fit_group_ancova_batch(df, HYPOTHESIS_TESTS, group_col='grup', covariates=covariates))
+    results = stage('analiz', run_full_analysis, df)
+    if 'duyarlilik' in stages:
+        results = results or run_full_analysis(df)
+        faz1_p_values = {**results['faz1_numeric_p_values'], **results['faz1_categoric_p_values']}
+        stage('duyarlilik', lambda: run_sensitivity_analysis(df, HYPOTHESIS_TESTS, faz1_p_values, covariates, DEFAULT_PLAN))
+    # Uzun tablo önbellekten alınmasın diye her ölçümde yeniden kurulur
+    stage('karma_model', lambda: run_longitudinal_analysis(df, DEFAULT_PLAN, long_table=LongTable(df, long_table_column_sets(DEFAULT_PLAN))))
+    stage('ozet', lambda: DashboardAggregates(df, DEFAULT_PLAN, LongTable(df, long_table_column_sets(DEFAULT_PLAN))))
+    charts = stage('grafik', lambda: dict(generate_all_charts(df)))
+
+    if 'raster' in stages or 'pdf' in stages:
+        results = results or run_full_analysis(df)
+        charts = charts or dict(generate_all_charts(df))
+        images = stage('raster', render_pngs, charts)
+        if images is None:
+            images = render_pngs(charts)
+        failed = [name for name, png in images.items() if isinstance(png, Exception)]
+        if failed and 'raster' in run['asamalar']:
+            run['asamalar']['raster']['hata'] = run['asamalar']['raster']['hata'] or f"{len(failed)} grafik PNG'ye çevrilemedi: {images[failed[0]]}"
+        stage('pdf', lambda: write_pdf_report(results, charts, io.BytesIO(), images=images, cache=False))
+    if 'paket' in stages:
+        results = results or run_full_analysis(df)
+        with open(os.devnull, 'wb') as sink:
+            stage('paket', write_export_bundle, sink, results, df, charts)
+    return run
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'zaman': datetime.datetime.now().isoformat(timespec='seconds'), 'git_commit': commit,
+        'motor_surumu': ANALYSIS_CONFIG['motor_surumu'], 'python': platform.python_version(), 'platform': platform.platform(),
+        'cpu_sayisi': os.cpu_count(), 'numpy': np.__version__, 'pandas': pd.__version__,
+    }
+
+
+def compare(old_path, new_path):
+    """İki sonuç dosyasındaki ortak (n, biçim, aşama) ölçümlerinin süre ve bellek oranları."""
+    def index(path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return {(run['n'], run['bicim'], name): stats for run in data['calistirmalar'] for name, stats in run['asamalar'].items()}
+
+    old, new = index(old_path), index(new_path)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        o, w = old[key], new[key]
+        rows.append({
+            'n': key[0], 'bicim': key[1], 'asama': key[2], 'eski_sn': o['sure_sn'], 'yeni_sn': w['sure_sn'],
+            'hizlanma': round(o['sure_sn'] / w['sure_sn'], 2) if w['sure_sn'] else None,
+            'eski_mb': o['tepe_bellek_mb'], 'yeni_mb': w['tepe_bellek_mb'],
+        })
+    return pd.DataFrame(rows)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Analiz hattının aşama bazlı kıyaslaması (sentetik veriyle).")
+    parser.add_argument('--boyutlar', type=int, nargs='+', default=list(DEFAULT_SIZES), help="Satır sayıları (varsayılan: 60 1000 10000 100000)")
+    parser.add_argument('--bicim', choices=('csv', 'xlsx', 'parquet'), default='csv', help="Ingest aşamasında okunacak dosya biçimi")
+    parser.add_argument('--asamalar', nargs='+', choices=STAGES, default=list(STAGES), help="Ölçülecek aşamalar (varsayılan: tümü)")
+    parser.add_argument('--eksik', type=float, default=0.05, help="Eksik hücre oranı (varsayılan: 0.05)")
+    parser.add_argument('--atama-orani', type=float, default=0.5, help="Müdahale grubuna atanma olasılığı (varsayılan: 0.5)")
+    parser.add_argument('--dengesizlik', type=float, default=0.0, help="Başlangıç kovaryantlarında grup farkı (varsayılan: 0, randomize)")
+    parser.add_argument('--tohum', type=int, default=2209)
+    parser.add_argument('--isinma-yok', action='store_true', help="Ölçümden önceki ısınma çalıştırmasını (içe aktarma / önbellek maliyetleri) atla")
+    parser.add_argument('--bellek-yok', action='store_true', help="tracemalloc ile bellek ölçme (ölçüm yükünü kaldırır)")
+    parser.add_argument('-o', '--cikti', default=DEFAULT_OUTPUT_DIR, help="Sonuç JSON'unun yazılacağı klasör")
+    parser.add_argument('--karsilastir', nargs=2, metavar=('ESKI', 'YENI'), help="İki sonuç dosyasını karşılaştır ve çık")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.karsilastir:
+        print(compare(*args.karsilastir).to_string(index=False))
+        return 0
+
+    report = {'ortam': environment_info(), 'calistirmalar': []}
+    if not args.isinma_yok:
+        # İlk çağrılardaki içe aktarma ve şablon yükleme maliyetleri ilk boyutun ölçümüne karışmasın
+        benchmark_size(60, args.bicim, args.asamalar, track_memory=False, seed=args.tohum)
+    for n in args.boyutlar:
+        run = benchmark_size(n, args.bicim, args.asamalar, track_memory=not args.bellek_yok, seed=args.tohum,
+                             missing_rate=args.eksik, allocation=args.atama_orani, imbalance=args.dengesizlik)
+        report['calistirmalar'].append(run)
+        for name, stats in run['asamalar'].items():
+            memory = f"{stats['tepe_bellek_mb']:>9.1f} MB" if stats['tepe_bellek_mb'] is not None else ""
+            print(f"n={n:>9,} {name:<7} {stats['sure_sn']:>9.3f} sn  {memory}" + (f"  ! {stats['hata']}" if stats['hata'] else ""))
+
+    os.makedirs(args.cikti, exist_ok=True)
+    path = os.path.join(args.cikti, f"benchmark_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Sonuçlar: {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Şablon şemasına uygun sentetik çalışma üreteci (kıyaslama ve deneme amaçlı).
+
+Üretilen tablo ALL_REQUIRED_COLUMNS sütunlarını içerir; sayısal sütunlar
+gerçekçi aralıklarda ve ön-test / son-test ilişkileri korunarak üretilir.
+
+    missing_rate: sayısal ve kategorik hücrelerin eksik bırakılma oranı
+    allocation:   Müdahale grubuna atanma olasılığı (grup büyüklüğü dengesizliği)
+    imbalance:    başlangıç kovaryantlarında gruplar arası fark (0 = randomize,
+                  büyüdükçe FAZ 1 denklik testleri başarısız olur ve dinamik
+                  düzeltme devreye girer)
+    effect:       müdahalenin son-test puanlarına etkisi (0 = etkisiz)
+    dirty_rate:   'yok', '7,0' gibi temizlenmesi gereken metin girişlerinin oranı
+
+Üreteç vektöreldir; 1 milyon satır birkaç saniyede oluşturulur.
+"""
+import numpy as np
+import pandas as pd
+
+from analysis import ALL_REQUIRED_COLUMNS, NUMERIC_COLUMNS
+
+LEVELS = {
+    'egitim_durumu': (['İlkokul', 'Ortaokul', 'Lise', 'Üniversite'], [0.2, 0.25, 0.35, 0.2]),
+    'dogum_baslangici': (['Spontan', 'İndüksiyon'], [0.7, 0.3]),
+    'medeni_durum': (['Evli', 'Bekar'], [0.9, 0.1]),
+    'gelir_duzeyi': (['Düşük', 'Orta', 'Yüksek'], [0.3, 0.5, 0.2]),
+    'calisma_durumu': (['Çalışıyor', 'Çalışmıyor'], [0.4, 0.6]),
+    'planli_gebelik_mi': (['Evet', 'Hayır'], [0.75, 0.25]),
+}
+DIRTY_VALUES = np.array(['yok', 'bilinmiyor', 'N/A', '7,0', '-'], dtype=object)
+
+
+def _choice(rng, levels, probs, n, shift=0.0):
+    """Düzey çekilişi; shift > 0 olasılıkları son düzeylere doğru kaydırır."""
+    probs = np.asarray(probs, dtype=float) * np.exp(shift * np.arange(len(probs)))
+    return np.asarray(levels, dtype=object)[rng.choice(len(levels), size=n, p=probs / probs.sum())]
+
+
+def make_synthetic_study(n, seed=2209, missing_rate=0.05, allocation=0.5, imbalance=0.0, effect=1.0, dirty_rate=0.001):
+    """n satırlık ham (temizlenmemiş) çalışma tablosu; sütun sırası şablonla aynıdır."""
+    rng = np.random.default_rng(seed)
+    treated = rng.random(n) < allocation
+    shift = imbalance * treated  # yalnızca Müdahale grubunda başlangıç farkı
+    drop = -effect * treated     # müdahale korku / endişeyi azaltır
+
+    data = {
+        'yas': np.clip(rng.normal(28 + 2 * shift, 5, n), 16, 48).round(),
+        'gebelik_haftasi': np.clip(rng.normal(39 - 0.5 * shift, 1.2, n), 34, 42).round(1),
+        'korku_vas_baseline': np.clip(rng.normal(6 + shift, 2, n), 0, 10).round(1),
+        'korku_olcek_baseline': np.clip(rng.normal(70 + 8 * shift, 15, n), 33, 198).round(),
+        'endise_oxford_baseline': np.clip(rng.normal(30 + 3 * shift, 6, n), 0, 60).round(),
+    }
+    data['korku_vas_4cm'] = np.clip(0.6 * data['korku_vas_baseline'] + 2.5 + drop + rng.normal(0, 1.2, n), 0, 10).round(1)
+    data['korku_olcek_4cm'] = np.clip(0.7 * data['korku_olcek_baseline'] + 20 + 6 * drop + rng.normal(0, 8, n), 33, 198).round()
+    data['korku_vas_8cm'] = np.clip(0.7 * data['korku_vas_4cm'] + 2.5 + drop + rng.normal(0, 1.2, n), 0, 10).round(1)
+    data['korku_olcek_8cm'] = np.clip(0.7 * data['korku_olcek_4cm'] + 20 + 6 * drop + rng.normal(0, 8, n), 33, 198).round()
+    data['endise_oxford_son_test'] = np.clip(0.8 * data['endise_oxford_baseline'] + 6 + 3 * drop + rng.normal(0, 4, n), 0, 60).round()
+    for col in NUMERIC_COLUMNS:
+        data[col][rng.random(n) < missing_rate] = np.nan
+
+    data['grup'] = np.where(treated, 'Müdahale', 'Kontrol').astype(object)
+    for col, (levels, probs) in LEVELS.items():
+        values = np.where(treated, _choice(rng, levels, probs, n, imbalance), _choice(rng, levels, probs, n))
+        values[rng.random(n) < missing_rate] = None
+        data[col] = values
+
+    df = pd.DataFrame(data)[ALL_REQUIRED_COLUMNS]
+    if dirty_rate > 0:
+        # Elle girilmiş verilerdeki gibi metin girişleri: bu sütunlar object tipine döner
+        for col in ('yas', 'korku_vas_baseline', 'korku_olcek_4cm'):
+            dirty = np.flatnonzero(rng.random(n) < dirty_rate)
+            if len(dirty):
+                df[col] = df[col].astype(object)
+                df.iloc[dirty, df.columns.get_loc(col)] = rng.choice(DIRTY_VALUES, size=len(dirty))
+    return df
+
+
+def write_study(df, path):
+    """Tabloyu uzantıya göre (.xlsx / .csv / .parquet) yazar."""
+    if path.endswith('.parquet'):
+        # Karışık (sayı + metin) sütunlar parquet'e metin olarak yazılır; eksikler korunur
+        df.assign(**{col: df[col].where(df[col].isna(), df[col].astype(str)) for col in df.columns if df[col].dtype == object}) \
+            .to_parquet(path, index=False)
+    elif path.endswith('.csv'):
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False, sheet_name='Veri_Giris_Sayfasi')
+    return path
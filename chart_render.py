@@ -0,0 +1,151 @@
+"""Grafik rasterleştirme (PNG) aşaması.
+
+`create_pdf_report` için tüm Plotly grafikleri eşzamanlı olarak PNG'ye
+çevrilir. kaleido >= 1.0 kullanılıyorsa tek bir Chromium süreci ve n sekmeden
+oluşan kalıcı bir işçi havuzu arka plandaki bir olay döngüsünde açık tutulur;
+böylece her grafik için yeniden tarayıcı başlatılmaz. PNG baytları, grafik
+spesifikasyonunun (JSON) özetine göre önbelleğe alınır. plotly.io ve kaleido
+yalnızca rasterleştirme ilk kez çalıştığında içe aktarılır. Dışa aktarma
+paketindeki SVG (vektör) grafikler de aynı havuzla, önbelleksiz üretilir.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from profiling import stage
+
+DEFAULT_RENDER_WORKERS = min(4, os.cpu_count() or 1)
+RENDER_TIMEOUT_SECONDS = 120
+
+
+class KaleidoPool:
+    """Arka plan olay döngüsünde yaşayan, tüm oturumlarca paylaşılan kaleido işçi havuzu."""
+
+    def __init__(self, n_workers=DEFAULT_RENDER_WORKERS):
+        self.n_workers = n_workers
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='kaleido-pool', daemon=True)
+        self._thread.start()
+        self._kaleido = None
+        self._open_lock = None
+
+    async def _ensure_open(self):
+        if self._open_lock is None:
+            self._open_lock = asyncio.Lock()
+        async with self._open_lock:
+            if self._kaleido is None:
+                import kaleido
+                import plotly.io as pio
+                kopts = {key: getattr(pio.defaults, key) for key in ('plotlyjs', 'mathjax') if getattr(pio.defaults, key, None)}
+                instance = kaleido.Kaleido(n=self.n_workers, **kopts)
+                await instance.open()
+                self._kaleido = instance
+        return self._kaleido
+
+    async def _render(self, fig_dict, opts):
+        instance = await self._ensure_open()
+        return await instance.calc_fig(fig_dict, opts=opts)
+
+    def render_many(self, fig_dicts, fmt='png'):
+        """{ad: grafik sözlüğü} -> {ad: görüntü baytları (fmt: 'png' / 'svg') veya Exception} (tümü eşzamanlı)."""
+        futures = {
+            name: asyncio.run_coroutine_threadsafe(self._render(fig_dict, _image_opts(fig_dict, fmt)), self._loop)
+            for name, fig_dict in fig_dicts.items()
+        }
+        images = {}
+        for name, future in futures.items():
+            try:
+                images[name] = future.result(timeout=RENDER_TIMEOUT_SECONDS)
+            except Exception as e:
+                images[name] = e
+        return images
+
+    def close(self):
+        if self._kaleido is not None:
+            asyncio.run_coroutine_threadsafe(self._kaleido.close(), self._loop).result(timeout=RENDER_TIMEOUT_SECONDS)
+            self._kaleido = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def _image_opts(fig_dict, fmt='png'):
+    """`pio.to_image` ile aynı varsayılan boyut/ölçek seçimleri."""
+    import plotly.io as pio
+    layout = fig_dict.get('layout', {})
+    template_layout = layout.get('template', {}).get('layout', {})
+    return {
+        'format': fmt,
+        'width': layout.get('width') or template_layout.get('width') or pio.defaults.default_width,
+        'height': layout.get('height') or template_layout.get('height') or pio.defaults.default_height,
+        'scale': pio.defaults.default_scale,
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _kaleido_supports_pool():
+    try:
+        import kaleido
+    except ImportError:
+        return False
+    return hasattr(kaleido, 'Kaleido')
+
+
+def get_kaleido_pool(n_workers=DEFAULT_RENDER_WORKERS):
+    """Süreç genelinde tek KaleidoPool (ilk kullanımda oluşturulur)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = KaleidoPool(n_workers)
+        return _pool
+
+
+def render_pngs(charts, cache=None, max_workers=DEFAULT_RENDER_WORKERS):
+    """Tüm grafikleri PNG'ye çevirir: {ad: PNG baytları veya Exception}.
+
+    cache: `get_png`/`set_png` sağlayan bir ResultCache (opsiyonel). Önbellekte
+    bulunan grafikler yeniden rasterleştirilmez.
+    """
+    images, pending, pending_json = {}, {}, {}
+    for name, fig in charts.items():
+        fig_json = fig.to_json()
+        png = cache.get_png(fig_json) if cache is not None else None
+        if png is not None:
+            images[name] = png
+        else:
+            pending[name] = fig
+            pending_json[name] = fig_json
+
+    if pending:
+        with stage('raster.kaleido', rows=len(pending)):
+            rendered = _render_pending(pending, max_workers)
+        for name, png in rendered.items():
+            images[name] = png
+            if cache is not None and isinstance(png, (bytes, bytearray)):
+                cache.set_png(pending_json[name], bytes(png))
+    return images
+
+
+def render_svgs(charts, max_workers=DEFAULT_RENDER_WORKERS):
+    """Tüm grafikleri SVG'ye çevirir: {ad: SVG baytları veya Exception} (önbelleğe alınmaz)."""
+    with stage('raster.svg', rows=len(charts)):
+        return _render_pending(dict(charts), max_workers, fmt='svg')
+
+
+def _render_pending(pending, max_workers, fmt='png'):
+    """Önbellekte bulunmayan grafikleri kaleido ile PNG'ye (veya SVG'ye) çevirir."""
+    if _kaleido_supports_pool():
+        return get_kaleido_pool(max_workers).render_many({name: fig.to_dict() for name, fig in pending.items()}, fmt)
+
+    # Eski kaleido (0.2.x): havuz API'si yok, iş parçacıklarıyla pio.to_image
+    import plotly.io as pio
+
+    def _to_image(fig):
+        try:
+            return pio.to_image(fig, format=fmt)
+        except Exception as e:
+            return e
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(pending, executor.map(_to_image, pending.values())))
@@ -0,0 +1,103 @@
+"""FAZ 1 başlangıç denkliği testleri (vektörel).
+
+Sayısal değişkenler için tüm Welch t-testleri, 2×k'lık ortalama / varyans /
+gözlem sayısı matrisleri üzerinden tek geçişte hesaplanır. Kategorik
+değişkenlerin tüm çapraz tabloları (grup × düzey) tek bir factorize + bincount
+ile oluşturulur ve ki-kare testleri (2×2 tablolarda Yates düzeltmesiyle)
+birlikte çözülür. Sonuçlar `scipy.stats.ttest_ind(equal_var=False,
+nan_policy='omit')` ve `chi2_contingency(pd.crosstab(...))` ile aynıdır;
+böylece yüzlerce kovaryantlık genişletilmiş formlar da hızla test edilebilir.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_GROUPS = ('Müdahale', 'Kontrol')
+
+
+def welch_ttests(df, numeric_cols, group_col='grup', groups=DEFAULT_GROUPS):
+    """Her sayısal sütun için iki grup arasında Welch t-testi p-değerlerini (k uzunluklu dizi) döndürür."""
+    numeric_cols = list(numeric_cols)
+    if not numeric_cols:
+        return np.array([])
+    values = df[numeric_cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    group_values = df[group_col].to_numpy()
+
+    # 2×k özet matrisleri: gözlem sayısı, ortalama, örneklem varyansı (ddof=1)
+    counts, means, variances = np.empty((2, len(numeric_cols))), np.empty((2, len(numeric_cols))), np.empty((2, len(numeric_cols)))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i, group in enumerate(groups):
+            block = values[group_values == group]
+            valid = ~np.isnan(block)
+            counts[i] = valid.sum(axis=0)
+            means[i] = np.where(valid, block, 0.0).sum(axis=0) / counts[i]
+            centered = np.where(valid, block - means[i], 0.0)
+            variances[i] = (centered ** 2).sum(axis=0) / (counts[i] - 1)
+    return welch_from_moments(counts, means, variances)
+
+
+def welch_from_moments(counts, means, variances):
+    """2×k gözlem sayısı / ortalama / varyans (ddof=1) matrislerinden Welch t-testi p-değerleri."""
+    from scipy import stats
+    with np.errstate(invalid='ignore', divide='ignore'):
+        se2_parts = variances / counts
+        se2 = se2_parts.sum(axis=0)
+        t_stat = (means[0] - means[1]) / np.sqrt(se2)
+        dof = se2 ** 2 / (se2_parts[0] ** 2 / (counts[0] - 1) + se2_parts[1] ** 2 / (counts[1] - 1))
+        p_values = 2 * stats.t.sf(np.abs(t_stat), dof)
+    p_values[(counts < 2).any(axis=0)] = np.nan
+    return p_values
+
+
+def chi2_tests(df, categoric_cols, group_col='grup', correction=True):
+    """Her kategorik sütun için grup × düzey çapraz tablosunun ki-kare p-değerlerini (k uzunluklu dizi) döndürür."""
+    categoric_cols = list(categoric_cols)
+    if not categoric_cols:
+        return np.array([])
+    group_codes, group_levels = pd.factorize(df[group_col])
+    codes = np.column_stack([pd.factorize(df[col])[0] for col in categoric_cols])
+    n_groups, k = len(group_levels), len(categoric_cols)
+    n_levels = max(int(codes.max(initial=-1)) + 1, 1)
+
+    # Tüm çapraz tablolar tek bir bincount ile: (grup, sütun, düzey) -> sayı
+    valid = (codes >= 0) & (group_codes[:, None] >= 0)
+    flat = (group_codes[:, None] * k + np.arange(k)) * n_levels + codes
+    tables = np.bincount(flat[valid], minlength=n_groups * k * n_levels).reshape(n_groups, k, n_levels)
+    return chi2_from_tables(tables.transpose(1, 0, 2), correction)
+
+
+def chi2_from_tables(tables, correction=True):
+    """(k, grup, düzey) biçimli çapraz tablo yığınından ki-kare p-değerleri (sıfır satır/sütunlar yok sayılır)."""
+    from scipy import stats
+    observed = np.asarray(tables, dtype=float)
+
+    # pd.crosstab yalnızca gözlenen satır/sütunları içerir: sıfır satır/sütunlar maskelenir
+    row_sums, col_sums = observed.sum(axis=2), observed.sum(axis=1)
+    totals = row_sums.sum(axis=1)
+    cells = (row_sums > 0)[:, :, None] & (col_sums > 0)[:, None, :]
+    dof = ((row_sums > 0).sum(axis=1) - 1) * ((col_sums > 0).sum(axis=1) - 1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected = row_sums[:, :, None] * col_sums[:, None, :] / totals[:, None, None]
+        if correction:
+            yates = (dof == 1)[:, None, None]
+            diff = expected - observed
+            observed = np.where(yates, observed + np.sign(diff) * np.minimum(0.5, np.abs(diff)), observed)
+        chi2_stat = np.where(cells, (observed - expected) ** 2 / np.where(cells, expected, 1.0), 0.0).sum(axis=(1, 2))
+        p_values = np.where(dof > 0, stats.chi2.sf(chi2_stat, np.maximum(dof, 1)), 1.0)
+    p_values[(totals == 0) | (dof < 0)] = np.nan
+    return p_values
+
+
+def run_equivalence_tests(df, numeric_cols, categoric_cols, group_col='grup', groups=DEFAULT_GROUPS, labels=None):
+    """FAZ 1 testlerini çalıştırır; {görünen ad: p} biçiminde (sayısal, kategorik) sözlük çifti döndürür.
+
+    labels: sütun adı -> rapordaki görünen ad eşlemesi (eşlemede olmayan sütunlar kendi adıyla raporlanır).
+    """
+    labels = labels or {}
+    numeric_cols, categoric_cols = list(numeric_cols), list(categoric_cols)
+    p_numeric = welch_ttests(df, numeric_cols, group_col, groups)
+    p_categoric = chi2_tests(df, categoric_cols, group_col)
+    return (
+        {labels.get(col, col): p for col, p in zip(numeric_cols, p_numeric)},
+        {labels.get(col, col): p for col, p in zip(categoric_cols, p_categoric)},
+    )
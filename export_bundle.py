@@ -0,0 +1,199 @@
+"""Dışa aktarma paketi: sonuçların makine tarafından okunabilir kopyası ve grafikler (tek zip).
+
+PDF raporundaki grafikler kaleido ile alınmış PNG görüntüleridir ve
+hakemlerin yeniden kontrol edebileceği bir şey sunmaz. Paket şunları içerir:
+
+    sonuclar.json            tam sonuç sözlüğü (batch_cli'nin JSON çıktısıyla aynı biçim)
+    istatistikler.parquet    FAZ 1 ve FAZ 2 için test başına bir satır (düzeltme formülü ve model başına n ile;
+                             çok merkezli analizde merkez başına satırlar da)
+    merkezler.parquet, duyarlilik.parquet, tekrarli_olcum.parquet
+                             ilgili analiz açıksa arayüzdeki özet tablolar
+    veri.parquet             temizlenmiş veri seti (analizdeki sütun tipleriyle)
+    grafikler/<ad>.html      etkileşimli Plotly grafikleri (plotly.js pakette bir kez: grafikler/plotly.min.js)
+    grafikler/<ad>.svg       istenirse vektör grafikler (kaleido)
+    rapor.pdf                istenirse PDF raporu
+    manifest.json            üyeler ve boyutları, motor sürümü, protokol; üretilemeyen üyelerin hataları
+
+Üyeler zip'e sırayla akıtılır: veri seti Parquet'e satır grupları halinde
+yazılır, grafikler tek tek dönüştürülür, PDF diske taşan geçici dosyadan
+parça parça kopyalanır; paketin tamamı hiçbir aşamada bellekte tutulmaz.
+PDF ve SVG istenmezse hiçbir grafik rasterleştirilmez.
+"""
+import datetime
+import json
+import shutil
+import tempfile
+import zipfile
+
+import pandas as pd
+
+from analysis import (
+    ANALYSIS_CONFIG, DEFAULT_PLAN, LazyCharts, create_pdf_report_file, results_to_json, stratified_summary_rows
+)
+from chart_render import render_svgs
+from longitudinal import longitudinal_summary_rows
+from profiling import stage
+from sensitivity import sensitivity_summary_rows
+
+BUNDLE_FORMAT_VERSION = 1
+CHART_FORMATS = ('html', 'svg')
+DEFAULT_CHART_FORMATS = ('html',)
+PARQUET_ROW_GROUP_ROWS = 64 * 1024
+COPY_CHUNK_BYTES = 64 * 1024
+BUNDLE_SPOOL_MAX_BYTES = 16 * 1024 * 1024  # bu boyuta kadar paket bellekte, ötesi geçici dosyada tutulur
+
+FAZ2_STAT_COLUMNS = ['n', 'df_num', 'df_denom', 'f_value', 'estimate', 'se']
+STATISTICS_COLUMNS = ['merkez', 'faz', 'anahtar', 'etiket', 'tur', 'bagimli', 'kovaryant', 'duzeltme', *FAZ2_STAT_COLUMNS,
+                      'p_value', 'anlamli']
+
+
+# --- İstatistik tabloları ---
+def _statistics_rows(results, plan, site):
+    rows = []
+    for kind, labels, p_values in (('sayisal', plan.faz1_numeric_labels, results['faz1_numeric_p_values']),
+                                   ('kategorik', plan.faz1_categoric_labels, results['faz1_categoric_p_values'])):
+        rows += [{'merkez': site, 'faz': 1, 'anahtar': col, 'etiket': label, 'tur': kind, 'p_value': p_values[label]}
+                 for col, label in labels.items() if label in p_values]
+    correction = results['correction_applied'].lstrip(' +') or None
+    for key, outcome, baseline in plan.hypothesis_tests:
+        model = results.get('faz2_models', {}).get(key, {})
+        rows.append({'merkez': site, 'faz': 2, 'anahtar': key, 'etiket': plan.p_value_titles.get(key, key), 'tur': 'ancova',
+                     'bagimli': outcome, 'kovaryant': baseline, 'duzeltme': correction,
+                     **{stat: model.get(stat) for stat in FAZ2_STAT_COLUMNS}, 'p_value': results[key]})
+    return rows
+
+
+def statistics_table(results, plan=None, alpha=ANALYSIS_CONFIG['alpha']):
+    """FAZ 1 denklik testleri ve FAZ 2 modelleri: test başına bir satır.
+
+    Çok merkezli analizde birleşik modelin satırları merkez = None, her
+    merkezin satırları merkez adıyla gelir (analiz edilemeyen merkezler atlanır).
+    """
+    plan = plan or DEFAULT_PLAN
+    rows = _statistics_rows(results, plan, None)
+    for site, entry in (results.get('strata') or {}).get('sites', {}).items():
+        if not entry['results'].get('error'):
+            rows += _statistics_rows(entry['results'], plan, site)
+    table = pd.DataFrame(rows, columns=STATISTICS_COLUMNS)
+    table['p_value'] = table['p_value'].astype(float)
+    table['anlamli'] = table['p_value'] < alpha
+    return table
+
+
+def summary_tables(results, plan=None):
+    """Açık olan ek analizlerin arayüzdeki özet tabloları: {üye adı: DataFrame}."""
+    plan = plan or DEFAULT_PLAN
+    tables = {}
+    if results.get('strata'):
+        tables['merkezler.parquet'] = pd.DataFrame(stratified_summary_rows(results, plan))
+    if results.get('sensitivity'):
+        tables['duyarlilik.parquet'] = pd.DataFrame(sensitivity_summary_rows(results['sensitivity'], plan))
+    if results.get('longitudinal'):
+        tables['tekrarli_olcum.parquet'] = pd.DataFrame(longitudinal_summary_rows(results['longitudinal']))
+    return tables
+
+
+# --- Üye yazıcıları ---
+def _write_parquet(stream, df, row_group_rows=PARQUET_ROW_GROUP_ROWS):
+    """Tabloyu satır grupları halinde yazar: bellekte bir seferde yalnızca bir grubun Arrow kopyası bulunur."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    with pq.ParquetWriter(stream, schema) as writer:
+        for start in range(0, len(df), row_group_rows):
+            writer.write_table(pa.Table.from_pandas(df.iloc[start:start + row_group_rows], schema=schema, preserve_index=False))
+
+
+def _copy_file(stream, source):
+    """Dosya yolunu veya ikili dosya nesnesini parça parça kopyalar."""
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        with open(source, 'rb') as f:
+            shutil.copyfileobj(f, stream, COPY_CHUNK_BYTES)
+    else:
+        source.seek(0)
+        shutil.copyfileobj(source, stream, COPY_CHUNK_BYTES)
+
+
+def write_export_bundle(out, results, df_cleaned, charts=None, plan=None, chart_formats=DEFAULT_CHART_FORMATS, include_pdf=False,
+                        pdf=None, source_name=None):
+    """Paketi `out` (dosya yolu veya ikili dosya nesnesi) içine yazar ve manifest sözlüğünü döndürür.
+
+    charts: {ad: Figure} eşlemesi (LazyCharts olabilir; verilmezse df_cleaned'dan oluşturulur).
+    pdf: hazır PDF raporu (yol veya dosya nesnesi); include_pdf açıkken verilmezse oluşturulur.
+    Üretilemeyen grafik / PDF üyeleri paketi bozmaz; hataları manifest'te 'hatalar' altında listelenir.
+    """
+    if results.get('error'):
+        raise ValueError(f"Analiz başarısız olduğu için dışa aktarma paketi oluşturulamaz: {results['error']}")
+    unknown = [fmt for fmt in chart_formats if fmt not in CHART_FORMATS]
+    if unknown:
+        raise ValueError(f"Geçersiz grafik biçimi: {', '.join(unknown)} (geçerli: {', '.join(CHART_FORMATS)})")
+    plan = plan or DEFAULT_PLAN
+    charts = charts if charts is not None else LazyCharts(df_cleaned, plan=plan)
+    manifest = {
+        'paket_surumu': BUNDLE_FORMAT_VERSION, 'olusturulma': datetime.datetime.now().isoformat(timespec='seconds'),
+        'motor_surumu': ANALYSIS_CONFIG['motor_surumu'], 'protokol': plan.name, 'protokol_ozeti': plan.key,
+        'kaynak': source_name, 'n_satir': len(df_cleaned), 'hatalar': {},
+    }
+
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        def member(name, compress_type=zipfile.ZIP_DEFLATED):
+            info = zipfile.ZipInfo(name, date_time=datetime.datetime.now().timetuple()[:6])
+            info.compress_type = compress_type
+            # Boyutu önceden bilinmeyen üyeler akıtılarak yazılır (zip64: 2 GB üstü veri setleri için)
+            return bundle.open(info, 'w', force_zip64=True)
+
+        with stage('paket.json'), member('sonuclar.json') as stream:
+            stream.write(results_to_json({'kaynak': source_name, 'n_satir': len(df_cleaned), **results}, indent=2).encode('utf-8'))
+        with stage('paket.istatistikler'):
+            tables = {'istatistikler.parquet': statistics_table(results, plan), **summary_tables(results, plan)}
+            for name, table in tables.items():
+                with member(name) as stream:
+                    _write_parquet(stream, table)
+        with stage('paket.veri', rows=len(df_cleaned)), member('veri.parquet') as stream:
+            _write_parquet(stream, df_cleaned)
+
+        if 'html' in chart_formats:
+            import plotly.offline
+            with stage('paket.html', rows=len(charts)):
+                with member('grafikler/plotly.min.js') as stream:
+                    stream.write(plotly.offline.get_plotlyjs().encode('utf-8'))
+                for name in charts:
+                    # 'directory': grafik sayfaları aynı klasördeki plotly.min.js'i kullanır (çevrimdışı açılır)
+                    html = charts[name].to_html(include_plotlyjs='directory', full_html=True)
+                    with member(f'grafikler/{name}.html') as stream:
+                        stream.write(html.encode('utf-8'))
+        if 'svg' in chart_formats:
+            for name, svg in render_svgs(charts).items():
+                if isinstance(svg, Exception):
+                    manifest['hatalar'][f'grafikler/{name}.svg'] = f"{type(svg).__name__}: {svg}"
+                    continue
+                with member(f'grafikler/{name}.svg') as stream:
+                    stream.write(svg if isinstance(svg, bytes) else svg.encode('utf-8'))
+
+        if include_pdf or pdf is not None:
+            with stage('paket.pdf'):
+                try:
+                    source = pdf if pdf is not None else create_pdf_report_file(results, charts, plan=plan)
+                    try:
+                        # PDF zaten sıkıştırılmış bir biçimdir; yeniden sıkıştırılmadan saklanır
+                        with member('rapor.pdf', zipfile.ZIP_STORED) as stream:
+                            _copy_file(stream, source)
+                    finally:
+                        if pdf is None:
+                            source.close()  # burada oluşturulan geçici dosya (verilen PDF çağıranındır)
+                except Exception as e:
+                    manifest['hatalar']['rapor.pdf'] = f"{type(e).__name__}: {e}"
+
+        manifest['uyeler'] = [{'ad': info.filename, 'boyut': info.file_size} for info in bundle.infolist()]
+        bundle.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+    return manifest
+
+
+def create_export_bundle_file(results, df_cleaned, charts=None, plan=None, chart_formats=DEFAULT_CHART_FORMATS, include_pdf=False,
+                              pdf=None, source_name=None):
+    """Paketi başa sarılmış bir SpooledTemporaryFile olarak döndürür (BUNDLE_SPOOL_MAX_BYTES üstü diske taşar)."""
+    out = tempfile.SpooledTemporaryFile(max_size=BUNDLE_SPOOL_MAX_BYTES)
+    write_export_bundle(out, results, df_cleaned, charts=charts, plan=plan, chart_formats=chart_formats, include_pdf=include_pdf,
+                        pdf=pdf, source_name=source_name)
+    out.seek(0)
+    return out
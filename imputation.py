@@ -0,0 +1,221 @@
+"""Eksik veriler için çoklu atama (multiple imputation) motoru.
+
+FAZ 2 modelleri eksik son-test / ön-test değeri olan katılımcıları analizden
+çıkarır. Bu modül, NUMERIC_COLUMNS ve CATEGORIC_COLUMNS üzerinde zincirleme
+denklemlerle (MICE) m adet tamamlanmış veri seti üretir ve her birinde FAZ 2
+ANCOVA modellerini kurar; sonuçlar Rubin kurallarıyla birleştirilir.
+
+    * Sayısal sütunlar: tahmini ortalama eşleştirme (PMM). Model, gözlenen
+      satırların bootstrap örneklemi üzerinde kurulur (uygun / "proper" atama)
+      ve her eksik değer, tahmini en yakın k bağışçıdan rastgele birinin
+      gözlenen değeriyle doldurulur.
+    * Kategorik sütunlar: düzey göstergelerinin doğrusal olasılık modeli
+      (yine bootstrap üzerinde) ile tahmin edilen olasılıklardan çekiliş.
+    * 'grup' atanmaz; grubu eksik satırlar modele girmez.
+
+Bellek: tüm sütunlar tek bir float64 taban dizisine (kategorikler düzey
+kodu olarak) kodlanır. Süreç havuzundaki her işçi bu diziyi başlatıcı
+(initializer) üzerinden bir kez alır ve tek bir çalışma kopyası üzerinde
+atamaları sırayla yapar; ana sürece yalnızca model istatistikleri döner.
+Böylece bellek kullanımı m'den bağımsızdır.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ancova_engine import fit_group_ancova_batch
+
+DEFAULT_IMPUTATION_CONFIG = {'m': 20, 'n_iter': 10, 'donors': 5, 'seed': 2209, 'n_jobs': 1}
+
+_worker_base = None  # işçi süreçteki taban dizi ve meta veriler (_init_worker ile atanır)
+
+
+def encode_base(df, numeric_cols, categoric_cols, group_col='grup'):
+    """Tabloyu tek bir float64 diziye kodlar: sayısallar olduğu gibi, kategorikler sıralı düzey kodu (eksik = NaN)."""
+    df = df[df[group_col].notna()]
+    columns = list(numeric_cols) + list(categoric_cols)
+    values = np.empty((len(df), len(columns)))
+    levels = {}
+    for j, col in enumerate(numeric_cols):
+        values[:, j] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+    for j, col in enumerate(categoric_cols, start=len(numeric_cols)):
+        series = df[col].astype(object)
+        try:
+            codes, col_levels = pd.factorize(series, sort=True)
+        except TypeError:
+            codes, col_levels = pd.factorize(series.where(series.isna(), series.astype(str)), sort=True)
+        values[:, j] = np.where(codes >= 0, codes, np.nan)
+        levels[col] = list(col_levels)
+    return {
+        'values': values, 'columns': columns, 'numeric': list(numeric_cols), 'categoric': list(categoric_cols),
+        'levels': levels, 'group_col': group_col,
+    }
+
+
+def _one_hot(codes, n_levels):
+    block = np.zeros((len(codes), max(n_levels - 1, 0)))
+    rows = np.flatnonzero(codes > 0)
+    block[rows, codes[rows].astype(int) - 1] = 1.0
+    return block
+
+
+def _predictors(work, base, target):
+    """Hedef sütun dışındaki tüm sütunlardan (sabit + sayısallar + kategorik kuklalar) tasarım matrisi."""
+    blocks = [np.ones((work.shape[0], 1))]
+    for j, col in enumerate(base['columns']):
+        if j == target:
+            continue
+        if col in base['levels']:
+            blocks.append(_one_hot(work[:, j], len(base['levels'][col])))
+        else:
+            blocks.append(work[:, j:j + 1])
+    return np.hstack(blocks)
+
+
+def _bootstrap_fit(X, Y, rng):
+    rows = rng.integers(0, len(X), size=len(X))
+    beta, *_ = np.linalg.lstsq(X[rows], Y[rows], rcond=None)
+    return beta
+
+
+def _pmm(pred_donors, donor_values, pred_missing, k, rng):
+    """Her eksik satır için tahmini en yakın k bağışçıdan birinin gözlenen değeri (sıralı arama, O(n log n))."""
+    order = np.argsort(pred_donors)
+    sorted_pred, sorted_values = pred_donors[order], donor_values[order]
+    k = min(k, len(sorted_pred))
+    pos = np.searchsorted(sorted_pred, pred_missing)
+    window = np.clip(pos[:, None] + np.arange(-k, k)[None, :], 0, len(sorted_pred) - 1)
+    distance = np.abs(sorted_pred[window] - pred_missing[:, None])
+    nearest = np.argpartition(distance, k - 1, axis=1)[:, :k]
+    choice = nearest[np.arange(len(pred_missing)), rng.integers(0, k, size=len(pred_missing))]
+    return sorted_values[window[np.arange(len(pred_missing)), choice]]
+
+
+def impute_once(base, rng, n_iter, donors, work=None):
+    """Zincirleme denklemlerle bir tamamlanmış veri dizisi üretir (work verilirse onun üzerine yazılır)."""
+    values = base['values']
+    if work is None:
+        work = values.copy()
+    else:
+        np.copyto(work, values)
+    missing = np.isnan(values)
+    targets = [j for j, col in enumerate(base['columns']) if col != base['group_col'] and missing[:, j].any()
+               and (~missing[:, j]).sum() > 1]
+
+    # Başlangıç: her eksik hücre, aynı sütunun gözlenen değerlerinden rastgele bir çekilişle doldurulur
+    for j in targets:
+        observed = values[~missing[:, j], j]
+        work[missing[:, j], j] = rng.choice(observed, size=missing[:, j].sum())
+
+    for _ in range(n_iter):
+        for j in targets:
+            miss, obs = missing[:, j], ~missing[:, j]
+            X = _predictors(work, base, j)
+            col = base['columns'][j]
+            if col in base['levels']:
+                n_levels = len(base['levels'][col])
+                Y = np.zeros((obs.sum(), n_levels))
+                Y[np.arange(obs.sum()), work[obs, j].astype(int)] = 1.0
+                probs = np.clip(X[miss] @ _bootstrap_fit(X[obs], Y, rng), 1e-6, None)
+                cumulative = np.cumsum(probs / probs.sum(axis=1, keepdims=True), axis=1)
+                draws = (cumulative < rng.random((miss.sum(), 1))).sum(axis=1)
+                work[miss, j] = np.minimum(draws, n_levels - 1)
+            else:
+                beta_hat, *_ = np.linalg.lstsq(X[obs], work[obs, j], rcond=None)
+                beta_star = _bootstrap_fit(X[obs], work[obs, j], rng)
+                work[miss, j] = _pmm(X[obs] @ beta_hat, work[obs, j], X[miss] @ beta_star, donors, rng)
+    return work
+
+
+def decode_frame(work, base):
+    """Tamamlanmış diziyi AncovaDesign'ın beklediği tabloya çevirir (kategorikler düzey kodu olarak kalır)."""
+    return pd.DataFrame({col: work[:, j] for j, col in enumerate(base['columns'])})
+
+
+def _init_worker(base):
+    global _worker_base
+    _worker_base = base
+
+
+def _impute_and_fit(task):
+    """İşçi görevi: (tohum listesi, hipotez çiftleri, kovaryantlar, ayarlar) -> her atama için model istatistikleri."""
+    seeds, pairs, covariates, n_iter, donors = task
+    base = _worker_base
+    work = np.empty_like(base['values'])
+    fits = []
+    for seed in seeds:
+        impute_once(base, np.random.default_rng(seed), n_iter, donors, work=work)
+        fits.append(fit_group_ancova_batch(decode_frame(work, base), pairs, group_col=base['group_col'], covariates=covariates))
+    return fits
+
+
+def rubin_pool(estimates, variances, df_complete):
+    """Rubin kuralları: birleşik tahmin, standart hata, Barnard-Rubin serbestlik derecesi, p ve eksik bilgi oranı."""
+    from scipy import stats
+    estimates, variances = np.asarray(estimates, dtype=float), np.asarray(variances, dtype=float)
+    m = len(estimates)
+    pooled = {'estimate': np.nan, 'se': np.nan, 'df': np.nan, 'p_value': np.nan, 'fmi': np.nan}
+    if m < 2 or np.isnan(estimates).any() or np.isnan(variances).any():
+        return pooled
+    q_bar, u_bar, b = estimates.mean(), variances.mean(), estimates.var(ddof=1)
+    total = u_bar + (1 + 1 / m) * b
+    lam = (1 + 1 / m) * b / total if total > 0 else 0.0
+    df_obs = (df_complete + 1) / (df_complete + 3) * df_complete * (1 - lam)
+    df_old = (m - 1) / lam ** 2 if lam > 0 else np.inf
+    dof = 1 / (1 / df_old + 1 / df_obs) if df_obs > 0 else np.nan
+    r = (1 + 1 / m) * b / u_bar if u_bar > 0 else np.inf
+    pooled.update({
+        'estimate': float(q_bar), 'se': float(np.sqrt(total)), 'df': float(dof),
+        'p_value': float(2 * stats.t.sf(abs(q_bar) / np.sqrt(total), dof)) if total > 0 else np.nan,
+        'fmi': float((r + 2 / (dof + 3)) / (r + 1)) if np.isfinite(r) else 1.0,
+    })
+    return pooled
+
+
+def run_multiple_imputation(df, numeric_cols, categoric_cols, pairs, group_col='grup', covariates=(), config=None):
+    """m atamanın her birinde FAZ 2 modellerini kurar ve Rubin kurallarıyla birleştirir.
+
+    config: DEFAULT_IMPUTATION_CONFIG anahtarlarından herhangi biri (eksikler varsayılanla doldurulur).
+    n_jobs > 1 ise atamalar bir süreç havuzunda paralel çalışır; sonuçlar tohum
+    ağacı sayesinde işçi sayısından bağımsızdır.
+    """
+    config = {**DEFAULT_IMPUTATION_CONFIG, **(config or {})}
+    # Şablon dışı kovaryantlar (ör. çok merkezli analizdeki merkez terimi) da atama modellerine katılır
+    known = set(numeric_cols) | set(categoric_cols)
+    numeric_cols = list(numeric_cols) + [col for col, is_cat in covariates if not is_cat and col not in known]
+    categoric_cols = list(categoric_cols) + [col for col, is_cat in covariates if is_cat and col not in known]
+    base = encode_base(df, numeric_cols, categoric_cols, group_col)
+    m = int(config['m'])
+    seeds = np.random.SeedSequence(config['seed']).spawn(m)
+    n_jobs = max(1, min(int(config['n_jobs'] or 1), m))
+    chunks = [seeds[i::n_jobs] for i in range(n_jobs)]
+    tasks = [(chunk, list(pairs), list(covariates), config['n_iter'], config['donors']) for chunk in chunks]
+
+    if n_jobs > 1:
+        # 'spawn': arayüzde havuz bir JobManager iş parçacığından açılır; fork, diğer iş parçacıklarının
+        # tuttuğu kilitleri (import, logging) işçiye kopyalayıp onu kilitleyebilir
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(base,),
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            parts = list(executor.map(_impute_and_fit, tasks))
+    else:
+        _init_worker(base)
+        parts = [_impute_and_fit(task) for task in tasks]
+    # Sıra tohum sırasına geri çevrilir (parça i, i, i+n_jobs, ... numaralı atamaları içerir)
+    fits = [None] * m
+    for i, part in enumerate(parts):
+        fits[i::n_jobs] = part
+
+    models = {}
+    for key, _, _ in pairs:
+        model_fits = [fit[key] for fit in fits]
+        pooled = rubin_pool([f['estimate'] for f in model_fits], [f['se'] ** 2 for f in model_fits],
+                            float(np.mean([f['df_denom'] for f in model_fits])))
+        pooled['n'] = int(model_fits[0]['n'])
+        models[key] = pooled
+
+    return {
+        'm': m, 'n_iter': int(config['n_iter']), 'seed': config['seed'],
+        'n_missing_cells': int(np.isnan(base['values']).sum()), 'models': models,
+    }
@@ -0,0 +1,252 @@
+"""Artımlı (incremental) yeniden analiz.
+
+Sürekli hasta alınan çalışmalarda aynı çalışma dosyası her hafta birkaç yeni
+satırla yeniden yüklenir. Bu modül, önceki yüklemeden kalan yeterli
+istatistikleri (`IncrementalState`) saklar ve yalnızca yeni eklenen satırları
+işler:
+
+    * FAZ 1 sayısal değişkenler: grup başına gözlem sayısı, ortalama ve kareler
+      toplamı (Chan birleştirmesi) -> Welch t-testleri;
+    * FAZ 1 kategorik değişkenler: grup × düzey sayımları -> ki-kare testleri;
+    * FAZ 2: her hipotez için X'X, X'y, y'y ve n -> `grup` teriminin Tip-III
+      F testi (`ancova_engine.fit_from_crossproducts`).
+
+Yeni satırlar satır özetleri (hash) ile bulunur: önceki yüklemedeki tüm
+satırlar yeni dosyada da (sırası değişmiş olsa bile) varsa yalnızca fazlası
+işlenir. Satır silinmiş / değiştirilmişse, düzeltme kovaryantı kümesi
+değişmişse veya kategorik bir sütunda yeni bir düzey görülmüşse tam yeniden
+hesaplamaya dönülür. Yeniden örnekleme (permütasyon / bootstrap) ve çoklu atama
+doğası gereği tüm veriyi kullanır ve istenirse her seferinde tam tablo üzerinde
+çalışır.
+"""
+import json
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from analysis import (
+    ANALYSIS_CONFIG, DEFAULT_PLAN, prepare_analysis_frame, record_faz1_results, record_faz2_results, write_final_report
+)
+from ancova_engine import AncovaDesign, fit_from_crossproducts, fit_group_ancova_batch
+from equivalence import chi2_from_tables, welch_from_moments
+from imputation import run_multiple_imputation
+from resampling import run_resampling_inference
+from result_cache import make_bytes_key
+from sensitivity import run_sensitivity_analysis
+from longitudinal import run_longitudinal_analysis
+
+STATE_FORMAT_VERSION = 2
+
+
+def row_hashes(df, plan=None):
+    """Zorunlu sütunlar üzerinden satır başına 64 bitlik özet (indeks ve ek sütunlar yok sayılır)."""
+    frame = df[(plan or DEFAULT_PLAN).all_required_columns]
+    # float32'de saklanan sütunlar float64 olarak özetlenir: özet, sütunun saklama genişliğine bağlı olmasın
+    narrow = [col for col, dtype in frame.dtypes.items() if dtype == np.float32]
+    if narrow:
+        frame = frame.astype(dict.fromkeys(narrow, np.float64))
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def appended_rows_mask(old_hashes, new_hashes):
+    """Önceki tüm satırlar yeni tabloda da varsa yeni (fazla) satırların maskesini, yoksa None döndürür.
+
+    Aynı içerikli satırlar çoklu küme olarak sayılır; satır sırası önemli değildir.
+    """
+    old_values, old_counts = np.unique(old_hashes, return_counts=True)
+    new_values, new_counts = np.unique(new_hashes, return_counts=True)
+    idx = np.searchsorted(new_values, old_values)
+    found = idx < len(new_values)
+    found[found] = new_values[idx[found]] == old_values[found]
+    if not found.all() or (new_counts[idx] < old_counts).any():
+        return None
+
+    # Aynı özete sahip satırlardan önceki yüklemedeki sayı kadarı "eski", kalanlar "yeni" sayılır
+    new_hashes = pd.Series(new_hashes)
+    occurrence = new_hashes.groupby(new_hashes).cumcount().to_numpy()
+    seen_before = pd.Series(old_counts, index=old_values).reindex(new_hashes.to_numpy(), fill_value=0).to_numpy()
+    return occurrence >= seen_before
+
+
+def _group_moments(df, numeric_cols, groups, group_col='grup'):
+    """2×k gözlem sayısı, ortalama ve ortalamadan sapmaların kareler toplamı (M2)."""
+    values = df[numeric_cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    group_values = df[group_col].to_numpy()
+    counts, means, m2 = (np.zeros((len(groups), len(numeric_cols))) for _ in range(3))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i, group in enumerate(groups):
+            block = values[group_values == group]
+            valid = ~np.isnan(block)
+            counts[i] = valid.sum(axis=0)
+            means[i] = np.where(counts[i] > 0, np.where(valid, block, 0.0).sum(axis=0) / counts[i], 0.0)
+            m2[i] = (np.where(valid, block - means[i], 0.0) ** 2).sum(axis=0)
+    return counts, means, m2
+
+
+def _merge_moments(a, b):
+    """İki parçanın (sayı, ortalama, M2) özetlerini birleştirir (Chan vd. paralel varyans formülü)."""
+    (n_a, mean_a, m2_a), (n_b, mean_b, m2_b) = a, b
+    n = n_a + n_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = mean_b - mean_a
+        mean = np.where(n > 0, mean_a + delta * n_b / np.where(n > 0, n, 1.0), 0.0)
+        m2 = m2_a + m2_b + np.where(n > 0, delta ** 2 * n_a * n_b / np.where(n > 0, n, 1.0), 0.0)
+    return n, mean, m2
+
+
+def _contingency_counts(df, categoric_cols, group_col='grup'):
+    """{sütun: Counter((grup, düzey) -> sayı)}; grup veya düzeyi eksik satırlar sayılmaz."""
+    tables = {}
+    for col in categoric_cols:
+        sizes = df.groupby([group_col, col], observed=True).size()
+        tables[col] = Counter({key: int(count) for key, count in sizes.items() if count})
+    return tables
+
+
+def _crossproducts(df, covariates, plan, levels=None):
+    """Her hipotez için (X'X, X'y, y'y, n) ve kullanılan düzeyler; levels dışı bir değer görülürse (None, None)."""
+    design = AncovaDesign(df, plan.group_col, covariates, levels=levels)
+    if design.unknown_levels:
+        return None, None
+    products = {}
+    for key, outcome, baseline in plan.hypothesis_tests:
+        W, G, y = design.model_arrays(outcome, baseline)
+        X = np.column_stack([G, W])
+        products[key] = {'xtx': X.T @ X, 'xty': X.T @ y, 'yty': float(y @ y), 'n': len(y), 'n_group_cols': G.shape[1]}
+    return products, design.levels
+
+
+class IncrementalState:
+    """Bir çalışma dosyasının son analizinden kalan yeterli istatistikler (ResultCache'e pickle olarak yazılır)."""
+
+    def __init__(self, df, plan=None):
+        self.format_version = STATE_FORMAT_VERSION
+        self.plan = plan or DEFAULT_PLAN
+        self.hashes = row_hashes(df, self.plan)
+        self.numeric_cols, self.categoric_cols = list(self.plan.faz1_numeric_labels), list(self.plan.faz1_categoric_labels)
+        self.moments = _group_moments(df, self.numeric_cols, self.plan.groups, self.plan.group_col)
+        self.tables = _contingency_counts(df, self.categoric_cols, self.plan.group_col)
+        self.covariates = None
+        self.products = None
+        self.levels = None
+
+    @property
+    def n_rows(self):
+        return len(self.hashes)
+
+    def absorb_faz1(self, df_new):
+        self.moments = _merge_moments(self.moments, _group_moments(df_new, self.numeric_cols, self.plan.groups, self.plan.group_col))
+        for col, counts in _contingency_counts(df_new, self.categoric_cols, self.plan.group_col).items():
+            self.tables[col].update(counts)
+
+    def faz1_p_values(self):
+        counts, means, m2 = self.moments
+        with np.errstate(invalid='ignore', divide='ignore'):
+            p_numeric = welch_from_moments(counts, means, m2 / (counts - 1))
+
+        # Tüm sütunların tabloları (k, grup, düzey) biçiminde sıfırla doldurulmuş tek yığına yerleştirilir
+        groups = sorted({group for table in self.tables.values() for group, _ in table}, key=str)
+        levels = {col: sorted({level for _, level in table}, key=str) for col, table in self.tables.items()}
+        stacked = np.zeros((len(self.categoric_cols), max(len(groups), 1), max([len(v) for v in levels.values()] + [1])))
+        for i, col in enumerate(self.categoric_cols):
+            level_index = {level: j for j, level in enumerate(levels[col])}
+            for (group, level), count in self.tables[col].items():
+                stacked[i, groups.index(group), level_index[level]] = count
+        p_categoric = chi2_from_tables(stacked)
+
+        labels = self.plan.faz1_labels
+        return ({labels[col]: p for col, p in zip(self.numeric_cols, p_numeric)},
+                {labels[col]: p for col, p in zip(self.categoric_cols, p_categoric)})
+
+    def rebuild_faz2(self, df, covariates):
+        self.covariates = list(covariates)
+        self.products, self.levels = _crossproducts(df, self.covariates, self.plan)
+
+    def absorb_faz2(self, df_new):
+        """Yeni satırların çapraz çarpımlarını ekler; yeni bir kategori düzeyi varsa False döndürür."""
+        products, _ = _crossproducts(df_new, self.covariates, self.plan, levels=self.levels)
+        if products is None:
+            return False
+        for key, part in products.items():
+            total = self.products[key]
+            for stat in ('xtx', 'xty', 'yty', 'n'):
+                total[stat] = total[stat] + part[stat]
+        return True
+
+    def faz2_models(self):
+        return {key: fit_from_crossproducts(p['xtx'], p['xty'], p['yty'], p['n'], p['n_group_cols'])
+                for key, p in self.products.items()}
+
+
+def incremental_state_key(study_id, config=None):
+    """Çalışma kimliği (ör. dosya adı) ve analiz ayarlarına göre durum anahtarı."""
+    config = {key: value for key, value in (config or ANALYSIS_CONFIG).items() if key not in ('yeniden_ornekleme', 'coklu_atama', 'duyarlilik', 'tekrarli_olcum')}
+    return make_bytes_key(json.dumps([study_id, config], sort_keys=True, default=str).encode(), 'incremental')
+
+
+def run_incremental_analysis(df_data, state=None, resampling=None, imputation=None, plan=None, sensitivity=None, longitudinal=None):
+    """`run_full_analysis` ile aynı sonuç sözlüğünü, önceki durumdan yalnızca yeni satırları işleyerek üretir.
+
+    (sonuçlar, yeni durum) döndürür; sonuçlardaki 'incremental' anahtarı hangi
+    yolun izlendiğini açıklar. Hata durumunda yeni durum None'dır.
+    """
+    plan = plan or DEFAULT_PLAN
+    df_cleaned, error = prepare_analysis_frame(df_data, plan)
+    if error:
+        return {'error': error}, None
+
+    hashes = row_hashes(df_cleaned, plan)
+    new_mask, reason = None, None
+    if state is None or getattr(state, 'format_version', None) != STATE_FORMAT_VERSION:
+        reason = "önceki analiz durumu yok"
+    elif state.plan.key != plan.key:
+        reason = "çalışma tanımı değişti"
+    else:
+        new_mask = appended_rows_mask(state.hashes, hashes)
+        if new_mask is None:
+            reason = "önceki satırlardan bazıları değiştirilmiş veya silinmiş"
+
+    results = {}
+    if new_mask is None:
+        state = IncrementalState(df_cleaned, plan)
+        df_new = df_cleaned
+    else:
+        df_new = df_cleaned[new_mask]
+        state.absorb_faz1(df_new)
+        state.hashes = hashes
+
+    correction_covariates = record_faz1_results(results, *state.faz1_p_values(), plan)
+    if reason is None and correction_covariates != state.covariates:
+        reason = "düzeltme kovaryantları değişti"
+    elif reason is None and len(df_new) and not state.absorb_faz2(df_new):
+        reason = "yeni bir kategori düzeyi görüldü"
+
+    if reason is None:
+        faz2_models = state.faz2_models()
+    else:
+        # Tam yol: sonuçlar toplu motorla (run_full_analysis ile birebir) hesaplanır, çapraz çarpımlar yeniden kurulur
+        state.rebuild_faz2(df_cleaned, correction_covariates)
+        faz2_models = fit_group_ancova_batch(df_cleaned, plan.hypothesis_tests, group_col=plan.group_col, covariates=correction_covariates)
+    record_faz2_results(results, faz2_models)
+
+    if resampling:
+        results['resampling'] = run_resampling_inference(df_cleaned, plan.hypothesis_tests, group_col=plan.group_col,
+                                                         covariates=correction_covariates, config=resampling)
+    if imputation:
+        results['imputation'] = run_multiple_imputation(df_cleaned, plan.numeric_columns, plan.categoric_columns, plan.hypothesis_tests,
+                                                        group_col=plan.group_col, covariates=correction_covariates, config=imputation)
+    if sensitivity:
+        # Düzeltme setleri farklı olduğundan tarama her zaman tüm tablo üzerinde yapılır
+        results['sensitivity'] = run_sensitivity_analysis(df_cleaned, plan.hypothesis_tests, {**results['faz1_numeric_p_values'], **results['faz1_categoric_p_values']},
+                                                          correction_covariates, plan, group_col=plan.group_col, config=sensitivity,
+                                                          primary_models=faz2_models)
+    if longitudinal and plan.repeated_measures:
+        # Karma model desen istatistikleri tek geçişte hesaplandığından yine tüm tablo üzerinde kurulur
+        results['longitudinal'] = run_longitudinal_analysis(df_cleaned, plan, config=longitudinal)
+    results['incremental'] = {
+        'mode': 'tam' if reason else 'artımlı', 'reason': reason,
+        'new_rows': int(len(df_new)) if reason is None else int(len(df_cleaned)), 'total_rows': int(len(df_cleaned)),
+    }
+    write_final_report(results, plan)
+    return results, state
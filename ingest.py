@@ -0,0 +1,191 @@
+"""Veri yükleme (ingestion) katmanı.
+
+Şablon dosyası .xlsx (calamine veya akış modunda salt-okunur openpyxl), .csv
+veya .parquet olarak okunur; zorunlu sütunlar doğrulanır, sayısal sütunlardaki
+'yok' / '7,0' gibi hatalı girişler tek seferde NaN'a çevrilir ve kategorik
+sütunlar `category` tipiyle yüklenir. Temizlenmiş tablo analiz, grafik ve
+rapor aşamalarında yeniden dönüştürülmeden kullanılır.
+
+Tablo oturum boyunca bellekte tutulduğu için sıkıştırılmış biçimdedir:
+* Sayısal sütunlar, değerleri float32'de birebir temsil edilebiliyorsa (tam
+  sayı puanlar, yaş, 37,5 gibi yarımlar) float32 tek bir blokta saklanır;
+  7,3 gibi ondalıklar içeren sütunlar p-değerleri değişmesin diye float64
+  kalır. Motorlar hesaplamadan önce float64'e çevirdiği için sonuçlar aynıdır.
+* Kategorik ve diğer metin sütunları (ör. merkez) `category` tipindedir:
+  satır başına küçük bir tam sayı kodu ve ortak bir kategori tablosu.
+pandas 3'te yazma-sırasında-kopyalama (Copy-on-Write) varsayılan olduğundan
+tablo tüm aşamalar ve aynı işi paylaşan oturumlar arasında kopyalanmadan,
+salt-okunur olarak paylaşılır.
+"""
+import csv
+import importlib.util
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from analysis import DEFAULT_PLAN, missing_columns_error
+
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xlsm', '.csv', '.parquet')
+CSV_SNIFF_BYTES = 64 * 1024
+
+
+def _has_module(name):
+    return importlib.util.find_spec(name) is not None
+
+
+def _source_name(source, filename):
+    if filename:
+        return filename
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return getattr(source, 'name', '') or ''
+
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+
+def _read_xlsx(source):
+    """calamine (Rust) kuruluysa onu, değilse akış modunda salt-okunur openpyxl'i kullanır."""
+    if _has_module('python_calamine'):
+        return pd.read_excel(source, engine='calamine')
+
+    import openpyxl
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        # Başlıksız (None) sütunlar pd.read_excel ile aynı biçimde adlandırılır
+        columns = [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)]
+        records = [row for row in rows if any(value is not None for value in row)]
+        return pd.DataFrame.from_records(records, columns=columns)
+    finally:
+        workbook.close()
+
+
+def _sniff_csv(source):
+    """Ayırıcıyı (',', ';', TAB) ve kodlamayı (UTF-8 / Windows-1254) dosyanın başından tahmin eder: (ayırıcı, kodlama)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            head = f.read(CSV_SNIFF_BYTES)
+    else:
+        head = source.read(CSV_SNIFF_BYTES)
+        _rewind(source)
+
+    encoding = 'utf-8-sig'
+    try:
+        sample = head.decode(encoding)
+    except UnicodeDecodeError:
+        encoding = 'cp1254'
+        sample = head.decode(encoding, errors='replace')
+    try:
+        sep = csv.Sniffer().sniff(sample.split('\n', 1)[0], delimiters=',;\t').delimiter
+    except csv.Error:
+        sep = ','
+    return sep, encoding
+
+
+def _read_csv_header(source):
+    sep, encoding = _sniff_csv(source)
+    return pd.read_csv(source, sep=sep, encoding=encoding, nrows=0).columns
+
+
+def _read_csv(source):
+    sep, encoding = _sniff_csv(source)
+
+    # Türkçe Excel CSV'leri ';' ayırıcı ve ',' ondalık kullanır
+    if sep == ';':
+        return pd.read_csv(source, sep=sep, decimal=',', encoding=encoding, low_memory=False)
+    if _has_module('pyarrow') and encoding == 'utf-8-sig':
+        return pd.read_csv(source, sep=sep, engine='pyarrow', encoding='utf-8')
+    return pd.read_csv(source, sep=sep, encoding=encoding, low_memory=False)
+
+
+def read_study(source, filename=None):
+    """Dosya yolu veya dosya benzeri nesneden (ör. Streamlit UploadedFile) ham tabloyu okur."""
+    extension = os.path.splitext(_source_name(source, filename))[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"HATA: Desteklenmeyen dosya türü '{extension or '?'}'. Desteklenen türler: {', '.join(SUPPORTED_EXTENSIONS)}")
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    _rewind(source)
+    if extension == '.csv':
+        return _read_csv(source)
+    if extension == '.parquet':
+        return pd.read_parquet(source)
+    return _read_xlsx(source)
+
+
+def read_columns(source, filename=None):
+    """Yalnızca başlık satırını okuyarak sütun adlarını döndürür (ör. merkez sütunu seçimi için)."""
+    extension = os.path.splitext(_source_name(source, filename))[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        return []
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    _rewind(source)
+    try:
+        if extension == '.parquet':
+            import pyarrow.parquet as pq
+            return list(pq.read_schema(source).names)
+        if extension == '.csv':
+            return list(_read_csv_header(source))
+        import openpyxl
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            header = next(workbook.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+            return [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)]
+        finally:
+            workbook.close()
+    finally:
+        _rewind(source)
+
+
+def prepare_study(df_raw, plan=None):
+    """Zorunlu sütunları doğrular, sayısal sütunları bir kez temizler ve tabloyu sıkıştırılmış biçime getirir.
+
+    Sütunlar çalışma tanımından (plan; varsayılan protokol) alınır. Eksik sütun
+    varsa şablon hatası mesajıyla ValueError yükseltir.
+    """
+    plan = plan or DEFAULT_PLAN
+    numeric_columns, categoric_columns = set(plan.numeric_columns), set(plan.categoric_columns)
+    missing_cols = [col for col in plan.all_required_columns if col not in df_raw.columns]
+    if missing_cols:
+        raise ValueError(missing_columns_error(missing_cols))
+
+    columns = {}
+    for col in df_raw.columns:
+        series = df_raw[col]
+        if col in numeric_columns:
+            if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                # 'yok', 'bilinmiyor', '7,0' vb. -> NaN (tek geçişte, vektörel)
+                series = pd.to_numeric(series, errors='coerce')
+            series = _narrow_float(series.astype(np.float64))
+        elif (col in categoric_columns or pd.api.types.is_string_dtype(series)) and not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype('category')
+        columns[col] = series
+    # Aynı tipteki sütunlar tek blokta birleşir (sayısal sütunlar tek bir float32 / float64 dizisi)
+    return pd.DataFrame(columns, index=df_raw.index)
+
+
+def _narrow_float(series):
+    """float64 sütunu, tüm değerler float32'de birebir temsil edilebiliyorsa float32'ye indirir."""
+    narrow = series.astype(np.float32)
+    if np.array_equal(narrow.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True):
+        return narrow
+    return series
+
+
+def frame_memory_mb(df):
+    """Tablonun bellekteki boyutu (MB; kategori tabloları ve metinler dahil)."""
+    return round(df.memory_usage(index=True, deep=True).sum() / 2 ** 20, 3)
+
+
+def load_study(source, filename=None, plan=None):
+    """read_study + prepare_study."""
+    return prepare_study(read_study(source, filename), plan)
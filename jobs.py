@@ -0,0 +1,166 @@
+"""Arka plan iş kuyruğu.
+
+Uzun süren analizler Streamlit betik iş parçacığında değil, süreç genelinde
+paylaşılan bir iş parçacığı havuzunda çalışır. Her iş bir kimlik (job id)
+alır; arayüz bu kimliği oturum durumunda saklar ve işin durumunu / ilerlemesini
+yoklar. İş, yeniden çalıştırmalardan (rerun) ve sayfa yenilemeden bağımsız
+olarak tamamlanır.
+
+Aynı anahtarla (ör. aynı dosya + aynı ayarlar) gönderilen ikinci iş yeniden
+çalıştırılmaz; kuyruktaki / çalışan / yeni tamamlanmış iş döndürülür. Bitmiş
+işler `JOB_TTL_SECONDS` sonra bellekten atılır. `max_pending` verilirse
+bitmemiş iş sayısı bu sınıra ulaştığında yeni iş kabul edilmez (HTTP API'nin
+kuyruk sınırı); `wait` bir işin bitmesini yoklamadan bekler.
+"""
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_JOB_WORKERS = int(os.environ.get('EBELIK_JOB_WORKERS', min(8, os.cpu_count() or 1)))
+JOB_TTL_SECONDS = 30 * 60
+
+JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED = 'kuyrukta', 'çalışıyor', 'tamamlandı', 'hata'
+
+
+class JobQueueFull(RuntimeError):
+    """Bitmemiş iş sayısı sınırda olduğu için yeni iş kuyruğa alınmadı."""
+
+
+class Job:
+    """Tek bir arka plan işinin durumu; alanlar JobManager kilidi altında güncellenir."""
+
+    def __init__(self, job_id, key=None, label=''):
+        self.id = job_id
+        self.key = key
+        self.label = label
+        self.status = JOB_QUEUED
+        self.progress = 0.0
+        self.message = "Sırada bekliyor..."
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobManager:
+    """İş parçacığı havuzu üzerinde ilerleme raporlu iş kuyruğu.
+
+    İş fonksiyonu ilk argüman olarak `progress(oran, mesaj)` geri çağırımını
+    alır; dönüş değeri `job.result`, yükselttiği istisna `job.error` olur.
+    """
+
+    def __init__(self, max_workers=DEFAULT_JOB_WORKERS, ttl_seconds=JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='ebelik-job')
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)  # bir iş bittiğinde bekleyenler uyandırılır
+
+    def submit(self, fn, *args, key=None, label='', max_pending=None, **kwargs):
+        """İşi kuyruğa ekler ve kimliğini döndürür; aynı anahtarlı güncel bir iş varsa onun kimliği döner.
+
+        max_pending: bitmemiş iş sayısı bu değere ulaştıysa JobQueueFull yükseltilir (aynı anahtarlı iş varsa yine onu döndürür).
+        """
+        with self._lock:
+            self._purge_locked()
+            existing = self._jobs.get(self._by_key.get(key)) if key is not None else None
+            if existing is not None and existing.status != JOB_FAILED:
+                return existing.id
+            if max_pending is not None and sum(not job.finished for job in self._jobs.values()) >= max_pending:
+                raise JobQueueFull(f"Kuyrukta en fazla {max_pending} bitmemiş iş olabilir.")
+            job = Job(uuid.uuid4().hex, key=key, label=label)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[key] = job.id
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id, timeout=None):
+        """İş bitene (veya zaman aşımına) kadar bekler ve işi döndürür (bilinmeyen kimlik için None)."""
+        with self._finished:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._finished.wait_for(lambda: job.finished, timeout)
+            return job
+
+    def snapshot(self):
+        """Tüm işlerin (kimlik, etiket, durum, ilerleme, süre) özeti; izleme için."""
+        with self._lock:
+            self._purge_locked()
+            return [
+                {'id': job.id, 'etiket': job.label, 'durum': job.status, 'ilerleme': job.progress, 'sure_sn': round(job.elapsed, 1)}
+                for job in self._jobs.values()
+            ]
+
+    def forget(self, job_id):
+        """Bitmiş bir işi (sonucu alındıktan sonra) bellekten atar."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.finished:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) == job_id:
+                    del self._by_key[job.key]
+
+    # --- Yardımcılar ---
+    def _purge_locked(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and now - job.finished_at > self.ttl_seconds]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if self._by_key.get(job.key) == job_id:
+                del self._by_key[job.key]
+
+    def _update(self, job, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            if job.finished:
+                self._finished.notify_all()
+
+    def _run(self, job, fn, args, kwargs):
+        def progress(fraction, message=None):
+            fields = {'progress': min(max(float(fraction), 0.0), 1.0)}
+            if message:
+                fields['message'] = message
+            self._update(job, **fields)
+
+        self._update(job, status=JOB_RUNNING, started_at=time.time(), message="Başlatılıyor...")
+        try:
+            result = fn(progress, *args, **kwargs)
+        except Exception as e:
+            self._update(job, status=JOB_FAILED, error=str(e), traceback=traceback.format_exc(), finished_at=time.time())
+        else:
+            self._update(job, status=JOB_DONE, result=result, progress=1.0, message="Tamamlandı", finished_at=time.time())
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Süreçteki tüm oturumların paylaştığı tek iş yöneticisini döndürür."""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
@@ -0,0 +1,299 @@
+"""Tekrarlı ölçümler: uzun biçimli tablo ve grup × zaman karma modeli.
+
+Aynı ölçeğin baseline / 4cm / 8cm sütunları (çalışma tanımındaki
+`tekrarli_olcumler`) bir kez uzun biçime çevrilir: her gözlem için katılımcı
+indeksi, zaman indeksi ve değer (eksik değerler atılır). Bu tablo hem karma
+model motoru hem de dashboard'daki evrim grafikleri (çizgi / likert) için
+kullanılır; tablo başına `get_long_table` ile bir kez kurulur.
+
+Model: değer ~ grup × zaman (hücre ortalamaları) + katılımcı başına rastgele
+sabit. Rastgele sabitli modelde katılımcı i'nin kovaryansı
+σ²(I + λJ) olduğundan, REML olabilirliği ve GLS çözümü katılımcıların
+yalnızca (grup, gözlenen zamanlar) desenine göre toplanmış istatistiklerinden
+hesaplanır: veri bir kez taranır, λ = τ²/σ² üzerindeki her optimizasyon adımı
+katılımcı sayısından bağımsızdır (desen sayısı × hücre sayısı²).
+
+β, σ² ve τ², `statsmodels` MixedLM (REML) ile optimizasyon toleransı içinde
+aynıdır. β'nın kovaryansı ise model tabanlı σ²(X'V⁻¹X)⁻¹'dir; MixedLM'in
+`cov_params()`'ı tüm parametrelerin gözlenen Hessian'ının tersi olduğundan
+standart hatalar binde birkaç farklı olabilir. `method='verify'` β / σ² / τ²'yi
+doğrudan, kovaryansı ise statsmodels'in varyans bileşenlerinden kurulan
+σ²(X'V⁻¹X)⁻¹ ile karşılaştırır.
+"""
+import threading
+import weakref
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+LONGITUDINAL_METHODS = ('numpy', 'statsmodels', 'verify')
+DEFAULT_LONGITUDINAL_CONFIG = {'method': 'numpy', 'ci_level': 0.95}
+VERIFY_RTOL = 1e-3  # statsmodels REML optimizasyonunun yakınsama toleransı düzeyinde
+LOG_LAMBDA_BOUNDS = (-20.0, 20.0)
+MAX_TIMES = 52  # desen kodu, gözlenen zamanların float64'te tam temsil edilen bit maskesidir
+
+# Bir sütun setinin uzun biçimi: zaman-öncelikli sırada (önce tüm katılımcıların ilk zamanı) gözlenen değerler
+LongSeries = namedtuple('LongSeries', ['participant', 'time', 'value', 'n_times'])
+
+
+class LongTable:
+    """Tablodaki tekrarlı ölçüm sütun setlerinin uzun biçimi (satırlar tablonun satır sırasıyla katılımcılardır)."""
+
+    def __init__(self, df, column_sets):
+        self.n_participants = len(df)
+        self._series = {}
+        for columns in column_sets:
+            key = tuple(columns)
+            if key in self._series:
+                continue
+            values = df[list(columns)].to_numpy(dtype=np.float64).T.ravel()
+            valid = np.flatnonzero(~np.isnan(values))
+            time, participant = np.divmod(valid, max(self.n_participants, 1))
+            self._series[key] = LongSeries(participant, time, values[valid], len(key))
+
+    def series(self, columns):
+        return self._series[tuple(columns)]
+
+    @property
+    def n_rows(self):
+        return sum(len(series.value) for series in self._series.values())
+
+    def cell_stats(self, columns, group_codes, n_groups):
+        """(grup × zaman) hücre başına gözlem sayısı ve değer toplamı; group_codes katılımcı başına (eksik = -1)."""
+        series = self.series(columns)
+        groups = np.asarray(group_codes)[series.participant]
+        keep = groups >= 0
+        cells = groups[keep] * series.n_times + series.time[keep]
+        size = n_groups * series.n_times
+        counts = np.bincount(cells, minlength=size).reshape(n_groups, series.n_times)
+        sums = np.bincount(cells, weights=series.value[keep], minlength=size).reshape(n_groups, series.n_times)
+        return counts, sums
+
+
+def long_table_column_sets(plan):
+    """Uzun biçime çevrilecek sütun setleri: tekrarlı ölçümler ve zaman içeren grafikler (çizgi / likert)."""
+    sets = [measure['columns'] for measure in plan.repeated_measures]
+    sets += [chart['sutunlar'] for chart in plan.charts.values() if chart['tur'] in ('cizgi', 'likert')]
+    return list(dict.fromkeys(tuple(columns) for columns in sets))
+
+
+_long_tables = {}
+_long_tables_lock = threading.Lock()
+
+
+def get_long_table(df, plan):
+    """Tablo (nesne) ve plan başına bir kez kurulan uzun tablo; tablo bellekten silinince önbellekten de düşer.
+
+    Analiz işi ve dashboard grafikleri aynı temizlenmiş tabloyu kullandığından uzun biçim bir kez oluşturulur.
+    """
+    key = (id(df), plan.key)
+    with _long_tables_lock:
+        table = _long_tables.get(key)
+        if table is None:
+            table = _long_tables[key] = LongTable(df, long_table_column_sets(plan))
+            weakref.finalize(df, _long_tables.pop, key, None)
+        return table
+
+
+# --- Karma model (rastgele sabitli, REML) ---
+def _pattern_stats(series, group_codes):
+    """Katılımcıları (grup, gözlenen zamanlar) desenine göre toplar.
+
+    group_codes: katılımcı başına 0 (kontrol), 1 (müdahale) veya -1 (modele girmez).
+    """
+    T = series.n_times
+    if T > MAX_TIMES:
+        raise ValueError(f"Karma model en fazla {MAX_TIMES} zaman noktasını destekler (verilen: {T}).")
+    groups = group_codes[series.participant]
+    keep = groups >= 0
+    participant, time, y, groups = series.participant[keep], series.time[keep], series.value[keep], groups[keep]
+    cells = groups * T + time
+    p = 2 * T
+    n_cells = np.bincount(cells, minlength=p).astype(float)
+    xty = np.bincount(cells, weights=y, minlength=p)
+    yty = float(y @ y)
+
+    # Katılımcı başına desen kodu: grup ve gözlenen zamanların bit maskesi; aynı desendeki katılımcılar birleştirilir
+    n_all = len(group_codes)
+    mask = np.bincount(participant, weights=np.left_shift(1, time), minlength=n_all).astype(np.int64)
+    y_sum = np.bincount(participant, weights=y, minlength=n_all)
+    present = mask > 0
+    codes = (group_codes[present] << T) | mask[present]
+    y_sum = y_sum[present]
+    used, inverse, count = np.unique(codes, return_inverse=True, return_counts=True)
+    bits = (used[:, None] >> np.arange(T)) & 1
+    S = np.zeros((len(used), p))
+    S[:, :T] = bits * (used[:, None] >> T == 0)
+    S[:, T:] = bits * (used[:, None] >> T == 1)
+    return {
+        'N': len(y), 'n_participants': int(present.sum()), 'n_cells': n_cells, 'xty': xty, 'yty': yty, 'S': S,
+        'count': count.astype(float), 'size': S.sum(axis=1),
+        'y_sum': np.bincount(inverse, weights=y_sum, minlength=len(used)),
+        'y_sum2': np.bincount(inverse, weights=y_sum ** 2, minlength=len(used)),
+    }
+
+
+def _reml_terms(stats_, lam):
+    """λ için GLS terimleri: (A = X'V⁻¹X, b = X'V⁻¹y, c = y'V⁻¹y, Σ log det V_i) (V, σ² ile ölçeklenmiş)."""
+    w = lam / (1.0 + stats_['size'] * lam)
+    S = stats_['S']
+    A = np.diag(stats_['n_cells']) - S.T @ (S * (stats_['count'] * w)[:, None])
+    b = stats_['xty'] - S.T @ (w * stats_['y_sum'])
+    c = stats_['yty'] - w @ stats_['y_sum2']
+    logdet_v = stats_['count'] @ np.log1p(stats_['size'] * lam)
+    return A, b, c, logdet_v
+
+
+def _neg2_reml(stats_, lam):
+    A, b, c, logdet_v = _reml_terms(stats_, lam)
+    dof = stats_['N'] - len(b)
+    sign, logdet_a = np.linalg.slogdet(A)
+    rss = c - b @ np.linalg.solve(A, b)
+    if sign <= 0 or rss <= 0:
+        return np.inf
+    return dof * np.log(rss / dof) + logdet_v + logdet_a
+
+
+def _gls_covariance(stats_, sigma2, tau2):
+    """Varyans bileşenlerinden β'nın model tabanlı kovaryansı σ²(X'V⁻¹X)⁻¹."""
+    A, _, _, _ = _reml_terms(stats_, tau2 / sigma2)
+    return sigma2 * np.linalg.inv(A)
+
+
+def fit_random_intercept(stats_):
+    """REML tahmini: (hücre ortalamaları β, kovaryans matrisi, σ², τ²)."""
+    from scipy import optimize
+    candidates = [(0.0, _neg2_reml(stats_, 0.0))]
+    result = optimize.minimize_scalar(lambda log_lam: _neg2_reml(stats_, np.exp(log_lam)), bounds=LOG_LAMBDA_BOUNDS,
+                                      method='bounded', options={'xatol': 1e-10})
+    candidates.append((float(np.exp(result.x)), float(result.fun)))
+    lam = min(candidates, key=lambda item: item[1])[0]
+    A, b, c, _ = _reml_terms(stats_, lam)
+    A_inv = np.linalg.inv(A)
+    beta = A_inv @ b
+    sigma2 = (c - b @ beta) / (stats_['N'] - len(b))
+    return beta, sigma2 * A_inv, float(sigma2), float(lam * sigma2)
+
+
+def _fit_statsmodels(series, group_codes):
+    """Doğrulama yolu: statsmodels MixedLM (REML, hücre ortalamaları parametrelemesi)."""
+    import statsmodels.formula.api as smf
+    groups = group_codes[series.participant]
+    keep = groups >= 0
+    T = series.n_times
+    data = pd.DataFrame({'deger': series.value[keep], 'katilimci': series.participant[keep],
+                         'hucre': pd.Categorical(groups[keep] * T + series.time[keep], categories=range(2 * T))})
+    model = smf.mixedlm("deger ~ 0 + hucre", data, groups=data['katilimci']).fit(reml=True)
+    p = 2 * T
+    return (np.asarray(model.fe_params)[:p], np.asarray(model.cov_params())[:p, :p], float(model.scale),
+            float(np.asarray(model.cov_re)[0, 0]))
+
+
+def _summarize(beta, cov, sigma2, tau2, stats_, times, ci_level):
+    """Hücre ortalamalarından grup farkları, değişim farkları ve grup × zaman Wald testi."""
+    from scipy import stats
+    T = len(times)
+    z_crit = stats.norm.ppf(1 - (1 - ci_level) / 2)
+
+    def contrast(vector):
+        estimate = float(vector @ beta)
+        se = float(np.sqrt(max(vector @ cov @ vector, 0.0)))
+        p_value = float(2 * stats.norm.sf(abs(estimate / se))) if se > 0 else np.nan
+        return estimate, se, p_value
+
+    # Müdahale - kontrol farkı her zamanda (d_t) ve başlangıca göre değişim farkı (d_t - d_0)
+    differences = np.zeros((T, 2 * T))
+    differences[np.arange(T), T + np.arange(T)] = 1.0
+    differences[np.arange(T), np.arange(T)] = -1.0
+    contrasts = []
+    for t in range(T):
+        estimate, se, p_value = contrast(differences[t])
+        entry = {'time': times[t], 'difference': estimate, 'se': se, 'ci_low': estimate - z_crit * se, 'ci_high': estimate + z_crit * se,
+                 'p_value': p_value, 'change_difference': np.nan, 'change_se': np.nan, 'change_p': np.nan}
+        if t > 0:
+            entry['change_difference'], entry['change_se'], entry['change_p'] = contrast(differences[t] - differences[0])
+        contrasts.append(entry)
+
+    L = differences[1:] - differences[0]
+    effect = L @ beta
+    chi2 = float(effect @ np.linalg.solve(L @ cov @ L.T, effect))
+    means = beta.reshape(2, T)
+    return {
+        'times': list(times), 'n_participants': int(stats_['n_participants']), 'n_obs': int(stats_['N']),
+        'sigma2': sigma2, 'tau2': tau2, 'icc': tau2 / (tau2 + sigma2) if tau2 + sigma2 > 0 else np.nan,
+        'interaction': {'chi2': chi2, 'df': T - 1, 'p_value': float(stats.chi2.sf(chi2, T - 1))},
+        'means': {'kontrol': means[0].tolist(), 'mudahale': means[1].tolist()},
+        'contrasts': contrasts, 'error': None,
+    }
+
+
+def fit_group_time_model(series, group_codes, times, method='numpy', ci_level=0.95):
+    """Bir tekrarlı ölçüm için grup × zaman karma modeli (katılımcı başına rastgele sabit)."""
+    if method not in LONGITUDINAL_METHODS:
+        raise ValueError(f"Bilinmeyen karma model yöntemi: {method}. Geçerli değerler: {', '.join(LONGITUDINAL_METHODS)}")
+    stats_ = _pattern_stats(series, group_codes)
+    if (stats_['n_cells'] == 0).any():
+        return {'times': list(times), 'n_participants': int(stats_['n_participants']), 'n_obs': int(stats_['N']),
+                'error': "Her grup × zaman hücresinde en az bir gözlem olmalıdır."}
+    if stats_['N'] - 2 * series.n_times <= 0 or stats_['n_participants'] < 2:
+        return {'times': list(times), 'n_participants': int(stats_['n_participants']), 'n_obs': int(stats_['N']),
+                'error': "Karma model için yeterli gözlem yok."}
+    fit = _fit_statsmodels(series, group_codes) if method == 'statsmodels' else fit_random_intercept(stats_)
+    if method == 'verify':
+        beta, _, sigma2, tau2 = _fit_statsmodels(series, group_codes)
+        # cov_params() gözlenen Hessian'ın tersidir (farklı bir kestirici); kovaryans statsmodels'in
+        # varyans bileşenlerinden bu modülün kestiricisiyle yeniden kurulur
+        reference = (beta, _gls_covariance(stats_, sigma2, tau2), sigma2, tau2)
+        variance_scale = sigma2 + tau2  # τ² sınırda (≈ 0) olabileceğinden bileşenler toplam varyansa göre karşılaştırılır
+        for name, a, b in zip(('beta', 'kovaryans', 'sigma2', 'tau2'), fit, reference):
+            scale = variance_scale if name in ('sigma2', 'tau2') else max(np.max(np.abs(b)), 1e-12)
+            if not np.allclose(a, b, rtol=VERIFY_RTOL, atol=VERIFY_RTOL * scale):
+                raise RuntimeError(f"Karma model doğrulama hatası ({name}): numpy={a!r}, statsmodels={b!r}")
+    return _summarize(*fit, stats_, times, ci_level)
+
+
+def run_longitudinal_analysis(df, plan, config=None, long_table=None):
+    """Çalışma tanımındaki tüm tekrarlı ölçümler için grup × zaman karma modelleri.
+
+    config: DEFAULT_LONGITUDINAL_CONFIG anahtarlarından herhangi biri (eksikler varsayılanla doldurulur).
+    """
+    config = {**DEFAULT_LONGITUDINAL_CONFIG, **(config or {})}
+    long_table = long_table or get_long_table(df, plan)
+    intervention, control = plan.groups
+    group_values = df[plan.group_col].to_numpy(dtype=object)
+    group_codes = np.where(group_values == control, 0, np.where(group_values == intervention, 1, -1))
+    models = {}
+    for measure in plan.repeated_measures:
+        models[measure['name']] = fit_group_time_model(long_table.series(measure['columns']), group_codes, measure['times'],
+                                                       method=config['method'], ci_level=config['ci_level'])
+    return {'method': config['method'], 'ci_level': config['ci_level'], 'groups': {'mudahale': intervention, 'kontrol': control},
+            'models': models}
+
+
+def longitudinal_summary_rows(longitudinal):
+    """Zaman başına tek satır: müdahale - kontrol farkı ve başlangıca göre değişim farkı (tablo / PDF için)."""
+    rows = []
+    for name, model in longitudinal['models'].items():
+        if model.get('error'):
+            rows.append({'Ölçüm': name, 'Zaman': '-', 'Fark (M - K)': np.nan, 'GA alt': np.nan, 'GA üst': np.nan, 'p': np.nan,
+                         'Değişim farkı': np.nan, 'Değişim p': np.nan})
+            continue
+        for entry in model['contrasts']:
+            rows.append({'Ölçüm': name, 'Zaman': entry['time'], 'Fark (M - K)': entry['difference'], 'GA alt': entry['ci_low'],
+                         'GA üst': entry['ci_high'], 'p': entry['p_value'], 'Değişim farkı': entry['change_difference'],
+                         'Değişim p': entry['change_p']})
+    return rows
+
+
+def longitudinal_model_lines(longitudinal):
+    """Ölçüm başına tek cümlelik model özeti (grup × zaman testi ve varyans bileşenleri)."""
+    lines = []
+    for name, model in longitudinal['models'].items():
+        if model.get('error'):
+            lines.append(f"{name}: model kurulamadı ({model['error']})")
+            continue
+        test = model['interaction']
+        lines.append(f"{name}: grup × zaman ki-kare({test['df']}) = {test['chi2']:.2f}, p = {test['p_value']:.4f}; "
+                     f"n = {model['n_participants']} katılımcı / {model['n_obs']} gözlem, ICC = {model['icc']:.2f}")
+    return lines
@@ -0,0 +1,256 @@
+"""Simülasyona dayalı güç ve örneklem büyüklüğü planlayıcısı.
+
+Yüklenen pilot veriden parametreler kestirilir ve grup başına farklı n
+değerleri için binlerce sentetik çalışma üretilir:
+
+    * sayısal sütunlar (çalışma tanımının ölçüm ve kovaryantları): grup içi ortak kovaryans matrisli
+      çok değişkenli normal dağılım. Başlangıç (FAZ 1) sütunlarının ortalaması
+      randomizasyon gereği iki grupta eşittir; son-test sütunlarında pilotta
+      gözlenen grup farkı `effect_scale` ile ölçeklenerek kullanılır.
+    * kategorik sütunlar: pilotun (iki grup birlikte) düzey oranlarından
+      bağımsız çekilişler.
+
+Her sentetik çalışmaya gerçek analiz hattı uygulanır: FAZ 1 denklik testleri
+(`equivalence`), dinamik düzeltme (`record_faz1_results`) ve FAZ 2 ANCOVA
+(`fit_from_crossproducts_batch`). Böylece güç tahminleri, veriye dayalı kovaryant
+düzeltmesinin etkisini de içerir. Çalışmalar parti (batch) halinde dizi
+işlemleriyle üretilip test edilir; partiler istenirse bir süreç havuzunda
+paralel çalışır ve her parti tohumunu `SeedSequence.spawn` ile aldığından
+sonuçlar işçi sayısından bağımsızdır.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analysis import DEFAULT_PLAN, record_faz1_results
+from ancova_engine import fit_from_crossproducts_batch
+from equivalence import chi2_from_tables, welch_from_moments
+
+DEFAULT_POWER_CONFIG = {
+    'n_per_group': [30, 50, 75, 100, 150, 200], 'n_simulations': 1000, 'seed': 2209, 'alpha': 0.05,
+    'effect_scale': 1.0, 'batch_size': 200, 'n_jobs': 1,
+}
+TARGET_POWER = 0.80
+MIN_PILOT_PER_GROUP = 3
+
+
+def estimate_pilot_parameters(df, effect_scale=1.0, plan=None):
+    """Pilot veriden simülasyon parametreleri; iki grupta yeterli gözlem yoksa ValueError."""
+    plan = plan or DEFAULT_PLAN
+    group_col, groups, numeric_columns = plan.group_col, plan.groups, plan.numeric_columns
+    df = df[df[group_col].isin(groups)]
+    group_sizes = df[group_col].value_counts().reindex(groups, fill_value=0)
+    if (group_sizes < MIN_PILOT_PER_GROUP).any():
+        raise ValueError(f"Pilot veride her grupta en az {MIN_PILOT_PER_GROUP} katılımcı olmalıdır "
+                         f"(bulunan: {', '.join(f'{g}: {n}' for g, n in group_sizes.items())}).")
+
+    values = df[numeric_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    group_values = df[group_col].to_numpy()
+    group_means = np.vstack([np.nanmean(values[group_values == g], axis=0) for g in groups])
+    pooled_means = np.nanmean(values, axis=0)
+    if np.isnan(group_means).any():
+        empty = [col for col, ok in zip(numeric_columns, ~np.isnan(group_means).any(axis=0)) if not ok]
+        raise ValueError(f"Pilot veride şu sütunlar bir grupta tamamen boş: {', '.join(empty)}.")
+
+    is_baseline = np.isin(numeric_columns, list(plan.faz1_numeric_labels))
+    means = np.where(is_baseline, pooled_means, pooled_means + effect_scale * (group_means - pooled_means))
+
+    # Grup içi ortak kovaryans (eksik değerlerde ikili tam gözlemlerle); pozitif yarı tanımlı hale getirilir
+    centered = values - group_means[np.where(group_values == groups[0], 0, 1)]
+    cov = pd.DataFrame(centered).cov().to_numpy()
+    cov = np.where(np.isnan(cov), 0.0, cov)
+    evals, evecs = np.linalg.eigh((cov + cov.T) / 2)
+    evals = np.clip(evals, evals.max() * 1e-8, None)
+    cov = (evecs * evals) @ evecs.T
+
+    levels, probs = {}, {}
+    for col in plan.faz1_categoric_labels:
+        counts = df[col].dropna().astype(str).value_counts().sort_index()
+        if counts.empty:
+            raise ValueError(f"Pilot veride '{col}' sütunu tamamen boş.")
+        levels[col], probs[col] = list(counts.index), (counts / counts.sum()).to_numpy()
+
+    sd = np.sqrt(np.diag(cov))
+    effect_sizes = {key: float((means[0, j] - means[1, j]) / sd[j])
+                    for (key, _, _), j in zip(plan.hypothesis_tests, plan.outcome_idx)}
+    return {
+        'plan': plan, 'means': means, 'chol': np.linalg.cholesky(cov), 'levels': levels, 'probs': probs,
+        'pilot_n': {g: int(n) for g, n in group_sizes.items()}, 'effect_sizes': effect_sizes,
+    }
+
+
+def simulate_trials(params, n_per_group, size, rng):
+    """size adet çalışma: sayısallar (size, 2n, k), kategorik düzey kodları (size, 2n, c) ve grup kodu (2n,)."""
+    n_total = 2 * n_per_group
+    group_codes = np.repeat(np.arange(2), n_per_group)  # plan.groups sırası: 0 = müdahale, 1 = kontrol
+    noise = rng.standard_normal((size, n_total, params['means'].shape[1]))
+    numeric = params['means'][group_codes] + noise @ params['chol'].T
+    codes = np.stack([
+        np.searchsorted(np.cumsum(params['probs'][col])[:-1], rng.random((size, n_total)), side='right')
+        for col in params['levels']
+    ], axis=2)
+    return numeric, codes, group_codes
+
+
+def faz1_p_values(numeric, codes, group_codes, params):
+    """Tüm çalışmaların FAZ 1 p-değerleri: Welch (size, k_sayısal) ve ki-kare (size, k_kategorik)."""
+    size = numeric.shape[0]
+    baseline_idx = params['plan'].faz1_numeric_idx
+    blocks = [numeric[:, group_codes == g][:, :, baseline_idx] for g in range(2)]
+    counts = np.array([[block.shape[1]] for block in blocks], dtype=float) * np.ones((1, size * len(baseline_idx)))
+    means = np.stack([block.mean(axis=1).ravel() for block in blocks])
+    variances = np.stack([block.var(axis=1, ddof=1).ravel() for block in blocks])
+    p_numeric = welch_from_moments(counts, means, variances).reshape(size, len(baseline_idx))
+
+    # Tüm çalışmaların tüm çapraz tabloları tek yığında: (size × c, grup, düzey)
+    n_levels = max(len(levels) for levels in params['levels'].values())
+    one_hot = codes[..., None] == np.arange(n_levels)
+    tables = np.stack([one_hot[:, group_codes == g].sum(axis=1) for g in range(2)], axis=2)
+    p_categoric = chi2_from_tables(tables.reshape(-1, 2, n_levels)).reshape(size, codes.shape[2])
+    return p_numeric, p_categoric
+
+
+def _covariate_columns(numeric, codes, params, covariates):
+    """Düzeltme kovaryantlarının (size, 2n, ·) tasarım blokları (kategorikler referans düzeyi düşürülmüş kukla)."""
+    categoric_cols = list(params['levels'])
+    blocks = []
+    for col, is_categorical in covariates:
+        if is_categorical:
+            j = categoric_cols.index(col)
+            blocks.append((codes[:, :, j, None] == np.arange(1, len(params['levels'][col]))).astype(float))
+        else:
+            j = params['plan'].numeric_index[col]
+            blocks.append(numeric[:, :, j:j + 1])
+    return blocks
+
+
+def faz2_p_values(numeric, codes, group_codes, params, covariates):
+    """Aynı düzeltme kümesini paylaşan çalışmalar için FAZ 2 p-değerleri (size, hipotez sayısı)."""
+    size, n_total, _ = numeric.shape
+    G = np.broadcast_to((group_codes == 0).astype(float)[None, :, None], (size, n_total, 1))  # referans: Kontrol
+    intercept = np.ones((size, n_total, 1))
+    covariate_blocks = _covariate_columns(numeric, codes, params, covariates)
+    plan = params['plan']
+    p_values = np.empty((size, len(plan.hypothesis_tests)))
+    for h, (outcome_j, baseline_j) in enumerate(zip(plan.outcome_idx, plan.baseline_idx)):
+        y = numeric[:, :, outcome_j]
+        X = np.concatenate([G, intercept, *covariate_blocks, numeric[:, :, [baseline_j]]], axis=2)
+        xtx = np.matmul(X.transpose(0, 2, 1), X)
+        xty = np.einsum('bnp,bn->bp', X, y)
+        yty = np.einsum('bn,bn->b', y, y)
+        p_values[:, h] = fit_from_crossproducts_batch(xtx, xty, yty, n_total, 1)['p_value']
+    return p_values
+
+
+def simulate_power_batch(task):
+    """Süreç görevi: (parametreler, n, parti boyutu, tohum, alfa) -> anlamlılık sayıları."""
+    params, n_per_group, size, seed, alpha = task
+    numeric, codes, group_codes = simulate_trials(params, n_per_group, size, np.random.default_rng(seed))
+    p_numeric, p_categoric = faz1_p_values(numeric, codes, group_codes, params)
+
+    # Dinamik düzeltme, analiz hattındaki fonksiyonla çalışma başına belirlenir; aynı kümeyi seçenler birlikte test edilir
+    plan = params['plan']
+    numeric_labels, categoric_labels = list(plan.faz1_numeric_labels.values()), list(plan.faz1_categoric_labels.values())
+    by_covariates = {}
+    for b in range(size):
+        covariates = record_faz1_results({}, dict(zip(numeric_labels, p_numeric[b])), dict(zip(categoric_labels, p_categoric[b])), plan)
+        by_covariates.setdefault(tuple(covariates), []).append(b)
+
+    p_faz2 = np.empty((size, len(plan.hypothesis_tests)))
+    for covariates, rows in by_covariates.items():
+        p_faz2[rows] = faz2_p_values(numeric[rows], codes[rows], group_codes, params, covariates)
+    significant = p_faz2 < alpha
+    return {
+        'significant': significant.sum(axis=0), 'all_significant': int(significant.all(axis=1).sum()),
+        'corrected': int(size - len(by_covariates.get((), []))), 'size': size,
+    }
+
+
+def run_power_analysis(df_pilot, config=None, plan=None, progress=None):
+    """Grup başına her n için hipotez bazında güç (anlamlı çıkan çalışma oranı); hata durumunda {'error': ...}.
+
+    progress: isteğe bağlı `progress(oran, mesaj)` geri çağırımı (her parti bittiğinde; JobManager işleri için).
+    """
+    config = {**DEFAULT_POWER_CONFIG, **(config or {})}
+    plan = plan or DEFAULT_PLAN
+    try:
+        params = estimate_pilot_parameters(df_pilot, config['effect_scale'], plan)
+    except ValueError as e:
+        return {'error': f"HATA: {e}"}
+
+    n_values = sorted({int(n) for n in config['n_per_group'] if int(n) >= 5})
+    if not n_values:
+        return {'error': "HATA: Grup başına örneklem büyüklüğü en az 5 olmalıdır."}
+    n_sims, batch = int(config['n_simulations']), max(1, int(config['batch_size']))
+    sizes = [batch] * (n_sims // batch) + ([n_sims % batch] if n_sims % batch else [])
+    tasks = []
+    for n, n_seed in zip(n_values, np.random.SeedSequence(config['seed']).spawn(len(n_values))):
+        tasks += [(params, n, size, seed, config['alpha']) for size, seed in zip(sizes, n_seed.spawn(len(sizes)))]
+
+    def collect(results):
+        parts = []
+        for part in results:
+            parts.append(part)
+            if progress is not None:
+                progress(len(parts) / len(tasks), f"Simülasyon partileri: {len(parts)}/{len(tasks)}")
+        return parts
+
+    n_jobs = max(1, int(config['n_jobs'] or 1))
+    if n_jobs > 1 and len(tasks) > 1:
+        # 'spawn': havuz çok iş parçacıklı süreçlerden (Streamlit, iş havuzu) açılır; fork, başka bir iş
+        # parçacığının tuttuğu kilitleri (import, logging) kopyalayıp işçiyi kilitleyebilir
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks)), mp_context=multiprocessing.get_context('spawn')) as executor:
+            parts = collect(executor.map(simulate_power_batch, tasks))
+    else:
+        parts = collect(simulate_power_batch(task) for task in tasks)
+
+    power = {key: [] for key, _, _ in plan.hypothesis_tests}
+    all_power, correction_rate = [], []
+    for i in range(len(n_values)):
+        chunk = parts[i * len(sizes):(i + 1) * len(sizes)]
+        total = sum(part['size'] for part in chunk)
+        significant = sum(part['significant'] for part in chunk)
+        for h, (key, _, _) in enumerate(plan.hypothesis_tests):
+            power[key].append(float(significant[h] / total))
+        all_power.append(sum(part['all_significant'] for part in chunk) / total)
+        correction_rate.append(sum(part['corrected'] for part in chunk) / total)
+
+    return {
+        'n_per_group': n_values, 'n_simulations': n_sims, 'seed': config['seed'], 'alpha': config['alpha'],
+        'effect_scale': config['effect_scale'], 'pilot_n': params['pilot_n'], 'effect_sizes': params['effect_sizes'],
+        'power': power, 'all_power': all_power, 'correction_rate': correction_rate, 'titles': plan.p_value_titles,
+    }
+
+
+def required_n(power_results, key, target=TARGET_POWER):
+    """Hedef güce ulaşılan en küçük grup başı n (denenen değerler içinde; ulaşılamazsa None)."""
+    for n, value in zip(power_results['n_per_group'], power_results['power'][key]):
+        if value >= target:
+            return n
+    return None
+
+
+def power_table(power_results):
+    """Güç eğrilerinin tablo hali (satır: grup başı n)."""
+    table = pd.DataFrame({'Grup başı n': power_results['n_per_group'], 'Toplam N': [2 * n for n in power_results['n_per_group']]})
+    for key, title in power_results['titles'].items():
+        table[title.removesuffix(' p')] = power_results['power'][key]
+    table['Tümü anlamlı'] = power_results['all_power']
+    table['Düzeltme uygulanan'] = power_results['correction_rate']
+    return table
+
+
+def power_curve_chart(power_results):
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for key, title in power_results['titles'].items():
+        fig.add_trace(go.Scatter(x=power_results['n_per_group'], y=power_results['power'][key], mode='lines+markers',
+                                 name=title.removesuffix(' p')))
+    fig.add_hline(y=TARGET_POWER, line_dash='dash', line_color='gray', annotation_text=f"%{TARGET_POWER * 100:.0f} güç")
+    fig.update_layout(
+        title=f"Simülasyon Tabanlı Güç Eğrileri ({power_results['n_simulations']} simülasyon, α = {power_results['alpha']})",
+        xaxis_title="Grup başına örneklem büyüklüğü (n)", yaxis_title="Güç", yaxis_range=[0, 1.02],
+    )
+    return fig
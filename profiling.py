@@ -0,0 +1,220 @@
+"""Aşama bazlı performans ölçümü (izleme / trace).
+
+Analiz hattının aşamaları (okuma, temizleme, FAZ 1, FAZ 2, grafikler, PDF
+bölümleri ...) `stage(ad, rows=...)` bloklarıyla sarılır. Blok, o anki iş
+parçacığında açık bir `StageTrace` varsa duvar saati süresini, CPU süresini,
+(istenirse) tepe belleği ve satır sayısını kaydeder; açık bir iz yoksa hiçbir
+şey yapmaz, bu yüzden komut satırı ve kıyaslama araçlarında maliyetsizdir.
+
+    with StageTrace('analiz', track_memory=True) as trace:
+        ...
+        with stage('faz2', rows=len(df)):
+            ...
+    trace.summary_rows()      # arayüz tablosu
+    trace.to_chrome_trace()   # chrome://tracing / Perfetto'da açılabilir JSON
+
+Notlar:
+* CPU süresi iş parçacığına özgüdür (time.thread_time); süreç havuzlarında
+  (çoklu atama, yeniden örnekleme, n_jobs > 1) harcanan CPU sayılmaz.
+* Bellek, tracemalloc ile Python ayırmaları üzerinden ölçülür ve süreç
+  geneldir; aynı anda çalışan başka işlerin ayırmaları da tepeye karışabilir.
+  tracemalloc ayırmaları belirgin biçimde yavaşlattığından isteğe bağlıdır.
+* profiler='cprofile' veya 'pyinstrument' ile izin yalnızca açıldığı iş
+  parçacığı profillenir (tek seferlik teşhis çalıştırmaları için).
+"""
+import contextlib
+import contextvars
+import io
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+
+PROFILERS = ('cprofile', 'pyinstrument')
+PROFILE_TOP_FUNCTIONS = 40
+
+logger = logging.getLogger('ebelik.profil')
+_current_trace = contextvars.ContextVar('ebelik_current_trace', default=None)
+_logging_configured = False
+_logging_lock = threading.Lock()
+
+
+class StageTrace:
+    """Bir çalıştırmanın (analiz işi, PDF, dashboard ...) aşama kayıtları."""
+
+    def __init__(self, name, track_memory=False, profiler=None):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Bilinmeyen profil aracı: {profiler} (seçenekler: {', '.join(PROFILERS)})")
+        self.name = name
+        self.id = uuid.uuid4().hex[:12]
+        self.track_memory = track_memory
+        self.profiler = profiler
+        self.stages = []
+        self.profile_text = None
+        self.profile_file = None  # (dosya adı, baytlar): cProfile için .prof, pyinstrument için .html
+        self.started_at = None
+        self.wall_sn = None
+        self._t0 = None
+        self._stack = []
+        self._token = None
+        self._owns_tracemalloc = False
+        self._profiler_instance = None
+
+    # --- Bağlam yöneticisi ---
+    def __enter__(self):
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        self._token = _current_trace.set(self)
+        self._start_profiler()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop_profiler()
+        _current_trace.reset(self._token)
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        self.wall_sn = round(time.perf_counter() - self._t0, 4)
+        logger.info(json.dumps({
+            'olay': 'iz', 'iz': self.name, 'iz_id': self.id, 'sure_sn': self.wall_sn, 'asama_sayisi': len(self.stages),
+            'hata': f"{exc_type.__name__}: {exc}" if exc_type else None,
+            'en_yavas': sorted(({'asama': s['asama'], 'sure_sn': s['sure_sn']} for s in self.stages if s['derinlik'] == 0),
+                               key=lambda s: -s['sure_sn'])[:5],
+        }, ensure_ascii=False))
+        return False
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        record = {'asama': name, 'derinlik': len(self._stack), 'baslangic_sn': round(time.perf_counter() - self._t0, 6),
+                  'sure_sn': None, 'cpu_sn': None, 'tepe_bellek_mb': None, 'satir': rows, 'hata': None,
+                  'tid': threading.get_ident()}
+        memory = self.track_memory and tracemalloc.is_tracing()
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # Üst aşamanın o ana kadarki tepesi, alt aşama tepe sayacını sıfırlamadan önce aktarılır
+                self._stack[-1]['_peak'] = max(self._stack[-1]['_peak'], peak)
+            tracemalloc.reset_peak()
+            record['_start_mem'] = record['_peak'] = current
+        self._stack.append(record)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        except BaseException as e:
+            record['hata'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record['sure_sn'] = round(time.perf_counter() - wall, 6)
+            record['cpu_sn'] = round(time.thread_time() - cpu, 6)
+            self._stack.pop()
+            if memory:
+                peak = max(record.pop('_peak'), tracemalloc.get_traced_memory()[1])
+                record['tepe_bellek_mb'] = round((peak - record.pop('_start_mem')) / 2 ** 20, 3)
+                if self._stack:
+                    self._stack[-1]['_peak'] = max(self._stack[-1]['_peak'], peak)
+            self.stages.append(record)
+            logger.debug(json.dumps({'olay': 'asama', 'iz': self.name, 'iz_id': self.id,
+                                     **{key: value for key, value in record.items() if key != 'tid'}}, ensure_ascii=False))
+
+    # --- Profil araçları (opsiyonel) ---
+    def _start_profiler(self):
+        if self.profiler == 'cprofile':
+            import cProfile
+            self._profiler_instance = cProfile.Profile()
+            self._profiler_instance.enable()
+        elif self.profiler == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                self.profile_text = "pyinstrument kurulu değil (pip install pyinstrument); profil alınmadı."
+                return
+            self._profiler_instance = Profiler()
+            self._profiler_instance.start()
+
+    def _stop_profiler(self):
+        instance, self._profiler_instance = self._profiler_instance, None
+        if instance is None:
+            return
+        if self.profiler == 'cprofile':
+            import marshal
+            import pstats
+            instance.disable()
+            out = io.StringIO()
+            pstats.Stats(instance, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+            self.profile_text = out.getvalue()
+            instance.create_stats()
+            # pstats.Stats.dump_stats ile aynı biçim: snakeviz / pstats ile açılabilir
+            self.profile_file = (f"profil_{self.name}_{self.id}.prof", marshal.dumps(instance.stats))
+        else:
+            instance.stop()
+            self.profile_text = instance.output_text(unicode=True, color=False)
+            self.profile_file = (f"profil_{self.name}_{self.id}.html", instance.output_html().encode('utf-8'))
+
+    # --- Dışa aktarma ---
+    def summary_rows(self):
+        """Aşamalar başlangıç sırasıyla; alt aşamalar girintili adla (arayüz tablosu için)."""
+        return [
+            {'Aşama': '  ' * s['derinlik'] + s['asama'], 'Süre (sn)': s['sure_sn'], 'CPU (sn)': s['cpu_sn'],
+             'Tepe bellek (MB)': s['tepe_bellek_mb'], 'Satır': s['satir'], 'Hata': s['hata']}
+            for s in sorted(self.stages, key=lambda s: s['baslangic_sn'])
+        ]
+
+    def to_dict(self):
+        return {'iz': self.name, 'iz_id': self.id, 'baslangic': self.started_at, 'sure_sn': self.wall_sn,
+                'bellek_olcumu': self.track_memory, 'profil_araci': self.profiler,
+                'asamalar': sorted(self.stages, key=lambda s: s['baslangic_sn'])}
+
+    def to_chrome_trace(self):
+        """Chrome izleme biçimi (trace event 'X' olayları); chrome://tracing veya ui.perfetto.dev ile açılır."""
+        pid = os.getpid()
+        events = [
+            {'name': s['asama'], 'cat': self.name, 'ph': 'X', 'pid': pid, 'tid': s['tid'],
+             'ts': round((self.started_at + s['baslangic_sn']) * 1e6), 'dur': round(s['sure_sn'] * 1e6),
+             'args': {key: s[key] for key in ('cpu_sn', 'tepe_bellek_mb', 'satir', 'hata') if s[key] is not None}}
+            for s in self.stages
+        ]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'iz': self.name, 'iz_id': self.id}}
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextlib.contextmanager
+def stage(name, rows=None):
+    """Açık bir iz varsa bloğu onun aşaması olarak kaydeder; yoksa doğrudan çalıştırır."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+    else:
+        with trace.stage(name, rows=rows) as record:
+            yield record
+
+
+def traces_to_chrome(traces):
+    """Birden çok izi tek bir Chrome izleme dosyasında birleştirir."""
+    return {'traceEvents': [event for trace in traces for event in trace.to_chrome_trace()['traceEvents']], 'displayTimeUnit': 'ms'}
+
+
+def configure_logging(level=None):
+    """'ebelik' günlüklerini stderr'e satır başına bir JSON olarak yazar (EBELIK_LOG_LEVEL, varsayılan INFO).
+
+    İz özetleri INFO, tek tek aşamalar DEBUG düzeyindedir. Birden çok kez çağrılabilir.
+    """
+    global _logging_configured
+    with _logging_lock:
+        root = logging.getLogger('ebelik')
+        root.setLevel((level or os.environ.get('EBELIK_LOG_LEVEL', 'INFO')).upper())
+        if not _logging_configured:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(levelname)s %(message)s'))
+            root.addHandler(handler)
+            root.propagate = False
+            _logging_configured = True
+    return root
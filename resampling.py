@@ -0,0 +1,126 @@
+"""Yeniden örnekleme (permütasyon + bootstrap) çıkarımı.
+
+FAZ 2 modellerinin her biri için grup etkisine ait:
+    * permütasyon p-değeri: grup etiketleri binlerce kez karıştırılır ve
+      'grup' teriminin açıkladığı kareler toplamı, W = [sabit, düzeltmeler,
+      ön_test] bloğundan arındırılmış sonuç üzerinde yığın matris işlemleriyle
+      hesaplanır (her permütasyon için ayrı model kurulmaz);
+    * bootstrap güven aralığı: satırlar yerine konularak yeniden örneklenir,
+      her örneklemin X'X ve X'y matrisleri ağırlık (tekrar sayısı) matrisi
+      üzerinden toplu olarak kurulur ve katsayılar yığın halinde çözülür.
+
+Bellek, `chunk_size` ile sınırlandırılır; parçalar isteğe bağlı olarak
+iş parçacıklarında (NumPy/BLAS GIL'i bırakır) paralel çalıştırılır. Her parça
+kendi tohumunu `SeedSequence.spawn` ile aldığından sonuçlar iş parçacığı
+sayısından bağımsız ve tekrarlanabilirdir.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ancova_engine import AncovaDesign, _orthonormal_basis
+
+DEFAULT_RESAMPLING_CONFIG = {'n_permutations': 2000, 'n_bootstrap': 2000, 'seed': 2209, 'ci_level': 0.95, 'n_jobs': 1}
+MAX_CHUNK_ELEMENTS = 4_000_000  # bir parçadaki (yeniden örnekleme × satır × sütun) üst sınırı
+
+
+def _chunk_sizes(total, chunk_size):
+    sizes = [chunk_size] * (total // chunk_size)
+    if total % chunk_size:
+        sizes.append(total % chunk_size)
+    return sizes
+
+
+def _run_chunks(worker, total, chunk_size, seed_sequence, n_jobs):
+    sizes = _chunk_sizes(total, chunk_size)
+    seeds = seed_sequence.spawn(len(sizes))
+    tasks = list(zip(sizes, seeds))
+    if n_jobs and n_jobs > 1 and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            parts = list(executor.map(lambda task: worker(*task), tasks))
+    else:
+        parts = [worker(*task) for task in tasks]
+    return np.concatenate(parts) if parts else np.array([])
+
+
+def _explained_ss(G_r, y_r):
+    """Grup sütunlarının (W'den arındırılmış) y üzerinde açıkladığı kareler toplamı; G_r: (B, n, g)."""
+    rhs = np.einsum('bni,n->bi', G_r, y_r)
+    gram = np.matmul(G_r.transpose(0, 2, 1), G_r)
+    return np.einsum('bi,bij,bj->b', rhs, np.linalg.pinv(gram, hermitian=True), rhs)
+
+
+def permutation_test(W, G, y, n_permutations, seed_sequence, chunk_size=None, n_jobs=1):
+    """Grup etiketlerinin permütasyonu ile 'grup' terimi için p-değeri."""
+    n, g = G.shape
+    # Pivotsuz QR rank eksikliğinde yanlış sütunu atabilir; _fit_masked ile aynı SVD tabanı kullanılır
+    Q, _ = _orthonormal_basis(W)
+    y_r = y - Q @ (Q.T @ y)
+
+    def residualize(G_batch):
+        B = G_batch.shape[0]
+        flat = G_batch.transpose(1, 0, 2).reshape(n, B * g)
+        flat = flat - Q @ (Q.T @ flat)
+        return flat.reshape(n, B, g).transpose(1, 0, 2)
+
+    observed = _explained_ss(residualize(G[None]), y_r)[0]
+    chunk_size = chunk_size or max(1, MAX_CHUNK_ELEMENTS // (n * max(g, 1)))
+
+    def worker(size, seed):
+        rng = np.random.default_rng(seed)
+        perms = rng.permuted(np.tile(np.arange(n), (size, 1)), axis=1)
+        return _explained_ss(residualize(G[perms]), y_r)
+
+    null_ss = _run_chunks(worker, n_permutations, chunk_size, seed_sequence, n_jobs)
+    tol = 1e-10 * max(abs(observed), 1.0)
+    return float((1 + np.count_nonzero(null_ss >= observed - tol)) / (n_permutations + 1))
+
+
+def bootstrap_group_effect(W, G, y, n_bootstrap, seed_sequence, chunk_size=None, n_jobs=1):
+    """Satır bootstrap'i ile grup katsayısının dağılımı (yalnızca tek serbestlik dereceli grup için)."""
+    X = np.column_stack([G, W])
+    n, p = X.shape
+    chunk_size = chunk_size or max(1, MAX_CHUNK_ELEMENTS // (n * p))
+
+    def worker(size, seed):
+        rng = np.random.default_rng(seed)
+        draws = rng.integers(0, n, size=(size, n))
+        weights = np.bincount((draws + np.arange(size)[:, None] * n).ravel(), minlength=size * n).reshape(size, n)
+        weighted = weights[:, :, None] * X[None]
+        xtx = np.matmul(weighted.transpose(0, 2, 1), X)
+        xty = np.matmul(weighted.transpose(0, 2, 1), y)
+        beta = np.einsum('bij,bj->bi', np.linalg.pinv(xtx, hermitian=True), xty)
+        return beta[:, 0]
+
+    return _run_chunks(worker, n_bootstrap, chunk_size, seed_sequence, n_jobs)
+
+
+def run_resampling_inference(df, pairs, group_col='grup', covariates=(), config=None):
+    """Tüm hipotez modelleri için permütasyon p-değeri ve bootstrap güven aralığı.
+
+    config: DEFAULT_RESAMPLING_CONFIG anahtarlarından herhangi biri (eksikler varsayılanla doldurulur).
+    """
+    config = {**DEFAULT_RESAMPLING_CONFIG, **(config or {})}
+    design = AncovaDesign(df, group_col, covariates)
+    root = np.random.SeedSequence(config['seed'])
+    model_seeds = root.spawn(len(pairs))
+    alpha = 1 - config['ci_level']
+
+    models = {}
+    for (key, outcome, baseline), model_seed in zip(pairs, model_seeds):
+        W, G, y = design.model_arrays(outcome, baseline)
+        entry = {'perm_p': np.nan, 'boot_ci_low': np.nan, 'boot_ci_high': np.nan, 'boot_se': np.nan}
+        perm_seed, boot_seed = model_seed.spawn(2)
+        if G.shape[1] >= 1 and len(y) > W.shape[1] + G.shape[1] and G.any(axis=0).all():
+            if config['n_permutations'] > 0:
+                entry['perm_p'] = permutation_test(W, G, y, config['n_permutations'], perm_seed, n_jobs=config['n_jobs'])
+            if config['n_bootstrap'] > 0 and G.shape[1] == 1:
+                boot = bootstrap_group_effect(W, G, y, config['n_bootstrap'], boot_seed, n_jobs=config['n_jobs'])
+                entry['boot_ci_low'], entry['boot_ci_high'] = (float(v) for v in np.quantile(boot, [alpha / 2, 1 - alpha / 2]))
+                entry['boot_se'] = float(np.std(boot, ddof=1))
+        models[key] = entry
+
+    return {
+        'n_permutations': int(config['n_permutations']), 'n_bootstrap': int(config['n_bootstrap']),
+        'seed': config['seed'], 'ci_level': config['ci_level'], 'models': models,
+    }
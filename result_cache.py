@@ -0,0 +1,157 @@
+"""İçerik-özetli (content-hash) sonuç önbelleği.
+
+Temizlenmiş veri seti + analiz ayarlarından bir anahtar üretilir; analiz
+sonuçları, Plotly grafik JSON'ları ve PNG çıktıları bu anahtar altında hem
+bellekte hem de diskte saklanır. Önbellek tüm Streamlit oturumları arasında
+paylaşılır ve LRU + boyut sınırı ile temizlenir.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_CACHE_DIR = os.environ.get(
+    'EBELIK_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.ebelik_cache')
+)
+DEFAULT_MAX_MEMORY_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+
+def make_cache_key(df, config, namespace='analysis'):
+    """Veri setinin içeriği (sütunlar, tipler, değerler) ve ayarlardan kararlı bir anahtar üretir."""
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_FORMAT_VERSION}|{namespace}|".encode())
+    h.update(json.dumps(config, sort_keys=True, default=str).encode())
+    h.update(json.dumps([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return f"{namespace}:{h.hexdigest()}"
+
+
+def make_bytes_key(data, namespace):
+    """Ham bayt dizisi (ör. grafik JSON'u) için anahtar üretir."""
+    if isinstance(data, str):
+        data = data.encode()
+    return f"{namespace}:{hashlib.sha256(data).hexdigest()}"
+
+
+class ResultCache:
+    """Bellek + disk katmanlı, iş parçacığı güvenli LRU önbellek.
+
+    Değerler pickle edilerek saklanır; böylece boyut hesabı kesindir ve her
+    `get` çağrısı oturumlar arasında paylaşılmayan taze bir kopya döndürür.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    # --- Yardımcılar ---
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key.replace(':', '_') + '.pkl')
+
+    def _remember(self, key, blob):
+        if len(blob) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = blob
+        self._memory_bytes += len(blob)
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, old_blob = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_blob)
+
+    def _evict_disk(self):
+        try:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.pkl'):
+                    path = os.path.join(self.cache_dir, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    # --- Genel API ---
+    def get(self, key, default=None):
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+        if blob is None and self.cache_dir:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    blob = f.read()
+                os.utime(path)  # disk LRU sırası için erişim zamanını güncelle
+            except OSError:
+                return default
+            with self._lock:
+                self._remember(key, blob)
+        if blob is None:
+            return default
+        try:
+            return pickle.loads(blob)
+        except Exception:
+            self.delete(key)
+            return default
+
+    def set(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remember(key, blob)
+        if self.cache_dir and len(blob) <= self.max_disk_bytes:
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(blob)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                return
+            self._evict_disk()
+
+    def delete(self, key):
+        with self._lock:
+            blob = self._memory.pop(key, None)
+            if blob is not None:
+                self._memory_bytes -= len(blob)
+        if self.cache_dir:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._memory:
+                return True
+        return bool(self.cache_dir) and os.path.exists(self._path(key))
+
+    # --- PNG çıktıları (grafik JSON özetine göre) ---
+    def get_png(self, fig_json):
+        return self.get(make_bytes_key(fig_json, 'png'))
+
+    def set_png(self, fig_json, png_bytes):
+        self.set(make_bytes_key(fig_json, 'png'), png_bytes)
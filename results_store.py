@@ -0,0 +1,216 @@
+"""Kalıcı sonuç deposu (SQLite).
+
+Her analiz çalıştırması; çalışma adı, merkez (çok merkezli analizde), tarih,
+girdi özeti (önbellek anahtarı), ayarlar, FAZ 1 / FAZ 2 istatistikleri,
+düzeltme formülü ve üretilen dosyaların (JSON / PDF) yollarıyla birlikte
+`runs` tablosuna yazılır. Çalışma, merkez ve tarih sütunları indekslidir;
+geçmiş bir raporun tam sonuç sözlüğü `results_json` sütunundan yeniden
+hesaplama yapılmadan okunur.
+
+Arayüz (iş parçacıkları) ve toplu analiz (süreçler) aynı dosyaya
+yazabildiğinden her işlem kendi bağlantısını açar; WAL kipi okuyucuların
+yazarları beklemesini önler.
+"""
+import contextlib
+import datetime
+import json
+import os
+import shutil
+import sqlite3
+import threading
+
+from analysis import HYPOTHESIS_TESTS, results_to_json, to_json_safe
+
+STORE_FORMAT_VERSION = 1
+DEFAULT_STORE_DIR = os.environ.get(
+    'EBELIK_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.ebelik_sonuclar')
+)
+# İndeksli p-değeri sütunları varsayılan protokolün hipotezleridir; başka çalışma tanımlarıyla
+# yapılan analizlerde bu sütunlar boş kalır, tüm p-değerleri results_json içinde saklanır.
+P_VALUE_COLUMNS = [key for key, _, _ in HYPOTHESIS_TESTS]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    parent_id INTEGER REFERENCES runs(id) ON DELETE CASCADE,
+    created_at TEXT NOT NULL,
+    study TEXT NOT NULL,
+    site TEXT,
+    source TEXT NOT NULL,
+    input_hash TEXT,
+    config_json TEXT,
+    n_rows INTEGER,
+    faz1_is_denk INTEGER,
+    failed_vars_json TEXT,
+    correction TEXT,
+    {', '.join(f'{col} REAL' for col in P_VALUE_COLUMNS)},
+    final_report_title TEXT,
+    json_path TEXT,
+    pdf_path TEXT,
+    results_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_study_date ON runs(study, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_site_date ON runs(site, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_date ON runs(created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_input_hash ON runs(input_hash);
+PRAGMA user_version = {STORE_FORMAT_VERSION};
+"""
+
+# Listeleme sorgularında dönen sütunlar (tam sonuç sözlüğü hariç)
+SUMMARY_COLUMNS = ['id', 'parent_id', 'created_at', 'study', 'site', 'source', 'input_hash', 'n_rows', 'faz1_is_denk',
+                   'failed_vars_json', 'correction', *P_VALUE_COLUMNS, 'final_report_title', 'json_path', 'pdf_path']
+
+
+class ResultsStore:
+    """Analiz çalıştırmalarının kalıcı kaydı ve indeksli sorgusu."""
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        self.path = os.path.join(store_dir, 'sonuclar.sqlite')
+        self.artifact_dir = os.path.join(store_dir, 'raporlar')
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Tek işlemlik bağlantı: blok hatasız biterse kaydedilir, her durumda kapatılır."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Yazma ---
+    def record_run(self, study, results, input_hash=None, config=None, n_rows=None, source='arayuz',
+                   json_path=None, pdf_path=None, created_at=None):
+        """Bir analiz çalıştırmasını (ve varsa merkez bazlı alt sonuçlarını) kaydeder; kayıt kimliğini döndürür."""
+        created_at = created_at or datetime.datetime.now().isoformat(timespec='seconds')
+        with self._connect() as conn:
+            run_id = self._insert(conn, None, created_at, study, None, source, input_hash, config, n_rows, results, json_path, pdf_path)
+            for site, entry in (results.get('strata') or {}).get('sites', {}).items():
+                self._insert(conn, run_id, created_at, study, site, source, input_hash, config, entry['n'], entry['results'], None, None)
+        return run_id
+
+    def _insert(self, conn, parent_id, created_at, study, site, source, input_hash, config, n_rows, results, json_path, pdf_path):
+        # Merkez bazlı sonuçlar üst kaydın results_json'unda zaten bulunur; alt kayıtlarda yinelenmez
+        stored = {key: value for key, value in results.items() if key != 'strata'} if parent_id is not None else results
+        row = {
+            'parent_id': parent_id, 'created_at': created_at, 'study': study, 'site': site, 'source': source,
+            'input_hash': input_hash, 'config_json': json.dumps(config, sort_keys=True, default=str) if config is not None else None,
+            'n_rows': n_rows, 'faz1_is_denk': results.get('faz1_is_denk'),
+            'failed_vars_json': json.dumps(results.get('faz1_failed_vars_display_names') or [], ensure_ascii=False),
+            'correction': results.get('correction_applied'),
+            **{col: results.get(col) for col in P_VALUE_COLUMNS},
+            'final_report_title': results.get('final_report_title'), 'json_path': json_path, 'pdf_path': pdf_path,
+            'results_json': results_to_json(stored),
+        }
+        row = to_json_safe(row)  # NumPy sayıları / NaN -> SQLite'ın kabul ettiği türler / NULL
+        cursor = conn.execute(
+            f"INSERT INTO runs ({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})", list(row.values())
+        )
+        return cursor.lastrowid
+
+    def save_artifact(self, run_id, data, kind='pdf'):
+        """Rapor dosyasını depo klasörüne yazar ve yolunu kayda ekler (kind: 'pdf' veya 'json').
+
+        data: bayt dizisi veya ikili dosya nesnesi (ör. create_pdf_report_file; parça parça kopyalanır).
+        """
+        path = os.path.join(self.artifact_dir, f"analiz_{run_id}.{kind}")
+        with open(path, 'wb') as f:
+            if hasattr(data, 'read'):
+                data.seek(0)
+                shutil.copyfileobj(data, f)
+            else:
+                f.write(data)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE runs SET {kind}_path = ? WHERE id = ?", (path, run_id))
+        return path
+
+    # --- Okuma ---
+    def query_runs(self, study=None, site=None, since=None, until=None, include_sites=False, limit=500):
+        """Filtrelere uyan çalıştırmaların özetleri (en yeni önce). since / until: 'YYYY-AA-GG' veya ISO tarih."""
+        clauses, params = [], []
+        if study:
+            clauses.append("study = ?"); params.append(study)
+        if site:
+            clauses.append("site = ?"); params.append(site)
+        elif not include_sites:
+            clauses.append("parent_id IS NULL")
+        if since:
+            clauses.append("created_at >= ?"); params.append(str(since))
+        if until:
+            # Yalnızca tarih verilmişse o günün tamamı dahil edilir
+            until = str(until)
+            if len(until) == 10:
+                until = (datetime.date.fromisoformat(until) + datetime.timedelta(days=1)).isoformat()
+            clauses.append("created_at < ?"); params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM runs {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+                [*params, int(limit)]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def studies(self):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT study FROM runs ORDER BY study")]
+
+    def sites(self, study=None):
+        query = "SELECT DISTINCT site FROM runs WHERE site IS NOT NULL" + (" AND study = ?" if study else "") + " ORDER BY site"
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(query, [study] if study else [])]
+
+    def load_results(self, run_id):
+        """Kaydedilmiş tam sonuç sözlüğü (bulunamazsa None); JSON'da null yazılan p-değerleri NaN'a geri çevrilir."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT results_json FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return _restore_nan(json.loads(row['results_json'])) if row else None
+
+    def load_config(self, run_id):
+        """Çalıştırmanın analiz ayarları (protokol adı dahil); kayıt veya ayar yoksa None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT config_json FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return json.loads(row['config_json']) if row and row['config_json'] else None
+
+    def get_run(self, run_id):
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return dict(row) if row else None
+
+
+def _restore_nan(results):
+    """to_json_safe'in None'a çevirdiği sayısal alanları (p-değerleri, model istatistikleri) NaN'a geri döndürür."""
+    nan = float('nan')
+    for key in {*P_VALUE_COLUMNS, *(results.get('faz2_models') or {})}:
+        if key in results and results[key] is None:
+            results[key] = nan
+    for key in ('faz1_numeric_p_values', 'faz1_categoric_p_values'):
+        if results.get(key):
+            results[key] = {name: nan if p is None else p for name, p in results[key].items()}
+    for model in (results.get('faz2_models') or {}).values():
+        for name, value in model.items():
+            if value is None:
+                model[name] = nan
+    for entry in (results.get('strata') or {}).get('sites', {}).values():
+        _restore_nan(entry['results'])
+    return results
+
+
+_results_store = None
+_results_store_lock = threading.Lock()
+
+
+def get_results_store():
+    """Süreçteki tüm oturumların paylaştığı depo nesnesi (bağlantılar işlem başına açılır)."""
+    global _results_store
+    with _results_store_lock:
+        if _results_store is None:
+            _results_store = ResultsStore()
+        return _results_store
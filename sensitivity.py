@@ -0,0 +1,190 @@
+"""Duyarlılık analizi: alternatif düzeltme kovaryantı setleri taraması.
+
+Dinamik düzeltme motoru FAZ 2'ye yalnızca FAZ 1'de p < 0.05 olan
+kovaryantları ekler. Bu modül aynı hipotezleri başka düzeltme setleriyle de
+kurar ve sonucun setten ne kadar etkilendiğini gösterir:
+
+    * düzeltmesiz (yalnızca ön-test),
+    * FAZ 1 p < eşik kovaryantları (varsayılan eşikler 0.05 / 0.10 / 0.20;
+      0.05 ana rapordaki modeldir),
+    * tüm başlangıç kovaryantları.
+
+Tasarım (grup kuklaları ve kovaryant blokları) tüm aday kovaryantlarla bir
+kez kurulur. Her hipotez çifti için X'X çapraz çarpımları, satırlar eksik
+kovaryant desenine göre ayrılarak tek geçişte hesaplanır (çiftler iş
+parçacıklarında paralel; NumPy/BLAS GIL'i bırakır). Her düzeltme seti bu
+matrislerin alt bloklarından, satır verisine dönmeden çözülür
+(`fit_from_crossproducts`); her set kendi eksik-değer maskesini (tam gözlem)
+korur. Aynı kovaryant kümesine düşen varyantlar bir kez çözülür.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ancova_engine import AncovaDesign, covariates_to_formula, fit_from_crossproducts
+
+DEFAULT_SENSITIVITY_CONFIG = {'thresholds': [0.05, 0.10, 0.20], 'unadjusted': True, 'all_covariates': True,
+                              'alpha': 0.05, 'ci_level': 0.95, 'n_jobs': 1}
+
+
+def sensitivity_variants(faz1_p_values, plan, thresholds, unadjusted=True, all_covariates=True):
+    """[{'name', 'label', 'covariates'}, ...]: taranacak düzeltme setleri (rapordaki sırayla).
+
+    Eşik varyantları `record_faz1_results` ile aynı kuralı (ve kovaryant sırasını) kullanır.
+    """
+    def covariates_for(labels):
+        return [(col, col in plan.categoric_columns) for col in (plan.correction_columns_by_label.get(label) for label in labels) if col]
+
+    variants = []
+    if unadjusted:
+        variants.append({'name': 'duzeltmesiz', 'label': 'Düzeltmesiz', 'covariates': []})
+    for threshold in sorted(thresholds):
+        variants.append({'name': f'p<{threshold:g}', 'label': f'FAZ 1 p < {threshold:g}',
+                         'covariates': covariates_for(label for label, p in faz1_p_values.items() if p < threshold)})
+    if all_covariates:
+        variants.append({'name': 'tum_kovaryantlar', 'label': 'Tüm başlangıç kovaryantları',
+                         'covariates': covariates_for(plan.correction_columns_by_label)})
+    return variants
+
+
+def _with_interval(entry, t_crit):
+    entry = dict(entry)
+    if np.isnan(entry['se']) or entry['df_denom'] <= 0:
+        entry['ci_low'] = entry['ci_high'] = np.nan
+    else:
+        half = float(t_crit(entry['df_denom'])) * entry['se']
+        entry['ci_low'], entry['ci_high'] = entry['estimate'] - half, entry['estimate'] + half
+    return entry
+
+
+def _sum_patterns(products, required):
+    """Gerekli kovaryantların hiçbiri eksik olmayan desenlerin toplamı: (n, X'X)."""
+    n, gram = 0, None
+    for pattern, (n_p, gram_p) in products.items():
+        if pattern & required == 0:
+            n += n_p
+            gram = gram_p.copy() if gram is None else gram + gram_p
+    return n, gram
+
+
+def run_sensitivity_analysis(df, pairs, faz1_p_values, primary_covariates, plan, group_col='grup', fixed_covariates=(),
+                             config=None, primary_models=None):
+    """Tüm düzeltme setleri için FAZ 2 modelleri, güven aralıkları ve hipotez başına sağlamlık özeti.
+
+    primary_covariates: ana rapordaki düzeltme seti (bu sete düşen varyantlar 'primary' işaretlenir).
+    primary_models: ana FAZ 2 modelleri verilirse bu setin satırları onlardan alınır (rapordaki p-değerleriyle birebir aynı).
+    fixed_covariates: her varyanta eklenen terimler (ör. çok merkezli modelde merkez sütunu).
+    config: DEFAULT_SENSITIVITY_CONFIG anahtarlarından herhangi biri (eksikler varsayılanla doldurulur).
+    """
+    from scipy import stats
+    config = {**DEFAULT_SENSITIVITY_CONFIG, **(config or {})}
+    fixed_covariates = list(fixed_covariates)
+    variants = sensitivity_variants(faz1_p_values, plan, config['thresholds'], config['unadjusted'], config['all_covariates'])
+    for variant in variants:
+        variant['covariates'] = fixed_covariates + variant['covariates']
+        variant['formula'] = covariates_to_formula(variant['covariates'])
+        variant['primary'] = variant['covariates'] == list(primary_covariates)
+
+    # Ortak tasarım tüm aday kovaryantlarla bir kez kurulur; her çift için çapraz çarpımlar (eksik kovaryant
+    # desenine göre) bir kez hesaplanır ve her düzeltme seti bunların alt bloklarından çözülür
+    candidates = list(dict.fromkeys(covariate for variant in variants for covariate in variant['covariates']))
+    design = AncovaDesign(df, group_col, candidates)
+    pair_products = lambda pair: design.crossproducts_by_pattern(pair[1], pair[2])
+    n_jobs = config['n_jobs']
+    if n_jobs and n_jobs > 1 and len(pairs) > 1:
+        with ThreadPoolExecutor(max_workers=min(n_jobs, len(pairs))) as executor:
+            products = list(executor.map(pair_products, pairs))
+    else:
+        products = [pair_products(pair) for pair in pairs]
+
+    n_group_cols = design.group_block.shape[1]
+    n_design_cols = n_group_cols + design.covariate_block.shape[1]
+    position = {covariate: i for i, covariate in enumerate(candidates)}
+
+    def fit(covariates):
+        cols = list(range(n_group_cols + 1))  # grup kuklaları + sabit
+        for covariate in covariates:
+            block = design.covariate_slices[position[covariate]]
+            cols.extend(range(n_group_cols + block.start, n_group_cols + block.stop))
+        cols.append(n_design_cols)  # ön-test
+        required = sum(1 << position[covariate] for covariate in covariates)
+        fits = {}
+        for (key, _, _), by_pattern in zip(pairs, products):
+            n, gram = _sum_patterns(by_pattern, required)
+            if gram is None:
+                n, gram = 0, np.zeros((n_design_cols + 2, n_design_cols + 2))
+            fits[key] = fit_from_crossproducts(gram[np.ix_(cols, cols)], gram[cols, -1], gram[-1, -1], n, n_group_cols)
+        return fits
+
+    distinct = list(dict.fromkeys(tuple(variant['covariates']) for variant in variants))
+    fits = {covariates: fit(covariates) for covariates in distinct}
+    if primary_models is not None and tuple(primary_covariates) in fits:
+        fits[tuple(primary_covariates)] = {key: primary_models[key] for key, _, _ in pairs}
+
+    t_crit = lambda df_denom: stats.t.ppf(1 - (1 - config['ci_level']) / 2, df_denom)
+    models = {variant['name']: {key: _with_interval(entry, t_crit) for key, entry in fits[tuple(variant['covariates'])].items()}
+              for variant in variants}
+
+    # Sağlamlık: hipotezin anlamlılık kararı tüm setlerde aynı mı?
+    alpha = config['alpha']
+    robustness = {}
+    for key, _, _ in pairs:
+        p_values = [models[variant['name']][key]['p_value'] for variant in variants]
+        decisions = {bool(p < alpha) for p in p_values if not np.isnan(p)}
+        robustness[key] = {'n_significant': sum(p < alpha for p in p_values if not np.isnan(p)), 'n_variants': len(variants),
+                           'p_min': float(np.nanmin(p_values)) if decisions else np.nan,
+                           'p_max': float(np.nanmax(p_values)) if decisions else np.nan, 'consistent': len(decisions) == 1}
+
+    return {'alpha': alpha, 'ci_level': config['ci_level'], 'n_models': len(distinct),
+            'variants': [{key: variant[key] for key in ('name', 'label', 'formula', 'primary')} for variant in variants],
+            'models': models, 'robustness': robustness}
+
+
+def sensitivity_summary_rows(sensitivity, plan):
+    """Sağlamlık tablosu: her düzeltme seti için tek satır (hipotez başına p-değeri)."""
+    rows = []
+    for variant in sensitivity['variants']:
+        row = {'Düzeltme seti': variant['label'] + (' (ana model)' if variant['primary'] else ''),
+               'Kovaryantlar': variant['formula'].lstrip(' +') or '-'}
+        row.update({title: sensitivity['models'][variant['name']][key]['p_value'] for key, title in plan.p_value_titles.items()})
+        rows.append(row)
+    return rows
+
+
+def robustness_lines(sensitivity, plan):
+    """Hipotez başına tek cümlelik sağlamlık özeti."""
+    lines = []
+    for key, title in plan.p_value_titles.items():
+        info = sensitivity['robustness'][key]
+        if np.isnan(info['p_min']):
+            lines.append(f"{title.removesuffix(' p')}: model kurulamadı")
+            continue
+        verdict = "karar tüm setlerde aynı" if info['consistent'] else "karar düzeltme setine bağlı"
+        lines.append(f"{title.removesuffix(' p')}: {info['n_significant']}/{info['n_variants']} sette p < {sensitivity['alpha']:g} "
+                     f"(p aralığı {info['p_min']:.4f} - {info['p_max']:.4f}; {verdict})")
+    return lines
+
+
+def sensitivity_forest_chart(sensitivity, plan):
+    """Grup etkisi ve güven aralıkları: hipotez × düzeltme seti (forest grafiği)."""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for variant in sensitivity['variants']:
+        models = sensitivity['models'][variant['name']]
+        keys = list(plan.p_value_titles)
+        estimates = np.array([models[key]['estimate'] for key in keys], dtype=float)
+        fig.add_trace(go.Scatter(
+            x=estimates, y=[[plan.p_value_titles[key].removesuffix(' p') for key in keys], [variant['label']] * len(keys)],
+            mode='markers', name=variant['label'] + (' (ana model)' if variant['primary'] else ''),
+            marker={'size': 11 if variant['primary'] else 8, 'symbol': 'diamond' if variant['primary'] else 'circle'},
+            error_x={'type': 'data', 'symmetric': False,
+                     'array': np.array([models[key]['ci_high'] for key in keys], dtype=float) - estimates,
+                     'arrayminus': estimates - np.array([models[key]['ci_low'] for key in keys], dtype=float)},
+            customdata=[models[key]['p_value'] for key in keys],
+            hovertemplate="Grup etkisi: %{x:.3f}<br>p = %{customdata:.4f}<extra>%{fullData.name}</extra>",
+        ))
+    fig.add_vline(x=0, line_dash='dash', line_color='gray')
+    fig.update_layout(title=f"Duyarlılık Analizi: Grup Etkisi ve %{sensitivity['ci_level'] * 100:.0f} Güven Aralıkları",
+                      xaxis_title="Grup etkisi (ANCOVA katsayısı)", yaxis={'autorange': 'reversed'},
+                      height=max(400, 45 * len(plan.p_value_titles) * len(sensitivity['variants'])), legend_title="Düzeltme seti")
+    return fig
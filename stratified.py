@@ -0,0 +1,62 @@
+"""Çok merkezli (tabakalı) analiz.
+
+Birden fazla hastaneden toplanan veriler tek dosyada, bir merkez / tabaka
+sütunuyla yüklenir. Analiz hattı (FAZ 1 denklik + dinamik düzeltme + FAZ 2
+ANCOVA) her merkez için ayrı ayrı, bir iş parçacığı havuzunda eşzamanlı olarak
+çalıştırılır. Raporun ana sonucu ise tüm merkezlerin birlikte analiz edildiği
+ve FAZ 2 modellerine `C(merkez)` teriminin eklendiği birleşik (pooled) modeldir.
+Merkez bazlı sonuçlar `results['strata']` altında toplanır.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis import ANALYSIS_CONFIG, DEFAULT_PLAN, run_full_analysis
+
+MAX_STRATA = 50
+DEFAULT_STRATA_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def candidate_strata_columns(columns, plan=None):
+    """Merkez / tabaka sütunu olarak seçilebilecek (şablon dışı) sütunlar."""
+    required = set((plan or DEFAULT_PLAN).all_required_columns)
+    return [col for col in columns if col not in required]
+
+
+def split_by_stratum(df, strata_col):
+    """{merkez adı: alt tablo}; merkez değeri boş olan satırlar hiçbir tabakaya alınmaz."""
+    return {str(site): frame for site, frame in df.groupby(strata_col, sort=True, observed=True, dropna=True)}
+
+
+def run_stratified_analysis(df, strata_col, ancova_method=ANALYSIS_CONFIG['ancova_yontemi'], resampling=None,
+                            max_workers=DEFAULT_STRATA_WORKERS, imputation=None, plan=None, sensitivity=None,
+                            longitudinal=None):
+    """Birleşik model sonuçlarını, merkez bazlı sonuçlar 'strata' anahtarına eklenmiş olarak döndürür.
+
+    Yeniden örnekleme, çoklu atama, duyarlılık taraması ve tekrarlı ölçüm modeli (istenirse) yalnızca birleşik
+    modelde yapılır; karma modele merkez terimi eklenmez.
+    """
+    if strata_col not in df.columns:
+        return {'error': f"HATA: Merkez / tabaka sütunu '{strata_col}' yüklenen dosyada bulunamadı."}
+    df_sites = df[df[strata_col].notna()]
+    frames = split_by_stratum(df_sites, strata_col)
+    if len(frames) < 2:
+        return {'error': f"HATA: '{strata_col}' sütununda en az iki farklı merkez bulunmalıdır (bulunan: {len(frames)})."}
+    if len(frames) > MAX_STRATA:
+        return {'error': f"HATA: '{strata_col}' sütununda {len(frames)} farklı değer var; merkez sütunu en fazla {MAX_STRATA} değer içerebilir."}
+
+    # Merkez bazlı analizler ve birleşik model aynı havuzda eşzamanlı çalışır
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(frames) + 1))) as executor:
+        pooled_future = executor.submit(run_full_analysis, df_sites, ancova_method, resampling, strata_col, imputation, plan, sensitivity,
+                                        longitudinal)
+        site_futures = {site: executor.submit(run_full_analysis, frame, ancova_method, plan=plan) for site, frame in frames.items()}
+        results = pooled_future.result()
+        site_results = {site: future.result() for site, future in site_futures.items()}
+
+    if results.get('error'):
+        return results
+    results['strata'] = {
+        'column': strata_col,
+        'n_pooled': int(len(df_sites)),
+        'sites': {site: {'n': int(len(frames[site])), 'results': site_results[site]} for site in frames},
+    }
+    return results
@@ -0,0 +1,207 @@
+"""Bildirimsel çalışma tanımı (study spec) ve derlenmiş analiz planı.
+
+Bir protokolün sütunları, FAZ 1 denklik değişkenleri, FAZ 2 hipotezleri
+(son-test / ön-test çiftleri), grafikleri, dashboard bölümleri ve PDF ekleri
+kod yerine `specs/<ad>.json` (veya PyYAML kuruluysa .yaml) dosyasında
+tanımlanır:
+
+    kovaryantlar.sayisal / .kategorik  FAZ 1'de test edilen ve denklik
+                                       bozulursa FAZ 2'ye eklenen değişkenler
+    olcumler                           ön-test / son-test puanları (denklik_adi
+                                       verilenler FAZ 1'de de test edilir)
+    hipotez_gruplari                   rapordaki hipotez başlıkları ve testleri
+    tekrarli_olcumler                  aynı ölçeğin zamanlara göre sütunları
+                                       (grup × zaman karma modeli için, opsiyonel)
+    grafikler, dashboard_bolumleri, pdf_ekleri
+
+Tanım bir kez doğrulanıp `StudyPlan` nesnesine derlenir: sütun listeleri ve
+indeks dizileri, görünen ad eşlemeleri, hipotez çiftleri, grafik listesi. Motor,
+dashboard ve PDF bu plandan çalışır; aynı sunucu birden çok protokole hizmet
+verebilir. Planın `key` özeti önbellek anahtarlarına girer, böylece tanım
+dosyası değiştiğinde eski sonuçlar kullanılmaz.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_SPEC_DIR = os.environ.get('EBELIK_SPEC_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'specs'))
+DEFAULT_STUDY = 'ebelik_nefes_egzersizi'
+SPEC_EXTENSIONS = ('.json', '.yaml', '.yml')
+
+CHART_TYPES = ('pasta', 'kutu', 'sutun', 'cizgi', 'likert', 'isi_haritasi')
+# Grafik türünün ihtiyaç duyduğu alanlar ve sütun türü ('sayisal' / 'kategorik')
+_CHART_REQUIREMENTS = {
+    'pasta': ('sutun', 'kategorik'), 'sutun': ('sutun', 'kategorik'), 'kutu': ('sutun', 'sayisal'),
+    'cizgi': ('sutunlar', 'sayisal'), 'likert': ('sutunlar', 'sayisal'), 'isi_haritasi': (None, None),
+}
+
+
+class StudyPlan:
+    """Bir çalışma tanımının doğrulanmış ve önceden hesaplanmış hali (süreçler arası pickle edilebilir)."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.key = hashlib.sha256(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+        self.name = _require(spec, 'ad', 'tanım')
+        self.title = spec.get('baslik', self.name)
+        self.intervention_phrase = spec.get('mudahale_ifadesi', 'müdahalenin')
+        self.outcome_phrase = spec.get('sonuc_ifadesi', 'hedeflenen sonuç değişkenlerinde')
+
+        group = _require(spec, 'grup', 'tanım')
+        self.group_col = _require(group, 'sutun', 'grup')
+        self.groups = (_require(group, 'mudahale', 'grup'), _require(group, 'kontrol', 'grup'))
+
+        covariates = spec.get('kovaryantlar', {})
+        numeric_covariates = [_require(item, 'sutun', 'kovaryant') for item in covariates.get('sayisal', [])]
+        categoric_covariates = [_require(item, 'sutun', 'kovaryant') for item in covariates.get('kategorik', [])]
+        measures = [_require(item, 'sutun', 'ölçüm') for item in _require(spec, 'olcumler', 'tanım')]
+
+        # Şablon sütun sırası: sayısal kovaryantlar, ölçümler, grup, kategorik kovaryantlar
+        self.numeric_columns = numeric_covariates + measures
+        self.categoric_columns = [self.group_col] + categoric_covariates
+        self.all_required_columns = self.numeric_columns + self.categoric_columns
+        duplicates = sorted({col for col in self.all_required_columns if self.all_required_columns.count(col) > 1})
+        if duplicates:
+            raise ValueError(f"Çalışma tanımı '{self.name}': şu sütunlar birden fazla kez tanımlanmış: {', '.join(duplicates)}")
+        self.column_index = {col: i for i, col in enumerate(self.all_required_columns)}
+        self.numeric_index = {col: i for i, col in enumerate(self.numeric_columns)}
+
+        # FAZ 1: kovaryantlar + denklik adı verilen ölçümler (şablon sırasıyla)
+        labels = {item['sutun']: _require(item, 'ad', 'kovaryant') for item in covariates.get('sayisal', [])}
+        labels.update({item['sutun']: item['denklik_adi'] for item in spec['olcumler'] if item.get('denklik_adi')})
+        self.faz1_numeric_labels = {col: labels[col] for col in self.numeric_columns if col in labels}
+        self.faz1_categoric_labels = {item['sutun']: _require(item, 'ad', 'kovaryant') for item in covariates.get('kategorik', [])}
+        self.faz1_labels = {**self.faz1_numeric_labels, **self.faz1_categoric_labels}
+        # Dinamik düzeltme: yalnızca kovaryantlar (ön-testler her modelde zaten vardır)
+        self.correction_columns_by_label = {self.faz1_labels[col]: col for col in numeric_covariates + categoric_covariates}
+
+        # FAZ 2 hipotezleri
+        self.hypothesis_groups, self.hypothesis_tests, self.p_value_titles = [], [], {}
+        for group_spec in _require(spec, 'hipotez_gruplari', 'tanım'):
+            tests = []
+            for test in _require(group_spec, 'testler', 'hipotez grubu'):
+                key, outcome, baseline = (_require(test, field, 'hipotez') for field in ('anahtar', 'son_test', 'on_test'))
+                for col in (outcome, baseline):
+                    if col not in self.numeric_index:
+                        raise ValueError(f"Çalışma tanımı '{self.name}': '{key}' hipotezindeki '{col}' sütunu sayısal sütunlar arasında yok.")
+                if key in self.p_value_titles:
+                    raise ValueError(f"Çalışma tanımı '{self.name}': '{key}' hipotez anahtarı birden fazla kez kullanılmış.")
+                self.hypothesis_tests.append((key, outcome, baseline))
+                self.p_value_titles[key] = f"{test.get('kisa_ad', key)} p"
+                tests.append({'key': key, 'label': test.get('ad', outcome)})
+            self.hypothesis_groups.append({'title': _require(group_spec, 'baslik', 'hipotez grubu'), 'tests': tests})
+        if not self.hypothesis_tests:
+            raise ValueError(f"Çalışma tanımı '{self.name}': en az bir hipotez testi tanımlanmalıdır.")
+
+        # Önceden hesaplanmış indeks dizileri (sayısal sütun sırasına göre; güç simülasyonu bunları kullanır)
+        self.outcome_idx = np.array([self.numeric_index[outcome] for _, outcome, _ in self.hypothesis_tests])
+        self.baseline_idx = np.array([self.numeric_index[baseline] for _, _, baseline in self.hypothesis_tests])
+        self.faz1_numeric_idx = np.array([self.numeric_index[col] for col in self.faz1_numeric_labels], dtype=int)
+        self.pre_test_columns = list(dict.fromkeys(baseline for _, _, baseline in self.hypothesis_tests))
+        self.outcome_columns = list(dict.fromkeys(outcome for _, outcome, _ in self.hypothesis_tests))
+
+        # Tekrarlı ölçümler: [{'name', 'columns', 'times'}, ...] (zaman sırasıyla, karma model ve evrim grafikleri için)
+        self.repeated_measures = []
+        for item in spec.get('tekrarli_olcumler', []):
+            name, columns = _require(item, 'ad', 'tekrarlı ölçüm'), _require(item, 'sutunlar', 'tekrarlı ölçüm')
+            times = item.get('zaman_etiketleri') or list(columns)
+            unknown = [col for col in columns if col not in self.numeric_index]
+            if unknown:
+                raise ValueError(f"Çalışma tanımı '{self.name}': '{name}' tekrarlı ölçümündeki sütun(lar) sayısal sütunlar arasında yok: {', '.join(unknown)}")
+            if len(columns) < 2 or len(times) != len(columns) or len(set(columns)) != len(columns):
+                raise ValueError(f"Çalışma tanımı '{self.name}': '{name}' tekrarlı ölçümü en az iki farklı sütun ve her sütun için bir zaman etiketi içermelidir.")
+            self.repeated_measures.append({'name': name, 'columns': list(columns), 'times': list(times)})
+
+        # Grafikler, dashboard bölümleri ve PDF ekleri
+        self.charts = {}
+        for chart in spec.get('grafikler', []):
+            self.charts[_require(chart, 'ad', 'grafik')] = self._check_chart(chart)
+        self.chart_names = list(self.charts)
+        self.dashboard_sections = {
+            _require(section, 'ad', 'dashboard bölümü'): {'title': section.get('baslik', section['ad']),
+                                                          'charts': self._check_chart_names(section.get('grafikler', []))}
+            for section in spec.get('dashboard_bolumleri', [])
+        }
+        self.pdf_appendices = [
+            {'title': _require(appendix, 'baslik', 'PDF eki'), 'error_label': appendix.get('hata_adi', 'Grafikler'),
+             'charts': self._check_chart_names(appendix.get('grafikler', []))}
+            for appendix in spec.get('pdf_ekleri', [])
+        ]
+
+    def _check_chart(self, chart):
+        chart_type = chart.get('tur')
+        if chart_type not in CHART_TYPES:
+            raise ValueError(f"Çalışma tanımı '{self.name}': '{chart['ad']}' grafiğinin türü geçersiz ({chart_type}); "
+                             f"seçenekler: {', '.join(CHART_TYPES)}")
+        field, kind = _CHART_REQUIREMENTS[chart_type]
+        if field is not None:
+            columns = _require(chart, field, 'grafik')
+            allowed = self.numeric_columns if kind == 'sayisal' else self.categoric_columns
+            for col in [columns] if isinstance(columns, str) else columns:
+                if col not in allowed:
+                    raise ValueError(f"Çalışma tanımı '{self.name}': '{chart['ad']}' grafiğindeki '{col}' sütunu {kind} sütunlar arasında yok.")
+        return chart
+
+    def _check_chart_names(self, names):
+        unknown = [name for name in names if name not in self.charts]
+        if unknown:
+            raise ValueError(f"Çalışma tanımı '{self.name}': tanımlanmamış grafik(ler): {', '.join(unknown)}")
+        return list(names)
+
+    def __repr__(self):
+        return f"StudyPlan({self.name!r}, key={self.key!r})"
+
+
+def _require(mapping, field, context):
+    if not isinstance(mapping, dict) or mapping.get(field) in (None, '', []):
+        raise ValueError(f"Çalışma tanımında {context} için '{field}' alanı eksik.")
+    return mapping[field]
+
+
+def load_study_spec(path):
+    """Tanım dosyasını (JSON veya YAML) sözlük olarak okur."""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ValueError("YAML çalışma tanımları için PyYAML kurulu olmalıdır (pip install pyyaml).") from e
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def available_study_specs(spec_dir=DEFAULT_SPEC_DIR):
+    """{çalışma adı (dosya adı): yol} - klasördeki tüm tanım dosyaları."""
+    if not os.path.isdir(spec_dir):
+        return {}
+    return {os.path.splitext(name)[0]: os.path.join(spec_dir, name)
+            for name in sorted(os.listdir(spec_dir)) if name.endswith(SPEC_EXTENSIONS)}
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def get_study_plan(study=None, spec_dir=DEFAULT_SPEC_DIR):
+    """Çalışma adı (specs klasöründe) veya tanım dosyası yolu -> derlenmiş plan.
+
+    Planlar süreç içinde önbelleğe alınır; dosya değiştiğinde (mtime) yeniden derlenir.
+    """
+    study = study or DEFAULT_STUDY
+    path = study if os.path.isfile(study) else available_study_specs(spec_dir).get(study)
+    if path is None:
+        raise ValueError(f"Çalışma tanımı bulunamadı: '{study}' ({spec_dir} klasöründe bu adla bir {'/'.join(SPEC_EXTENSIONS)} dosyası yok).")
+    mtime = os.path.getmtime(path)
+    with _plans_lock:
+        cached = _plans.get(path)
+        if cached is None or cached[0] != mtime:
+            plan = StudyPlan(load_study_spec(path))
+            # Protokol adı ayarlara / geçmiş kayıtlarına yazılır ve tanım yeniden bu adla bulunur
+            stem = os.path.splitext(os.path.basename(path))[0]
+            if plan.name != stem:
+                raise ValueError(f"Çalışma tanımı '{plan.name}' dosya adıyla ({os.path.basename(path)}) aynı olmalıdır.")
+            cached = _plans[path] = (mtime, plan)
+        return cached[1]
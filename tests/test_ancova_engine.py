@@ -0,0 +1,64 @@
+"""Toplu NumPy ANCOVA motorunun statsmodels ols + anova_lm(typ=3) ile uyumu."""
+import numpy as np
+import pytest
+
+from analysis import DEFAULT_PLAN
+from ancova_engine import _fit_statsmodels, fit_group_ancova_batch
+from benchmarks.synthetic import make_synthetic_study
+from ingest import prepare_study
+
+PAIRS = DEFAULT_PLAN.hypothesis_tests
+SEEDS = (0, 1, 2)
+
+pytestmark = pytest.mark.filterwarnings('ignore')  # statsmodels rank eksikliği uyarıları
+
+
+def _study(seed, n=80):
+    return prepare_study(make_synthetic_study(n, seed=seed, missing_rate=0.1))
+
+
+def _assert_matches_statsmodels(df, covariates):
+    # 'verify' iki yolu da çalıştırır ve VERIFY_RTOL dışındaki farkta RuntimeError yükseltir
+    results = fit_group_ancova_batch(df, PAIRS, covariates=covariates, method='verify')
+    reference = _fit_statsmodels(df, PAIRS, 'grup', covariates)
+    for key, ref in reference.items():
+        assert results[key]['n'] == ref['n']
+        assert (results[key]['df_num'], results[key]['df_denom']) == (ref['df_num'], ref['df_denom'])
+        np.testing.assert_allclose(results[key]['p_value'], ref['p_value'], rtol=1e-9, atol=1e-15)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('covariates', [
+    [],
+    [('yas', False), ('gebelik_haftasi', False)],
+    [('yas', False), ('egitim_durumu', True), ('gelir_duzeyi', True)],
+])
+def test_matches_statsmodels(seed, covariates):
+    _assert_matches_statsmodels(_study(seed), covariates)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_float32_inputs(seed):
+    df = _study(seed)
+    numeric = [col for col in DEFAULT_PLAN.numeric_columns if col in df]
+    df[numeric] = df[numeric].astype(np.float32)
+    _assert_matches_statsmodels(df, [('yas', False), ('medeni_durum', True)])
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_rank_deficient_dummy_blocks(seed):
+    df = _study(seed)
+    # Aynı kategorik kovaryantın iki kopyası: çakışan kukla blokları
+    df['medeni_kopya'] = df['medeni_durum']
+    _assert_matches_statsmodels(df, [('medeni_durum', True), ('medeni_kopya', True), ('yas', False)])
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_level_only_in_masked_rows(seed):
+    df = _study(seed)
+    # Yalnızca sonucu eksik satırlarda görülen düzey: ilgili modelde tamamen sıfır kukla sütunu
+    missing = df['korku_vas_4cm'].isna()
+    assert missing.any()
+    df['egitim_durumu'] = df['egitim_durumu'].cat.add_categories('Yeni')
+    df.loc[missing, 'egitim_durumu'] = 'Yeni'
+    _assert_matches_statsmodels(df, [('egitim_durumu', True), ('yas', False)])
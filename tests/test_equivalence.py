@@ -0,0 +1,55 @@
+"""Vektörel FAZ 1 testlerinin scipy ttest_ind / chi2_contingency ile uyumu."""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import chi2_contingency, ttest_ind
+
+from analysis import DEFAULT_PLAN
+from benchmarks.synthetic import make_synthetic_study
+from equivalence import run_equivalence_tests
+from ingest import prepare_study
+
+NUMERIC = list(DEFAULT_PLAN.faz1_numeric_labels)
+CATEGORIC = list(DEFAULT_PLAN.faz1_categoric_labels)
+
+
+def _study(seed, n=80):
+    return prepare_study(make_synthetic_study(n, seed=seed, missing_rate=0.1))
+
+
+def _assert_matches_scipy(df):
+    intervention, control = DEFAULT_PLAN.groups
+    p_numeric, p_categoric = run_equivalence_tests(df, NUMERIC, CATEGORIC, groups=DEFAULT_PLAN.groups)
+    for col in NUMERIC:
+        # Temizlenmiş tablodaki float32 sütunlar motor gibi float64'te test edilir (scipy float32'de hesaplardı)
+        values = df[col].astype(np.float64)
+        expected = ttest_ind(values[df['grup'] == intervention], values[df['grup'] == control],
+                             equal_var=False, nan_policy='omit')[1]
+        np.testing.assert_allclose(p_numeric[col], expected, rtol=1e-10)
+    for col in CATEGORIC:
+        expected = chi2_contingency(pd.crosstab(df['grup'], df[col]))[1]
+        np.testing.assert_allclose(p_categoric[col], expected, rtol=1e-10)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_scipy(seed):
+    _assert_matches_scipy(_study(seed))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_float64_and_object_inputs(seed):
+    df = _study(seed)
+    df[NUMERIC] = df[NUMERIC].astype(np.float64)
+    df[CATEGORIC] = df[CATEGORIC].astype(object)
+    _assert_matches_scipy(df)
+
+
+def test_sparse_tables():
+    df = _study(0, n=30)
+    # Yalnızca bir grupta görülen düzey ve kullanılmayan kategori: pd.crosstab sıfır satır/sütunları içermez
+    df['egitim_durumu'] = df['egitim_durumu'].cat.add_categories(['Yeni', 'Bos'])
+    df.loc[df.index[df['grup'] == DEFAULT_PLAN.groups[0]][:2], 'egitim_durumu'] = 'Yeni'
+    # 2×2 tablo (Yates düzeltmesi) ve tek düzeyli sütun
+    df['medeni_durum'] = df['medeni_durum'].cat.set_categories(['Bekar', 'Evli'])
+    df['planli_gebelik_mi'] = 'Evet'
+    _assert_matches_scipy(df)
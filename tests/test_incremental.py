@@ -0,0 +1,51 @@
+"""Artımlı yeniden analizin tam yeniden çalıştırmayla (run_full_analysis) uyumu."""
+import numpy as np
+import pytest
+
+from analysis import run_full_analysis
+from benchmarks.synthetic import make_synthetic_study
+from incremental import run_incremental_analysis
+from ingest import prepare_study
+
+
+def _study(seed, n=240, **options):
+    return prepare_study(make_synthetic_study(n, seed=seed, missing_rate=0.1, **options))
+
+
+def _assert_same_results(actual, expected, path='sonuclar'):
+    if isinstance(expected, dict):
+        assert set(actual) == set(expected), path
+        for key in expected:
+            _assert_same_results(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, (float, np.floating)):
+        np.testing.assert_allclose(actual, expected, rtol=1e-8, atol=1e-300, err_msg=path)
+    else:
+        assert actual == expected, path
+
+
+def _compare_with_full(df, state):
+    results, _ = run_incremental_analysis(df, state)
+    info = results.pop('incremental')
+    _assert_same_results(results, run_full_analysis(df))
+    return info
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('n, n_first, imbalance', [
+    (240, 180, 0.0),
+    (400, 360, 1.0),  # başlangıç dengesizliği: sayısal ve kategorik düzeltme kovaryantlarıyla artımlı FAZ 2
+])
+def test_appended_rows_match_full_rerun(seed, n, n_first, imbalance):
+    df = _study(seed, n=n, imbalance=imbalance)
+    _, state = run_incremental_analysis(df.iloc[:n_first])
+    info = _compare_with_full(df, state)
+    assert (info['mode'], info['new_rows']) == ('artımlı', n - n_first)
+
+
+def test_changed_rows_fall_back_to_full_rerun():
+    df = _study(1)
+    _, state = run_incremental_analysis(df.iloc[:180])
+    changed = df.copy()
+    changed.loc[changed.index[0], 'yas'] += 1
+    info = _compare_with_full(changed, state)
+    assert info['mode'] == 'tam'
@@ -0,0 +1,44 @@
+"""Grup × zaman karma modelinin statsmodels MixedLM (REML) ile uyumu."""
+import numpy as np
+import pytest
+
+from analysis import DEFAULT_PLAN
+from benchmarks.synthetic import make_synthetic_study
+from ingest import prepare_study
+from longitudinal import _fit_statsmodels, _gls_covariance, _pattern_stats, fit_random_intercept, get_long_table, run_longitudinal_analysis
+
+# n = 40 ve %10 eksik veriyle bu tohumlarda cov_params() ile σ²(X'V⁻¹X)⁻¹ binde birden fazla ayrışır
+SEEDS = (3, 4, 5, 6, 7, 11)
+
+
+def _study(seed, n=40):
+    return prepare_study(make_synthetic_study(n, seed=seed, missing_rate=0.1))
+
+
+def _group_codes(df):
+    intervention, control = DEFAULT_PLAN.groups
+    groups = df[DEFAULT_PLAN.group_col].to_numpy(dtype=object)
+    return np.where(groups == control, 0, np.where(groups == intervention, 1, -1))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_verify_mode_accepts_valid_data(seed):
+    result = run_longitudinal_analysis(_study(seed), DEFAULT_PLAN, {'method': 'verify'})
+    assert all(model['error'] is None for model in result['models'].values())
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_estimates_match_statsmodels(seed):
+    df = _study(seed)
+    codes, long_table = _group_codes(df), get_long_table(df, DEFAULT_PLAN)
+    for measure in DEFAULT_PLAN.repeated_measures:
+        series = long_table.series(measure['columns'])
+        stats_ = _pattern_stats(series, codes)
+        beta, cov, sigma2, tau2 = fit_random_intercept(stats_)
+        ref_beta, _, ref_sigma2, ref_tau2 = _fit_statsmodels(series, codes)
+        total = ref_sigma2 + ref_tau2
+        np.testing.assert_allclose(beta, ref_beta, rtol=1e-4, atol=1e-4 * np.abs(ref_beta).max())
+        assert abs(sigma2 - ref_sigma2) <= 1e-4 * total
+        assert abs(tau2 - ref_tau2) <= 1e-4 * total
+        ref_cov = _gls_covariance(stats_, ref_sigma2, ref_tau2)
+        np.testing.assert_allclose(cov, ref_cov, rtol=1e-4, atol=1e-4 * np.abs(ref_cov).max())
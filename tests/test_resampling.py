@@ -0,0 +1,30 @@
+"""Permütasyon testinin rank eksik düzeltme matrislerine dayanıklılığı."""
+import numpy as np
+
+from resampling import permutation_test
+
+
+def _design(n=40, seed=7):
+    rng = np.random.default_rng(seed)
+    baseline = rng.normal(size=n)
+    W = np.column_stack([np.ones(n), rng.normal(size=n), baseline])
+    G = (np.arange(n) % 2).astype(float)[:, None]
+    y = 0.8 * baseline + 0.3 * G[:, 0] + rng.normal(size=n)
+    return W, G, y
+
+
+def _perm_p(W, G, y):
+    return permutation_test(W, G, y, 999, np.random.SeedSequence(2209))
+
+
+def test_zero_nuisance_column_leaves_perm_p_unchanged():
+    W, G, y = _design()
+    # Maskelenen satırlarda kalan düzey: AncovaDesign'da tamamen sıfır dummy sütunu
+    padded = np.column_stack([W[:, :2], np.zeros(len(y)), W[:, 2:]])
+    assert _perm_p(padded, G, y) == _perm_p(W, G, y)
+
+
+def test_duplicated_nuisance_column_leaves_perm_p_unchanged():
+    W, G, y = _design()
+    padded = np.column_stack([W[:, :2], W[:, 1], W[:, 2:]])
+    assert _perm_p(padded, G, y) == _perm_p(W, G, y)
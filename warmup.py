@@ -0,0 +1,73 @@
+"""Ağır bağımlılıkların arka planda ön yüklenmesi (ısınma).
+
+scipy.stats, statsmodels, plotly, fpdf ve kaleido yalnızca ilgili aşama
+(FAZ 1/2, grafik, PDF) ilk kez çalıştığında içe aktarılır; böylece arayüzün
+ilk çizimi bunları beklemez. `start_warmup()` ilk çizimden sonra çağrılır ve
+modülleri süreç başına bir kez, arka plandaki bir iş parçacığında yükler.
+İçe aktarma kilitleri sayesinde bu sırada aynı modülü isteyen bir aşama
+yüklemenin bitmesini bekler; modül iki kez yüklenmez.
+
+EBELIK_ISINMA=0 ile kapatılabilir (ör. bellek kısıtlı kapsayıcılar için).
+"""
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+
+# Aşamaların ilk çalışmada ihtiyaç duyduğu modüller (kurulu olmayan opsiyoneller atlanır)
+WARMUP_MODULES = (
+    'scipy.stats',
+    'plotly.express',
+    'plotly.graph_objects',
+    'plotly.io',
+    'fpdf',
+    'pypdf',
+    'openpyxl',
+    'statsmodels.api',
+    'statsmodels.formula.api',
+    'kaleido',
+)
+
+logger = logging.getLogger('ebelik.isinma')
+_started = False
+_lock = threading.Lock()
+
+
+def warmup_enabled():
+    return os.environ.get('EBELIK_ISINMA', '1').strip().lower() not in ('0', 'false', 'hayir', 'hayır')
+
+
+def preload_modules(modules=WARMUP_MODULES):
+    """Modülleri sırayla içe aktarır: {modül: süre (sn) veya hata metni}."""
+    timings = {}
+    for name in modules:
+        t0 = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:  # opsiyonel bağımlılık eksik veya bozuk: aşama çalıştığında kendi hatasını verir
+            timings[name] = f"{type(e).__name__}: {e}"
+        else:
+            timings[name] = round(time.perf_counter() - t0, 4)
+    return timings
+
+
+def _run(modules):
+    t0 = time.perf_counter()
+    timings = preload_modules(modules)
+    logger.info(json.dumps({'olay': 'isinma', 'sure_sn': round(time.perf_counter() - t0, 4), 'moduller': timings},
+                           ensure_ascii=False))
+
+
+def start_warmup(modules=WARMUP_MODULES):
+    """Ön yüklemeyi süreç başına bir kez arka planda başlatır; başlatıldıysa True döndürür."""
+    global _started
+    if not warmup_enabled():
+        return False
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=_run, args=(tuple(modules),), name='ebelik-isinma', daemon=True).start()
+    return True